@@ -1,8 +1,46 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+import importlib
+
 from .version import __version__
 from .core import (
     missed_lines_str,
     Path, PathLike, CovNode, CovModule, CovFile,
     build_cov_tree,
 )
-from .print import print_tree, cov_color, get_available_tree_sets
-from .cmdline import main as cmdline_main
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .print import print_tree, cov_color, get_available_tree_sets
+    from .cmdline import main as cmdline_main
+    from .core import build_cov_tree_async, merge_trees
+    from .core import save_tree, load_tree, open_tree
+
+
+# attributes imported on first access only, to keep `import cov_tree` fast
+_LAZY_ATTRS = {
+    'print_tree': ('.print', 'print_tree'),
+    'cov_color': ('.print', 'cov_color'),
+    'get_available_tree_sets': ('.print', 'get_available_tree_sets'),
+    'cmdline_main': ('.cmdline', 'main'),
+    'build_cov_tree_async': ('.core', 'build_cov_tree_async'),
+    'merge_trees': ('.core', 'merge_trees'),
+    'save_tree': ('.core', 'save_tree'),
+    'load_tree': ('.core', 'load_tree'),
+    'open_tree': ('.core', 'open_tree'),
+}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module, attr = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
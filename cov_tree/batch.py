@@ -0,0 +1,219 @@
+from __future__ import annotations
+from typing import NamedTuple, Callable, Sequence, TextIO
+import json
+import os
+
+from .core import CovNode, AnalysisCache, build_cov_tree
+from .export import tree_to_dict
+from .print import print_tree
+
+
+class BatchResult(NamedTuple):
+    """The outcome of rendering one coverage file of a batch."""
+    name: str
+    cov_file: str
+    out_file: str
+    error: str | None = None
+
+
+def _write_text(
+        tree: CovNode,
+        file: TextIO,
+        descend: Callable[[CovNode], bool] | None,
+        show_missing: bool,
+        show_module_stats: bool,
+) -> None:
+    print_tree(
+        tree,
+        show_missing=show_missing,
+        show_module_stats=show_module_stats,
+        descend=descend,
+        file=file,
+        no_ansi_escape=True,
+    )
+
+
+def _write_json(
+        tree: CovNode,
+        file: TextIO,
+        descend: Callable[[CovNode], bool] | None,
+        show_missing: bool,
+        show_module_stats: bool,
+) -> None:
+    json.dump(tree_to_dict(tree, descend, show_missing), file, indent=2)
+    file.write('\n')
+
+
+def _write_markdown(
+        tree: CovNode,
+        file: TextIO,
+        descend: Callable[[CovNode], bool] | None,
+        show_missing: bool,
+        show_module_stats: bool,
+) -> None:
+    from .markdown import write_markdown
+    write_markdown(tree, file, descend, show_missing)
+
+
+_FORMATS: dict[str, tuple[str, Callable[..., None]]] = {
+    'text': ('.txt', _write_text),
+    'json': ('.json', _write_json),
+    'markdown': ('.md', _write_markdown),
+}
+"""The report formats, given as file extension and writer."""
+
+
+def get_available_formats() -> list[str]:
+    return list(_FORMATS.keys())
+
+
+def read_manifest(manifest: str) -> list[tuple[str, str]]:
+    """Read a batch manifest.
+
+    Each non-empty line that does not start with '#' names a coverage file,
+    optionally followed by whitespace and the name of its report. Relative
+    paths are relative to the manifest. The name defaults to the name of the
+    directory of the coverage file, if it is a `.coverage` file, and to the
+    file name otherwise.
+
+    Args:
+        manifest: The path to the manifest.
+
+    Returns:
+        The pairs of report name and path to the coverage file.
+
+    Raises:
+        ValueError: If several reports have the same name.
+    """
+    base = os.path.dirname(manifest)
+    entries: list[tuple[str, str]] = []
+    names: set[str] = set()
+    with open(manifest) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            cov_file, *rest = line.split(None, 1)
+            cov_file = os.path.join(base, cov_file)
+            name = rest[0] if rest else _default_name(cov_file)
+            if name in names:
+                raise ValueError(f'Duplicate report name "{name}" in '
+                                 f'{manifest}')
+            names.add(name)
+            entries.append((name, cov_file))
+    return entries
+
+
+def _default_name(cov_file: str) -> str:
+    directory, file_name = os.path.split(os.path.abspath(cov_file))
+    if file_name.startswith('.coverage'):
+        return os.path.basename(directory) + file_name[len('.coverage'):]
+    return file_name
+
+
+def _render(
+        name: str,
+        cov_file: str,
+        out_dir: str,
+        fmt: str,
+        threshold: float | None,
+        options: dict[str, bool],
+        analysis_cache: AnalysisCache,
+) -> BatchResult:
+    ext, write = _FORMATS[fmt]
+    out_file = os.path.join(out_dir, name + ext)
+    try:
+        _, tree = build_cov_tree(cov_file, analysis_cache=analysis_cache)
+        descend = None
+        if threshold is not None:
+            descend = lambda n: n.coverage < threshold  # noqa: E731
+        with open(out_file, 'w', encoding='utf-8') as f:
+            write(tree, f, descend, **options)
+    except Exception as e:
+        return BatchResult(name, cov_file, out_file, str(e) or repr(e))
+    return BatchResult(name, cov_file, out_file)
+
+
+# the analysis cache of a worker process, shared by all its reports
+_worker_cache: AnalysisCache | None = None
+
+
+def _render_in_worker(
+        name: str,
+        cov_file: str,
+        out_dir: str,
+        fmt: str,
+        threshold: float | None,
+        options: dict[str, bool],
+) -> BatchResult:
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = AnalysisCache()
+    return _render(name, cov_file, out_dir, fmt, threshold, options,
+                   _worker_cache)
+
+
+def run_batch(
+        entries: Sequence[tuple[str, str]],
+        out_dir: str,
+        fmt: str = 'text',
+        show_missing: bool = False,
+        show_module_stats: bool = False,
+        threshold: float | None = None,
+        max_workers: int | None = None,
+        analysis_cache: AnalysisCache | None = None,
+) -> list[BatchResult]:
+    """Render the reports of many coverage files in one process (or pool).
+
+    The static analysis of the source files is shared by all coverage files
+    processed in the same process (see :class:`~cov_tree.core.AnalysisCache`),
+    hence sources common to several of them (e.g. vendored packages) are only
+    parsed once (per process).
+
+    Args:
+        entries: The pairs of report name and coverage file, see
+                 :func:`~read_manifest`.
+        out_dir: The directory to write the reports to (created if needed).
+                 The reports are named by the name and the extension of the
+                 format.
+        fmt: The format of the reports, see :func:`~get_available_formats`.
+        show_missing: Include the missed lines.
+        show_module_stats: Include the statistics of the modules (in the text
+                           format).
+        threshold: Collapse the modules with at least this coverage (a
+                   fraction).
+        max_workers: If given, render in a pool of this many processes.
+        analysis_cache: The cache to use if rendering in this process.
+
+    Returns:
+        The results, in the order of the entries. Failed reports carry an
+        error message instead of raising.
+    """
+    if fmt not in _FORMATS:
+        raise ValueError(f'Unknown format "{fmt}", choose one of: '
+                         f'{", ".join(_FORMATS)}')
+    os.makedirs(out_dir, exist_ok=True)
+    options = dict(
+        show_missing=show_missing,
+        show_module_stats=show_module_stats,
+    )
+
+    if max_workers is None:
+        if analysis_cache is None:
+            analysis_cache = AnalysisCache()
+        return [
+            _render(name, cov_file, out_dir, fmt, threshold, options,
+                    analysis_cache)
+            for name, cov_file in entries
+        ]
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _render_in_worker, name, cov_file, out_dir, fmt, threshold,
+                options,
+            )
+            for name, cov_file in entries
+        ]
+        return [future.result() for future in futures]
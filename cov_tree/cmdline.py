@@ -1,26 +1,119 @@
 from __future__ import annotations
-from typing import Sequence
-from argparse import ArgumentParser
+from typing import Sequence, Callable, TextIO, TYPE_CHECKING
+from argparse import ArgumentParser, Namespace
+import importlib
+import os
+import sys
+import time
 
 from .version import __version__
-from .core import CovNode, build_cov_tree
-from .print import print_tree, cov_color, get_available_tree_sets
+from .core import CovNode, build_cov_tree, get_available_sort_keys
+from .core.node import _source_path
+from .print import print_tree, print_top, cov_color, get_available_tree_sets
+if TYPE_CHECKING:  # pragma: no cover
+    from .core.progress import BuildProgress
+    from .core.source import SourceFiles
+
+
+# sub-commands, given as module and name of their entry point
+_SUB_COMMANDS = {
+    'serve': ('.serve', 'main'),
+    'record': ('.history', 'record_main'),
+    'history': ('.history', 'history_main'),
+}
+
+
+def _get_sub_command(name: str) -> Callable[[Sequence[str]], int]:
+    module, func = _SUB_COMMANDS[name]
+    return getattr(importlib.import_module(module, __package__), func)
 
 
 def main(args: Sequence[str] | None = None) -> int:
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] in _SUB_COMMANDS:
+        return _get_sub_command(args[0])(args[1:])
+
     argparser = get_arg_parser()
     args_ns = argparser.parse_args(args)
+    _check_args(argparser, args_ns)
+
+    try:
+        if args_ns.batch is not None:
+            return _run_batch(args_ns)
+        base, tree = _build_tree(args_ns)
+        _output(args_ns, base, tree)
+    except KeyboardInterrupt:
+        print('Cancelled')
+        return 130
+    except Exception as e:
+        print(e)
+        return 1
+
+    return 0
 
+
+def _check_args(argparser: ArgumentParser, args_ns: Namespace) -> None:
+    """Reject options that would be ignored."""
+    if args_ns.max_bytes is not None:
+        other = [
+            option for option, given in (
+                ('--top', args_ns.top is not None),
+                ('--html', args_ns.html is not None),
+                ('--interactive', args_ns.interactive),
+                ('--batch', args_ns.batch is not None),
+            ) if given
+        ]
+        if args_ns.format != 'markdown' or other:
+            argparser.error(
+                '--max-bytes requires --format markdown' + (
+                    f' and cannot be combined with {", ".join(other)}'
+                    if other else ''
+                )
+            )
+
+
+def _output(args_ns: Namespace, base: str, tree: CovNode) -> None:
+    """Show the tree as requested."""
     color = cov_color if args_ns.color else None
-    if args_ns.threshold is None:
-        descend = None
-    else:
-        def func(n: CovNode) -> bool:
-            return n.coverage < args_ns.threshold / 100
-        descend = func
+    sources = _get_sources(base) if args_ns.show_source else None
+    descend = _get_descend(tree, args_ns.threshold, args_ns.max_rows)
 
-    try:
-        _, tree = build_cov_tree(args_ns.coverage_file)
+    if args_ns.interactive:
+        from .interactive import run
+        run(tree)
+    elif args_ns.html is not None:
+        from .html_report import write_html
+        # --jobs is the number of processes building the tree, the writers
+        # of the chunks are threads, which cheaply default to more
+        write_html(
+            tree, args_ns.html,
+            descend=descend,
+            show_missing=args_ns.show_missing,
+        )
+        print(os.path.join(args_ns.html, 'index.html'))
+    elif args_ns.top is not None:
+        print_top(
+            tree,
+            tree.top_k(
+                args_ns.top_by, args_ns.top,
+                min_statements=args_ns.min_statements,
+            ),
+            show_missing=args_ns.show_missing,
+            cov_color=color,
+            show_source=sources,
+        )
+    elif args_ns.format == 'markdown':
+        from .markdown import write_markdown
+        write_markdown(tree, sys.stdout, descend, args_ns.show_missing,
+                       max_bytes=args_ns.max_bytes)
+    elif args_ns.format == 'json':
+        import json
+        from .export import tree_to_dict
+        json.dump(tree_to_dict(tree, descend, args_ns.show_missing),
+                  sys.stdout, indent=2)
+        print()
+    else:
         print_tree(
             tree,
             show_missing=args_ns.show_missing,
@@ -28,17 +121,176 @@ def main(args: Sequence[str] | None = None) -> int:
             cov_color=color,
             tree_set=args_ns.set,
             descend=descend,
+            show_source=sources,
+            sort=args_ns.sort,
         )
-    except Exception as e:
-        print(e)
-        return 1
 
-    return 0
+
+class _ProgressLine:
+    """A live progress line of a build on a terminal (stderr)."""
+    # the minimal seconds between updates
+    interval = 0.1
+
+    def __init__(self, file: TextIO | None = None) -> None:
+        self._file = sys.stderr if file is None else file
+        self._last_update = 0.0
+        self._width = 0
+
+    def __call__(self, progress: BuildProgress) -> None:
+        now = time.monotonic()
+        if progress.done < progress.total and \
+                now - self._last_update < self.interval:
+            return
+        self._last_update = now
+
+        eta = progress.eta
+        eta_str = '-:--' if eta is None else \
+            f'{int(eta) // 60}:{int(eta) % 60:02d}'
+        line = (
+            f'{progress.fraction:4.0%} {progress.done:,d}/{progress.total:,d}'
+            f' files, ETA {eta_str}  {progress.path}'
+        )
+        import shutil
+        max_width = shutil.get_terminal_size().columns - 1
+        if len(line) > max_width:
+            line = line[:max(0, max_width - 3)] + '...'
+        self._file.write('\r' + line.ljust(self._width))
+        self._file.flush()
+        self._width = len(line)
+
+    def clear(self) -> None:
+        if self._width:
+            self._file.write('\r' + ' ' * self._width + '\r')
+            self._file.flush()
+            self._width = 0
+
+
+def _build_tree(args_ns: Namespace) -> tuple[str, CovNode]:
+    """Build the tree, restricted to a diff or grouped, as requested. Returns
+    the base directory of the tree and the tree."""
+    remapper = None
+    if args_ns.remap:
+        from .core.remap import PathRemapper, parse_remap_rule
+        remapper = PathRemapper(map(parse_remap_rule, args_ns.remap))
+    if args_ns.max_depth is not None:
+        if remapper is not None:
+            raise ValueError('--remap cannot be combined with --max-depth')
+        if args_ns.regions:
+            raise ValueError('--regions cannot be combined with --max-depth')
+        if args_ns.diff_from is not None:
+            raise ValueError('--diff-from cannot be combined with --max-depth')
+        if args_ns.group_by is not None:
+            raise ValueError('--group-by cannot be combined with --max-depth')
+        from .core.stream import summarize_cov_tree
+        base, tree = summarize_cov_tree(
+            args_ns.coverage_file, args_ns.max_depth,
+        )
+    else:
+        progress_line = _ProgressLine() if sys.stderr.isatty() else None
+        try:
+            base, tree = build_cov_tree(
+                args_ns.coverage_file,
+                shards=args_ns.jobs is not None,
+                max_workers=args_ns.jobs,
+                remapper=remapper,
+                progress=progress_line,
+                regions=args_ns.regions,
+            )
+        finally:
+            if progress_line is not None:
+                progress_line.clear()
+    if args_ns.diff_from is not None:
+        from .core.diff import parse_unified_diff, restrict_to_diff
+        with open(args_ns.diff_from) as f:
+            changed = parse_unified_diff(f.read())
+        tree = restrict_to_diff(tree, changed, base, args_ns.diff_root)
+    if args_ns.group_by is not None:
+        from .core.groups import read_codeowners, group_tree
+        tree = group_tree(
+            tree,
+            read_codeowners(args_ns.group_by),
+            _get_group_prefix(args_ns.group_by, base, tree),
+        )
+    return base, tree
+
+
+def _get_sources(base: str) -> SourceFiles:
+    from .core.source import SourceFiles
+    return SourceFiles(base)
+
+
+def _run_batch(args_ns: Namespace) -> int:
+    from .batch import read_manifest, run_batch
+
+    results = run_batch(
+        read_manifest(args_ns.batch),
+        args_ns.out_dir,
+        args_ns.format,
+        show_missing=args_ns.show_missing,
+        show_module_stats=args_ns.summarize,
+        threshold=(
+            None if args_ns.threshold is None else args_ns.threshold / 100
+        ),
+        max_workers=args_ns.jobs,
+    )
+    for result in results:
+        if result.error is None:
+            print(f'{result.cov_file} -> {result.out_file}')
+        else:
+            print(f'{result.cov_file}: {result.error}')
+    return 1 if any(result.error is not None for result in results) else 0
+
+
+def _get_group_prefix(rules_file: str, base: str, tree: CovNode) -> str:
+    """The path of the tree's root (of the base directory, if the root is
+    synthetic) relative to the repository of a CODEOWNERS file, which is either
+    in the root or in the `.github` or `docs` directory of the repository."""
+    repo = os.path.dirname(os.path.abspath(rules_file))
+    if os.path.basename(repo) in ('.github', 'docs'):
+        repo = os.path.dirname(repo)
+    tree_dir = os.path.abspath(os.path.join(base, *_source_path(tree, tree)))
+    try:
+        prefix = os.path.relpath(tree_dir, repo)
+    except ValueError:  # pragma: no cover
+        # on another drive
+        return ''
+    if prefix == os.curdir or prefix.startswith(os.pardir):
+        return ''
+    return prefix.replace(os.sep, '/')
+
+
+def _get_descend(
+        tree: CovNode,
+        threshold: float | None,
+        max_rows: int | None,
+) -> Callable[[CovNode], bool] | None:
+    """The collapsing by the threshold (in percent), lowered if needed to show
+    at most ``max_rows`` nodes."""
+    if threshold is None and max_rows is None:
+        return None
+
+    from .core.collapse import CollapseIndex
+    index = CollapseIndex(tree)
+    if threshold is not None:
+        threshold /= 100
+    if max_rows is not None:
+        max_threshold = index.max_threshold(max_rows)
+        if max_threshold is not None and (
+                threshold is None or max_threshold < threshold):
+            threshold = max_threshold
+    if threshold is None:
+        return None
+    return index.descend(threshold)
 
 
 def get_arg_parser() -> ArgumentParser:
+    from .batch import get_available_formats
+
     argparser = ArgumentParser(
         'cov-tree [coverage-file]',
+        epilog='Further commands: ' + ', '.join(
+            f'`cov-tree {name}`' for name in _SUB_COMMANDS
+        ) + ' (see their --help).',
     )
 
     argparser.add_argument(
@@ -52,14 +304,52 @@ def get_arg_parser() -> ArgumentParser:
         help='If the coverage is at least this high (measured in percent), '
         'collapse the folder / sub-module into a single line.',
     )
+    argparser.add_argument(
+        '--max-rows', metavar='N', required=False, default=None, type=int,
+        help='Collapse folders / sub-modules (the best covered first) until '
+        'the tree has at most N rows. Can be combined with --threshold.',
+    )
     argparser.add_argument(
         '-m', '--show-missing', action='store_true',
         help='Show the missing lines.',
     )
+    argparser.add_argument(
+        '--show-source', action='store_true',
+        help='Print the missed source lines below each file.',
+    )
     argparser.add_argument(
         '-s', '--summarize', action='store_true',
         help='Show per sub-module summaries.',
     )
+    argparser.add_argument(
+        '-i', '--interactive', action='store_true',
+        help='Browse the tree in an interactive terminal viewer.',
+    )
+    argparser.add_argument(
+        '--html', metavar='DIR', default=None,
+        help='Write a collapsible HTML tree report to DIR, which loads the '
+        'data of each sub-module when it is expanded.',
+    )
+    argparser.add_argument(
+        '--top', metavar='K', default=None, type=int,
+        help='Instead of the tree, only list the K worst files.',
+    )
+    argparser.add_argument(
+        '--top-by', default='missed',
+        choices=get_available_sort_keys(),
+        help='The criterion for --top: most missed lines, lowest coverage or '
+        'most statements.',
+    )
+    argparser.add_argument(
+        '--min-statements', metavar='N', default=0, type=int,
+        help='Only consider files with at least N statements for --top.',
+    )
+    argparser.add_argument(
+        '--sort', default=None,
+        choices=get_available_sort_keys(),
+        help='Order the children of each module by the criterion, the worst '
+        'first, instead of by name.',
+    )
     argparser.add_argument(
         '--set', default='fancy',
         choices=get_available_tree_sets(),
@@ -75,6 +365,65 @@ def get_arg_parser() -> ArgumentParser:
         'the ooption use last is relevant.)',
     )
 
+    argparser.add_argument(
+        '--diff-from', metavar='PATCH', default=None,
+        help='Only report the lines added or changed by the given unified '
+        'diff (e.g. from `git diff`).',
+    )
+    argparser.add_argument(
+        '--diff-root', metavar='DIR', default=None,
+        help='The directory the paths in the diff of --diff-from are relative '
+        'to. Defaults to the git repository of the measured files, else the '
+        'current directory.',
+    )
+    argparser.add_argument(
+        '--remap', metavar='CANONICAL=ALIAS[,ALIAS...]', action='append',
+        default=[],
+        help='Remap measured paths starting with one of the aliases (which '
+        'may contain wildcards, e.g. /builds/*/src) to the canonical local '
+        'path, merging the files of several machines. Can be repeated.',
+    )
+    argparser.add_argument(
+        '--group-by', metavar='CODEOWNERS', default=None,
+        help='Instead of by directories, roll up the coverage by the groups '
+        'of a CODEOWNERS file (lines of a glob pattern and the group).',
+    )
+    argparser.add_argument(
+        '--regions', action='store_true',
+        help='Split the files into nodes of their top-level classes and '
+        'functions and their methods.',
+    )
+    argparser.add_argument(
+        '-d', '--max-depth', metavar='N', default=None, type=int,
+        help='Only show the tree up to depth N (the root having depth 0). The '
+        'tree is built streamed, keeping no line data below this depth.',
+    )
+    argparser.add_argument(
+        '-j', '--jobs', metavar='N', default=None, type=int,
+        help='Build the top-level sub-trees in N parallel processes.',
+    )
+
+    argparser.add_argument(
+        '--batch', metavar='MANIFEST', default=None,
+        help='Write the reports of all coverage files listed in the manifest '
+        '(one per line, optionally followed by the report name) to --out-dir '
+        'in one process (or --jobs processes), sharing the analysis of common '
+        'source files.',
+    )
+    argparser.add_argument(
+        '--out-dir', metavar='DIR', default='reports',
+        help='The directory for the reports of --batch.',
+    )
+    argparser.add_argument(
+        '--format', default='text', choices=get_available_formats(),
+        help='The output format, also of the reports of --batch.',
+    )
+    argparser.add_argument(
+        '--max-bytes', metavar='N', default=None, type=int,
+        help='Collapse the output of --format markdown to the deepest level '
+        'that fits into N bytes (e.g. for comments on pull requests).',
+    )
+
     argparser.add_argument(
         '-v', '--version', action='version',
         version=f'version {__version__}',
@@ -1,3 +1,89 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+import importlib
+
 from .tools import missed_lines_str
 from .node import Path, PathLike, CovNode, CovModule, CovFile
+from .node import get_available_sort_keys
 from .builder import build_cov_tree
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .analysis import AnalysisCache
+    from .progress import BuildProgress, CancelToken, BuildCancelled
+    from .collapse import CollapseIndex
+    from .diff import IntervalIndex, parse_unified_diff, restrict_to_diff
+    from .stream import CovSummary, stream_cov_tree, summarize_cov_tree
+    from .snapshot import save_tree, load_tree, open_tree, tree_to_bytes
+    from .snapshot import tree_from_bytes
+    from .async_builder import build_cov_tree_async
+    from .remap import PathRemapper
+    from .frozen import FrozenNode, FrozenModule, FrozenFile
+    from .frozen import AtomicTree, freeze, thaw
+    from .merge import merge_trees
+    from .groups import GroupRules, read_codeowners, group_tree
+    from .source import SourceFiles
+    from .regions import CovRegion, RegionIndex, RegionCache, split_regions
+    from .merkle import TreeChange, compare_trees, RenderCache
+
+
+# attributes imported on first access only, as they need slow imports or
+# are not needed by the command line tool by default
+_LAZY_ATTRS = {
+    'AnalysisCache': ('.analysis', 'AnalysisCache'),
+    **{
+        name: ('.progress', name)
+        for name in ('BuildProgress', 'CancelToken', 'BuildCancelled')
+    },
+    'CollapseIndex': ('.collapse', 'CollapseIndex'),
+    **{
+        name: ('.diff', name)
+        for name in ('IntervalIndex', 'parse_unified_diff', 'restrict_to_diff')
+    },
+    **{
+        name: ('.stream', name)
+        for name in ('CovSummary', 'stream_cov_tree', 'summarize_cov_tree')
+    },
+    **{
+        name: ('.snapshot', name)
+        for name in ('save_tree', 'load_tree', 'open_tree', 'tree_to_bytes',
+                     'tree_from_bytes')
+    },
+    'build_cov_tree_async': ('.async_builder', 'build_cov_tree_async'),
+    'PathRemapper': ('.remap', 'PathRemapper'),
+    **{
+        name: ('.frozen', name)
+        for name in ('FrozenNode', 'FrozenModule', 'FrozenFile', 'AtomicTree',
+                     'freeze', 'thaw')
+    },
+    'merge_trees': ('.merge', 'merge_trees'),
+    **{
+        name: ('.groups', name)
+        for name in ('GroupRules', 'read_codeowners', 'group_tree')
+    },
+    'SourceFiles': ('.source', 'SourceFiles'),
+    **{
+        name: ('.regions', name)
+        for name in ('CovRegion', 'RegionIndex', 'RegionCache',
+                     'split_regions')
+    },
+    **{
+        name: ('.merkle', name)
+        for name in ('TreeChange', 'compare_trees', 'RenderCache')
+    },
+}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module, attr = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
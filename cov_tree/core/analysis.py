@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+import os
+if TYPE_CHECKING:  # pragma: no cover
+    from coverage import Coverage  # type: ignore
+
+
+class AnalysisCache:
+    """A cache of the static analysis of source files, to be shared by the
+    builds of several coverage files.
+
+    Finding the statements and excluded lines of a source file means parsing
+    it, which is the expensive part of building a tree. This only depends on
+    the source (and the exclusion rules of the configuration), not on the
+    coverage data. Hence, the results are cached by the hash of the source,
+    and reused for any coverage file that measured the same source, also at
+    another path (e.g. vendored copies in several services). The hashes are
+    cached by the path of the source file and its modification time and size,
+    such that unchanged files are not read again.
+    """
+    def __init__(self) -> None:
+        self._hashes: dict[tuple[str, int, int], bytes] = {}
+        self._entries: dict[
+            bytes, tuple[Any, frozenset[int], frozenset[int]]
+        ] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """The number of analysed sources."""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._hashes.clear()
+        self._entries.clear()
+
+    def _hash(self, source: str) -> bytes:
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+        try:
+            return self._hashes[key]
+        except KeyError:
+            pass
+        # hashlib is rather slow to import, and only needed for builds
+        import hashlib
+        with open(source, 'rb') as f:
+            digest = hashlib.sha1(f.read()).digest()
+        self._hashes[key] = digest
+        return digest
+
+    def analyse(
+            self,
+            cov: Coverage,
+            path: str,
+            *more_paths: str,
+            source: str | None = None,
+    ) -> tuple[set[int], set[int], set[int]]:
+        """Analyse a measured file, like ``cov.analysis2(path)``.
+
+        Args:
+            cov: A :class:`coverage.Coverage` object with the data.
+            path: The path of the file as measured in the data.
+            more_paths: Further paths the same file was measured at (e.g. on
+                        other machines). A line is covered if it was executed
+                        at any of the paths.
+            source: The path of the source file to analyse, if it is not
+                    ``path``.
+
+        Returns:
+            The executable, the skipped (excluded) and the missed lines.
+        """
+        if source is None:
+            source = path
+        key = self._hash(source)
+        try:
+            reporter, statements, excluded = self._entries[key]
+            self.hits += 1
+        except KeyError:
+            reporter = cov._get_file_reporter(source)
+            statements = frozenset(reporter.lines())
+            excluded = frozenset(reporter.excluded_lines())
+            self._entries[key] = reporter, statements, excluded
+            self.misses += 1
+
+        data = cov.get_data()
+        executed: set[int] = set()
+        for measured in (path,) + more_paths:
+            executed |= reporter.translate_lines(data.lines(measured) or [])
+        return set(statements), set(excluded), set(statements - executed)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from concurrent.futures import Executor
+import asyncio
+import os
+import weakref
+
+from .node import Path, CovNode, CovModule, _ROOT_NAME
+from .builder import _read_coverage, _build_leaf, _collapse_root
+from .progress import BuildProgress, ProgressCallback, CancelToken
+from .progress import _ProgressTracker
+if TYPE_CHECKING:  # pragma: no cover
+    from coverage import Coverage  # type: ignore
+
+
+class _InFlightBuild:
+    """A build shared by all coroutines requesting the same coverage file."""
+    def __init__(self) -> None:
+        self.task: asyncio.Task[tuple[str, CovNode]] | None = None
+        self.num_waiters = 0
+        self.progress_callbacks: list[ProgressCallback] = []
+
+    def report_progress(self, progress: BuildProgress) -> None:
+        for callback in self.progress_callbacks:
+            callback(progress)
+
+
+_IN_FLIGHT: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop,
+    dict[tuple[str, bool, CancelToken | None], _InFlightBuild],
+] = weakref.WeakKeyDictionary()
+
+
+async def build_cov_tree_async(
+        cov_file: str = ".coverage",
+        drop_ext: bool = False,
+        batch_size: int = 100,
+        executor: Executor | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+) -> tuple[str, CovNode]:
+    """Build a coverage tree from a coverage file without blocking the event
+    loop, see :func:`~build_cov_tree`.
+
+    Reading the coverage file and analysing the measured files is done in the
+    executor, in batches of files, such that the event loop can run other tasks
+    in between. Concurrent calls for the same coverage file (and options and
+    cancel token) share a single build and hence get the very same tree.
+
+    If the (last) caller waiting for a build is cancelled, the build is
+    cancelled after the batch currently analysed.
+
+    Args:
+        cov_file: The path to the coverage file created by `coverage`.
+        drop_ext: Drop file extenstions for the node names.
+        batch_size: The number of files analysed per executor call.
+        executor: The executor to use. Defaults to the default executor of the
+                  event loop.
+        progress: A callback called before the first and after each batch
+                  of files with the :class:`~BuildProgress` (whose path is the
+                  last file of the batch).
+        cancel: A token to cancel the build (e.g. from another thread). It is
+                checked before analysing each batch.
+
+    Returns:
+        A tuple of the path to the root node and the root node of the tree.
+
+    Raises:
+        BuildCancelled: If the build was cancelled with the token.
+    """
+    if batch_size < 1:
+        raise ValueError(f'Batch size must be positive, got {batch_size}')
+
+    loop = asyncio.get_running_loop()
+    in_flight = _IN_FLIGHT.setdefault(loop, {})
+    key = (os.path.abspath(cov_file), drop_ext, cancel)
+
+    build = in_flight.get(key)
+    if build is None:
+        build = _InFlightBuild()
+        build.task = loop.create_task(_build(
+            cov_file, drop_ext, batch_size, executor, build.report_progress,
+            cancel,
+        ))
+        in_flight[key] = build
+        build.task.add_done_callback(lambda _: in_flight.pop(key, None))
+    assert build.task is not None
+
+    if progress is not None:
+        build.progress_callbacks.append(progress)
+    build.num_waiters += 1
+    try:
+        return await asyncio.shield(build.task)
+    except asyncio.CancelledError:
+        if build.num_waiters == 1:
+            build.task.cancel()
+        raise
+    finally:
+        build.num_waiters -= 1
+        if progress is not None:
+            build.progress_callbacks.remove(progress)
+
+
+async def _build(
+        cov_file: str,
+        drop_ext: bool,
+        batch_size: int,
+        executor: Executor | None,
+        progress: ProgressCallback,
+        cancel: CancelToken | None,
+) -> tuple[str, CovNode]:
+    loop = asyncio.get_running_loop()
+    cov, files = await loop.run_in_executor(executor, _read_files, cov_file)
+
+    root: CovNode = CovModule(name=_ROOT_NAME)
+    tracker = _ProgressTracker(len(files), progress, cancel)
+    for start in range(0, len(files), batch_size):
+        tracker.check()
+        batch = files[start:start + batch_size]
+        leaves = await loop.run_in_executor(
+            executor, _build_leaves, cov, batch, drop_ext,
+        )
+        for path, leaf in leaves:
+            root.insert_child(leaf, path)
+        tracker.advance(batch[-1], len(batch))
+
+    return _collapse_root(root)
+
+
+def _read_files(cov_file: str) -> tuple[Coverage, list[str]]:
+    cov = _read_coverage(cov_file)
+    return cov, sorted(cov.get_data().measured_files())
+
+
+def _build_leaves(
+        cov: Coverage,
+        files: list[str],
+        drop_ext: bool,
+) -> list[tuple[Path, CovNode]]:
+    return [_build_leaf(cov, full_path, drop_ext) for full_path in files]
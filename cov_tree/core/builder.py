@@ -1,13 +1,28 @@
 from __future__ import annotations
+from typing import Sequence, TYPE_CHECKING
 import os
-import coverage  # type: ignore
+import sys
 
-from .node import CovNode, CovModule, CovFile
+from .node import Path, CovNode, CovModule, CovFile, _ROOT_NAME
+if TYPE_CHECKING:  # pragma: no cover
+    from coverage import Coverage  # type: ignore
+    from .analysis import AnalysisCache
+    from .progress import ProgressCallback, CancelToken
+    from .remap import PathRemapper
+    from .regions import RegionCache
 
 
 def build_cov_tree(
         cov_file: str = ".coverage",
         drop_ext: bool = False,
+        shards: bool = False,
+        max_workers: int | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        remapper: PathRemapper | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        regions: bool = False,
+        region_cache: RegionCache | None = None,
 ) -> tuple[str, CovNode]:
     """Build a coverage tree from a coverage file.
 
@@ -16,24 +31,147 @@ def build_cov_tree(
                   This typically is `.coverage`.
         drop_ext: Drop file extenstions for the node names (e.g. use 'module'
                   for the file 'module.py').
+        shards: Build each top-level subtree as an independent shard in a
+                separate worker process. The shards are loaded lazily, see
+                :func:`~cov_tree.core.shard.build_sharded_cov_tree`.
+        max_workers: The maximum number of worker processes for sharded
+                     builds. Defaults to the number of CPUs.
+        analysis_cache: Reuse the static analysis of source files from
+                        previous builds (e.g. of other coverage files of the
+                        same sources). Not used for sharded builds.
+        remapper: Remap the measured paths, e.g. of other machines, to local
+                  paths (see :class:`~cov_tree.core.remap.PathRemapper`).
+                  Files measured at several paths mapped to the same local
+                  file are merged, a line being covered if it was covered at
+                  any of them. Not supported for sharded builds.
+        progress: A callback called before the first and after each analysed
+                  file (or shard) with the :class:`~BuildProgress`.
+        cancel: A token to cancel the build (e.g. from another thread). It is
+                checked before analysing each file; sharded builds also stop
+                their workers.
+        regions: Split each Python file into the regions of its top-level
+                 classes and functions and its methods (see
+                 :func:`~cov_tree.core.regions.split_regions`), i.e. the file
+                 becomes a module with the regions as children. Not supported
+                 for sharded builds.
+        region_cache: Reuse the regions of sources from previous builds, if
+                      building with ``regions``.
 
     Returns:
         A tuple of the path to the root node and the root node of the tree.
+
+    Raises:
+        BuildCancelled: If the build was cancelled.
     """
+    if shards:
+        if remapper is not None:
+            raise ValueError('Remapping paths is not supported for sharded '
+                             'builds')
+        if regions:
+            raise ValueError('Regions are not supported for sharded builds')
+        from .shard import build_sharded_cov_tree
+        return build_sharded_cov_tree(
+            cov_file, drop_ext, max_workers, progress, cancel,
+        )
+
+    from .progress import _ProgressTracker
+
+    cov = _read_coverage(cov_file)
+    files = _local_files(cov, remapper)
+    if remapper is not None and analysis_cache is None:
+        from .analysis import AnalysisCache
+        analysis_cache = AnalysisCache()
+    if regions:
+        from .regions import RegionCache, split_regions
+        if region_cache is None:
+            region_cache = RegionCache()
+
+    # build the tree
+    root: CovNode = CovModule(name=_ROOT_NAME)
+    tracker = _ProgressTracker(len(files), progress, cancel)
+    for full_path, measured_paths in files:
+        tracker.check()
+        path, leaf = _build_leaf(
+            cov, full_path, drop_ext, analysis_cache, measured_paths,
+        )
+        if regions:
+            assert isinstance(leaf, CovFile) and region_cache is not None
+            leaf = split_regions(leaf, full_path, region_cache)
+        root.insert_child(leaf, path)
+        tracker.advance(full_path)
+    return _collapse_root(root)
+
+
+def _local_files(
+        cov: Coverage,
+        remapper: PathRemapper | None,
+) -> list[tuple[str, Sequence[str]]]:
+    """The sorted local files with the paths they were measured at, if
+    remapped."""
+    measured_files = cov.get_data().measured_files()
+    if remapper is None:
+        return [(full_path, ()) for full_path in sorted(measured_files)]
+    remapped: dict[str, list[str]] = {}
+    for measured in sorted(measured_files):
+        remapped.setdefault(remapper.remap(measured), []).append(measured)
+    return sorted(remapped.items())
+
+
+def _read_coverage(cov_file: str) -> Coverage:
+    # importing coverage is slow, hence only do so when actually needed
+    import coverage  # type: ignore
+
     # read the coverage file
     cov = coverage.Coverage(data_file=None)
     cov.combine([cov_file], strict=True, keep=True)
-    cov_data = cov.get_data()
+    if not all(map(os.path.isabs, cov.get_data().measured_files())):
+        # measured with `relative_files`, i.e. relative to the current
+        # directory, which coverage only resolves when reading the file so
+        cov = coverage.Coverage(data_file=None)
+        cov.set_option('run:relative_files', True)
+        cov.combine([cov_file], strict=True, keep=True)
+    return cov
 
-    # build the tree
-    root: CovNode = CovModule(name="<root>")
-    for full_path in sorted(cov_data.measured_files()):
-        *path, name = os.path.normpath(full_path).split(os.sep)
-        if drop_ext:
-            name, _ = os.path.splitext(name)
+
+def _build_leaf(
+        cov: Coverage,
+        full_path: str,
+        drop_ext: bool,
+        analysis_cache: AnalysisCache | None = None,
+        measured_paths: Sequence[str] = (),
+) -> tuple[Path, CovNode]:
+    """Analyse a measured file and return its path in the tree (without the
+    file name) together with its leaf node. If the file was measured at other
+    paths, these are given as ``measured_paths`` (which needs a cache)."""
+    # the same names (e.g. '__init__.py') occur in many places of a tree,
+    # hence the names are interned to store each of them once
+    *path, name = map(sys.intern, os.path.normpath(full_path).split(os.sep))
+    if drop_ext:
+        name = sys.intern(os.path.splitext(name)[0])
+    if analysis_cache is None:
         leaf = CovFile.from_coverage(cov, full_path, name)
-        root.insert_child(leaf, path)
+    else:
+        executable, skipped, missed = analysis_cache.analyse(
+            cov, *(measured_paths or (full_path,)), source=full_path,
+        )
+        leaf = CovFile(name, executable, skipped, missed)
+    return tuple(path), leaf
+
+
+def _common_prefix_len(paths: list[list[str]]) -> int:
+    """The length of the longest common prefix of the split paths."""
+    if not paths:
+        return 0
+    first, last = min(paths), max(paths)
+    length = 0
+    for a, b in zip(first, last):
+        if a != b:
+            break
+        length += 1
+    return length
+
 
+def _collapse_root(root: CovNode) -> tuple[str, CovNode]:
     # clean the linear tree until the first splitting node
     # ... but remember the path to this new root node
     base = []
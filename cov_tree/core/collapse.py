@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import Callable, Iterable
+from bisect import bisect_left
+
+from .node import CovNode
+
+
+class CollapseIndex:
+    """Precomputed collapsing of a tree by a coverage threshold.
+
+    Modules with a coverage of at least the threshold are collapsed, i.e. a
+    node is descended into iff its coverage is below the threshold (this is the
+    ``--threshold`` of the command line tool).
+
+    A single traversal stores the coverage of each node and the maximal
+    coverage among its ancestors. A node is shown for a threshold iff all of
+    its ancestors are descended into, i.e. iff the threshold is larger than
+    this maximum. With these maxima sorted, the number of shown rows for any
+    threshold is a binary search.
+
+    The index needs to be re-created if the tree is modified.
+
+    Args:
+        tree: The tree to index.
+    """
+    def __init__(self, tree: CovNode) -> None:
+        self.tree = tree
+        self._coverage: dict[int, float] = {}
+        ancestor_max: list[float] = []
+
+        stack: list[tuple[CovNode, float]] = [(tree, float('-inf'))]
+        while stack:
+            node, max_cov = stack.pop()
+            ancestor_max.append(max_cov)
+            cov = node.coverage
+            self._coverage[id(node)] = cov
+            max_cov = max(max_cov, cov)
+            stack.extend((child, max_cov) for child in node.children)
+
+        ancestor_max.sort()
+        self._ancestor_max = ancestor_max
+
+    def __len__(self) -> int:
+        return len(self._ancestor_max)
+
+    def descend(self, threshold: float) -> Callable[[CovNode], bool]:
+        """A predicate for the ``descend`` arguments of
+        :func:`~cov_tree.print_tree` and :meth:`CovNode.iter_tree`.
+
+        Args:
+            threshold: Collapse modules with at least this coverage (given as
+                       fraction, not in percent).
+
+        Returns:
+            A function returning whether to descend into a node of the tree.
+        """
+        expanded = frozenset(
+            node_id
+            for node_id, cov in self._coverage.items()
+            if cov < threshold
+        )
+        return lambda node: id(node) in expanded
+
+    def num_rows(self, threshold: float) -> int:
+        """The number of nodes shown with the given threshold."""
+        return bisect_left(self._ancestor_max, threshold)
+
+    def num_rows_many(self, thresholds: Iterable[float]) -> list[int]:
+        """The number of nodes shown for each of the given thresholds."""
+        return [self.num_rows(threshold) for threshold in thresholds]
+
+    def max_threshold(self, max_rows: int) -> float | None:
+        """The largest threshold (i.e. the least collapsing) for which at most
+        ``max_rows`` nodes are shown.
+
+        Args:
+            max_rows: The maximal number of nodes to show.
+
+        Returns:
+            The threshold or None, if the entire tree fits.
+
+        Raises:
+            ValueError: If not even the root would fit.
+        """
+        if max_rows < 1:
+            raise ValueError('At least the root node needs to be shown')
+        if max_rows >= len(self._ancestor_max):
+            return None
+        return self._ancestor_max[max_rows]
@@ -0,0 +1,210 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, Mapping
+from bisect import bisect_right
+import os
+import re
+
+from .node import CovNode, CovModule, CovFile, _source_path
+from .stream import _CollapsedModule
+from .regions import CovRegion
+
+
+_HUNK_RE = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class IntervalIndex:
+    """A sorted index of disjoint, inclusive line intervals.
+
+    Args:
+        intervals: The (possibly overlapping) intervals as tuples of the first
+                   and the last line.
+    """
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()) -> None:
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        for start, end in sorted(intervals):
+            if end < start:
+                continue
+            if self._ends and start <= self._ends[-1] + 1:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    @property
+    def intervals(self) -> list[tuple[int, int]]:
+        """The merged intervals."""
+        return list(zip(self._starts, self._ends))
+
+    def __len__(self) -> int:
+        """The number of lines in the intervals."""
+        return sum(e - s + 1 for s, e in zip(self._starts, self._ends))
+
+    def __contains__(self, line: object) -> bool:
+        if not isinstance(line, int):
+            return False
+        idx = bisect_right(self._starts, line) - 1
+        return idx >= 0 and line <= self._ends[idx]
+
+    def intersect(self, lines: Iterable[int]) -> set[int]:
+        """The given lines which are in one of the intervals."""
+        return {line for line in lines if line in self}
+
+
+def parse_unified_diff(text: str) -> dict[str, IntervalIndex]:
+    """Find the added or changed lines of the new files in a unified diff (as
+    created by ``git diff`` or ``diff -u``).
+
+    Args:
+        text: The diff.
+
+    Returns:
+        A mapping from the (new) file paths, as given in the diff without a
+        ``b/`` prefix, to the intervals of the added lines. Deleted files are
+        not included.
+    """
+    changed: dict[str, list[tuple[int, int]]] = {}
+    ranges: list[tuple[int, int]] | None = None
+    lines = iter(text.splitlines())
+    for line in lines:
+        if line.startswith('+++ '):
+            path = line[4:].split('\t')[0].strip()
+            if path == '/dev/null':
+                ranges = None
+                continue
+            if path.startswith('b/'):
+                path = path[2:]
+            ranges = changed.setdefault(path, [])
+            continue
+        match = _HUNK_RE.match(line)
+        if match:
+            _read_hunk(lines, match, [] if ranges is None else ranges)
+
+    return {path: IntervalIndex(r) for path, r in changed.items()}
+
+
+def _read_hunk(
+        lines: Iterator[str],
+        header: re.Match[str],
+        ranges: list[tuple[int, int]],
+) -> None:
+    """Read the lines of a hunk and add the added lines to ``ranges``.
+
+    The end of the hunk is found by the numbers of lines in its header, as
+    added lines can look like headers (e.g. ``+++ x`` for an added ``++ x``).
+    """
+    old_left = int(header.group(1) or 1)
+    line_no = int(header.group(2))
+    new_left = int(header.group(3) or 1)
+    while old_left > 0 or new_left > 0:
+        line = next(lines, None)
+        if line is None:
+            return
+        if line.startswith('+'):
+            if ranges and ranges[-1][1] == line_no - 1:
+                ranges[-1] = (ranges[-1][0], line_no)
+            else:
+                ranges.append((line_no, line_no))
+            line_no += 1
+            new_left -= 1
+        elif line.startswith('-'):
+            old_left -= 1
+        elif not line.startswith('\\'):
+            # a context line (possibly stripped of its leading space)
+            line_no += 1
+            old_left -= 1
+            new_left -= 1
+
+
+def _split(path: str) -> tuple[str, ...]:
+    return tuple(
+        part
+        for part in os.path.normpath(path).replace('\\', '/').split('/')
+        if part and part != '.'
+    )
+
+
+def find_repo_root(path: str) -> str | None:
+    """The top-level directory of the git repository containing a path (i.e.
+    the directory the paths in ``git diff`` are relative to), None if the path
+    is not in a repository."""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def restrict_to_diff(
+        tree: CovNode,
+        changed: Mapping[str, IntervalIndex],
+        base: str = '',
+        root: str | None = None,
+) -> CovNode:
+    """Create a tree of only the changed lines.
+
+    The paths in ``changed`` are relative to the ``root`` directory, e.g. of
+    the repository. A file in the tree matches a path of ``changed``, if its
+    full path (i.e. ``base`` joined with its path in the tree, without a
+    synthetic ``<root>`` node) is the changed path joined to ``root``.
+
+    Args:
+        tree: The coverage tree.
+        changed: The changed lines per file, e.g. from
+                 :func:`~parse_unified_diff`.
+        base: The path to the root of the tree, as returned by
+              :func:`~cov_tree.build_cov_tree`.
+        root: The directory the paths in ``changed`` are relative to. Defaults
+              to the git repository containing the root of the tree (see
+              :func:`~find_repo_root`), else the current directory.
+
+    Returns:
+        A new tree with the same root, containing only the changed files (or
+        the regions of changed files). Their executable, skipped and missed
+        lines are restricted to the changed lines, hence all aggregates are
+        over the changed lines only.
+
+    Raises:
+        ValueError: If the tree has collapsed modules (whose lines are not
+                    known), e.g. from :func:`~cov_tree.summarize_cov_tree`.
+    """
+    if root is None:
+        tree_dir = os.path.join(base, *_source_path(tree, tree))
+        root = find_repo_root(tree_dir) or os.curdir
+    by_parts = {_split(path): index for path, index in changed.items()}
+    base_parts = _split(os.path.abspath(base))
+    root_parts = _split(os.path.abspath(root))
+    depth = tree.depth
+
+    diff_tree = CovModule(tree.name)
+    for node in tree.iter_tree():
+        if isinstance(node, _CollapsedModule):
+            raise ValueError(f'Cannot restrict the collapsed module '
+                             f'"{node.name}" to a diff')
+        if not isinstance(node, CovFile):
+            continue
+        path = node.path[depth:]
+        is_region = isinstance(node, CovRegion)
+        full_path = base_parts + _source_path(node, tree)
+        if full_path[:len(root_parts)] != root_parts:
+            continue
+        index = by_parts.get(full_path[len(root_parts):])
+        if index is None:
+            continue
+
+        executable = index.intersect(node.executable_lines)
+        skipped = index.intersect(node.skipped_lines)
+        # unlike files, unchanged regions of changed files are left out
+        if is_region and not executable and not skipped:
+            continue
+        missed = index.intersect(node.missed_lines)
+        diff_tree.insert_child(
+            (CovRegion if is_region else CovFile)(
+                node.name, executable, skipped, missed,
+            ),
+            path[1:-1],
+        )
+    return diff_tree
@@ -0,0 +1,436 @@
+from __future__ import annotations
+from typing import Any, Callable, Collection, Iterator
+import threading
+
+from .node import Path, PathLike, CovNode, CovModule, CovFile
+from .stream import _CollapsedModule
+from .regions import CovRegion
+from .tools import missed_lines_str
+
+
+class FrozenNode:
+    """An immutable node of a frozen coverage tree, see :func:`~freeze`.
+
+    Frozen nodes have no reference to their parent, hence a subtree can be
+    shared by any number of trees. Their aggregates are computed once when they
+    are created. Since a frozen tree cannot change, it can be read by any
+    number of threads without locking.
+
+    Changes create a new tree (see :meth:`~replace` and :meth:`~remove`) which
+    only copies the nodes on the path from the root to the change and shares
+    all other subtrees with the original tree. Pickling keeps the sharing
+    between the pickled trees.
+    """
+    __slots__ = ('_name', '_children', '_index', '_stats', '_num_nodes')
+
+    _name: str
+    _children: tuple['FrozenNode', ...]
+    _index: dict[str, int]
+    _stats: tuple[int, int, int]
+    _num_nodes: int
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def _init(
+            self,
+            name: str,
+            children: tuple['FrozenNode', ...],
+            stats: tuple[int, int, int],
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, '_name', name)
+        set_(self, '_children', children)
+        set_(self, '_index', {c._name: i for i, c in enumerate(children)})
+        set_(self, '_stats', stats)
+        set_(self, '_num_nodes', 1 + sum(c._num_nodes for c in children))
+
+    @property
+    def name(self) -> str:
+        """The (file-/directory-)name of this node."""
+        return self._name
+
+    @property
+    def is_leaf(self) -> bool:
+        """Whether this is a leaf node, i.e. an ordinary file."""
+        return not self._children
+
+    @property
+    def children(self) -> tuple['FrozenNode', ...]:
+        """A tuple to the (direct) children."""
+        return self._children
+
+    @property
+    def children_names(self) -> tuple[str, ...]:
+        return tuple(self._index)
+
+    @property
+    def num_children(self) -> int:
+        return len(self._children)
+
+    @property
+    def num_executable_lines(self) -> int:
+        return self._stats[0]
+
+    @property
+    def num_skipped_lines(self) -> int:
+        return self._stats[1]
+
+    @property
+    def num_missed_lines(self) -> int:
+        return self._stats[2]
+
+    @property
+    def num_total_lines(self) -> int:
+        return self._stats[0] + self._stats[1]
+
+    @property
+    def num_covered_lines(self) -> int:
+        return self._stats[0] - self._stats[2]
+
+    @property
+    def coverage(self) -> float:
+        """The coverage, see :attr:`CovNode.coverage`."""
+        if self._stats[0] == 0:
+            return 1.0
+        return 1 - self._stats[2] / self._stats[0]
+
+    def missed_lines_str(self, recursive: bool = True) -> str:
+        if not recursive:
+            return ''
+        missed: list[str] = []
+        for child in self._children:
+            child_miss = child.missed_lines_str(recursive)
+            if child_miss:
+                missed.append(f'[{child._name}: {child_miss}]')
+        return ', '.join(missed)
+
+    def get_child(self, name: str) -> 'FrozenNode':
+        """The the child with the given name."""
+        return self._children[self._index[name]]
+
+    def __getitem__(self, name: str) -> 'FrozenNode':
+        return self.get_child(name)
+
+    def get_node(self, path: PathLike) -> 'FrozenNode':
+        """The descendant at the given path (relative to this node)."""
+        node = self
+        for name in path:
+            node = node.get_child(name)
+        return node
+
+    def iter_tree(
+            self,
+            descend: Callable[['FrozenNode'], bool] | None = None,
+    ) -> Iterator['FrozenNode']:
+        """Iterator over all nodes in this tree in pre-order, see
+        :meth:`CovNode.iter_tree`."""
+        stack: list[FrozenNode] = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            if descend is None or descend(node):
+                stack.extend(reversed(node._children))
+
+    def __len__(self) -> int:
+        return self._num_nodes
+
+    def __repr__(self) -> str:
+        cov = self.coverage
+        return f'<{type(self).__name__} "{self._name}" {cov:.0%}>'
+
+    def replace(
+            self,
+            node: 'FrozenNode | CovNode',
+            at_path: PathLike = tuple(),
+    ) -> 'FrozenNode':
+        """Create a new tree with the given node inserted as a child of the
+        node at ``at_path``, replacing a child of the same name.
+
+        Only the nodes from this node to the changed one are copied, all other
+        subtrees are shared with this tree. Missing modules on the path are
+        created.
+
+        Args:
+            node: The node to insert. Mutable nodes are frozen first.
+            at_path: The path to the parent of the new node, relative to this
+                     node (i.e. not including its name).
+
+        Returns:
+            The root of the new tree.
+        """
+        if isinstance(node, CovNode):
+            node = freeze(node)
+        return self._update(tuple(at_path), node._name, node)
+
+    def remove(self, path: PathLike) -> 'FrozenNode':
+        """Create a new tree without the node at the given path (relative to
+        this node), copying only the nodes on the path, see :meth:`~replace`.
+
+        Raises:
+            KeyError: If there is no such node.
+        """
+        path = tuple(path)
+        if not path:
+            raise ValueError('Cannot remove the root')
+        self.get_node(path)
+        return self._update(path[:-1], path[-1], None)
+
+    def _update(
+            self,
+            at_path: Path,
+            name: str,
+            node: 'FrozenNode | None',
+    ) -> 'FrozenNode':
+        # walk down, remembering the nodes on the path
+        parents: list[FrozenNode | None] = []
+        current: FrozenNode | None = self
+        for module in at_path + (None,):
+            if isinstance(current, FrozenFile):
+                raise RuntimeError('Cannot insert a child to a file node!')
+            if isinstance(current, _FrozenCollapsedModule):
+                raise RuntimeError('Cannot insert a child to a collapsed '
+                                   'module!')
+            if module is None:
+                break
+            parents.append(current)
+            if current is not None and module in current._index:
+                current = current.get_child(module)
+            else:
+                current = None
+
+        # and copy them on the way up
+        names = (self._name,) + at_path
+        new = _with_child(current, names[-1], name, node)
+        for i in reversed(range(len(at_path))):
+            new = _with_child(parents[i], names[i], at_path[i], new)
+        return new
+
+    def thaw(self) -> CovNode:
+        """Create a mutable copy of this tree, see :func:`~thaw`."""
+        return thaw(self)
+
+
+class FrozenFile(FrozenNode):
+    """An immutable file node with frozen line sets."""
+    __slots__ = ('_executable_lines', '_skipped_lines', '_missed_lines')
+
+    _executable_lines: frozenset[int]
+    _skipped_lines: frozenset[int]
+    _missed_lines: frozenset[int]
+
+    def __init__(
+            self,
+            name: str,
+            executable_lines: Collection[int] = frozenset(),
+            skipped_lines: Collection[int] = frozenset(),
+            missed_lines: Collection[int] = frozenset(),
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, '_executable_lines', frozenset(executable_lines))
+        set_(self, '_skipped_lines', frozenset(skipped_lines))
+        set_(self, '_missed_lines', frozenset(missed_lines))
+        self._init(name, (), (
+            len(self._executable_lines),
+            len(self._skipped_lines),
+            len(self._missed_lines),
+        ))
+
+    @property
+    def executable_lines(self) -> frozenset[int]:
+        return self._executable_lines
+
+    @property
+    def skipped_lines(self) -> frozenset[int]:
+        return self._skipped_lines
+
+    @property
+    def missed_lines(self) -> frozenset[int]:
+        return self._missed_lines
+
+    def missed_lines_str(self, recursive: bool = True) -> str:
+        return missed_lines_str(self._missed_lines, self._executable_lines)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), (
+            self._name, self._executable_lines, self._skipped_lines,
+            self._missed_lines,
+        )
+
+
+class _FrozenRegion(FrozenFile):
+    """An immutable region node (see
+    :class:`~cov_tree.core.regions.CovRegion`)."""
+    __slots__ = ()
+
+
+class FrozenModule(FrozenNode):
+    """An immutable module node with the aggregates of its children."""
+    __slots__ = ()
+
+    def __init__(
+            self,
+            name: str,
+            children: Collection[FrozenNode] = (),
+    ) -> None:
+        children = tuple(children)
+        if len({child._name for child in children}) != len(children):
+            raise RuntimeError(f'Module "{name}" has several children with '
+                               f'the same name')
+        executable = skipped = missed = 0
+        for child in children:
+            executable += child._stats[0]
+            skipped += child._stats[1]
+            missed += child._stats[2]
+        self._init(name, children, (executable, skipped, missed))
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # pickled by their children, hence subtrees shared by the pickled
+        # trees stay shared
+        return type(self), (self._name, self._children)
+
+
+class _FrozenCollapsedModule(FrozenModule):
+    """An immutable module of which only the aggregates are kept, not its
+    children (see :class:`~cov_tree.core.stream._CollapsedModule`)."""
+    __slots__ = ()
+
+    def __init__(self, name: str, stats: tuple[int, int, int]) -> None:
+        self._init(name, (), stats)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), (self._name, self._stats)
+
+
+def _with_child(
+        module: FrozenNode | None,
+        module_name: str,
+        name: str,
+        child: FrozenNode | None,
+) -> FrozenNode:
+    """A copy of ``module`` (or a new module) with the child of the given name
+    replaced by ``child`` (or removed if it is None)."""
+    children = list(module._children) if module is not None else []
+    index = module._index.get(name) if module is not None else None
+    if index is None:
+        if child is not None:
+            children.append(child)
+    elif child is None:
+        del children[index]
+    else:
+        children[index] = child
+    return FrozenModule(module_name, children)
+
+
+def freeze(tree: CovNode) -> FrozenNode:
+    """Create an immutable copy of a tree.
+
+    Args:
+        tree: The (root of the) tree to freeze. It may be a subtree; the frozen
+              copy does not know about the parents.
+
+    Returns:
+        The root of the frozen tree.
+    """
+    # post-order without recursion: children are frozen before their parents
+    frozen: dict[int, FrozenNode] = {}
+    stack: list[tuple[CovNode, bool]] = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if isinstance(node, CovFile):
+            kind = _FrozenRegion if isinstance(node, CovRegion) else FrozenFile
+            frozen[id(node)] = kind(
+                node.name,
+                node.executable_lines,
+                node.skipped_lines,
+                node.missed_lines,
+            )
+        elif isinstance(node, _CollapsedModule):
+            frozen[id(node)] = _FrozenCollapsedModule(
+                node.name, node._fixed_stats,
+            )
+        elif visited:
+            frozen[id(node)] = FrozenModule(
+                node.name,
+                [frozen.pop(id(child)) for child in node.children],
+            )
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children)
+    return frozen[id(tree)]
+
+
+def thaw(tree: FrozenNode) -> CovNode:
+    """Create a mutable copy of a frozen tree.
+
+    Args:
+        tree: The root of the frozen tree.
+
+    Returns:
+        The root of a new tree of :class:`CovModule` and :class:`CovFile` (and
+        of the other kinds of nodes of the frozen tree, e.g. regions).
+    """
+    def copy(node: FrozenNode) -> CovNode:
+        if isinstance(node, FrozenFile):
+            kind = CovRegion if isinstance(node, _FrozenRegion) else CovFile
+            return kind(
+                node.name,
+                node.executable_lines,
+                node.skipped_lines,
+                node.missed_lines,
+                strict=False,
+            )
+        if isinstance(node, _FrozenCollapsedModule):
+            return _CollapsedModule(node.name, node._stats)
+        return CovModule(node.name)
+
+    root = copy(tree)
+    stack = [(tree, root)]
+    while stack:
+        frozen, node = stack.pop()
+        for frozen_child in frozen.children:
+            child = copy(frozen_child)
+            node.insert_child(child)
+            stack.append((frozen_child, child))
+    return root
+
+
+class AtomicTree:
+    """A holder of a frozen tree, which can be swapped atomically.
+
+    Readers get the current tree with :meth:`~get` (a single attribute read,
+    hence without locking) and keep using it, even if it is swapped in the
+    meantime. Writers either swap in a new tree or apply an update function;
+    updates are serialized by a lock, so that concurrent updates are not lost.
+
+    Args:
+        tree: The initial tree. Mutable trees are frozen first.
+    """
+    def __init__(self, tree: FrozenNode | CovNode) -> None:
+        self._tree = freeze(tree) if isinstance(tree, CovNode) else tree
+        self._lock = threading.Lock()
+
+    def get(self) -> FrozenNode:
+        """The current tree."""
+        return self._tree
+
+    def swap(self, tree: FrozenNode | CovNode) -> FrozenNode:
+        """Replace the tree, returns the previous one."""
+        if isinstance(tree, CovNode):
+            tree = freeze(tree)
+        with self._lock:
+            old, self._tree = self._tree, tree
+        return old
+
+    def update(
+            self,
+            func: Callable[[FrozenNode], FrozenNode],
+    ) -> FrozenNode:
+        """Replace the tree by ``func(tree)``, e.g. with
+        ``lambda t: t.replace(node, path)``. Returns the new tree."""
+        with self._lock:
+            self._tree = func(self._tree)
+            return self._tree
@@ -0,0 +1,166 @@
+from __future__ import annotations
+from typing import Iterable, Mapping, Union
+import re
+
+from .node import CovNode, CovModule, CovFile, _source_path
+from .stream import _CollapsedModule
+
+
+Rules = Union[
+    Mapping[str, Union[str, None]],
+    Iterable['tuple[str, str | None]'],
+]
+"""Glob rules given as pairs of pattern and group (None for no group)."""
+
+_GLOB_RE = re.compile(r'\*\*/|/\*\*$|\*\*|\*|\?|[^*?]+')
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a CODEOWNERS (gitignore-like) glob into a regex matching a
+    path relative to the root.
+
+    Patterns with a leading or inner '/' are anchored at the root, others match
+    at any level. A pattern matching a directory matches all its contents,
+    except for patterns like 'docs/*', which only match the files directly in
+    the directory.
+    """
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    if dir_only:
+        contents = '/.*'
+    elif pattern.endswith('/*'):
+        contents = ''
+    else:
+        contents = '(?:/.*)?'
+    pattern = pattern.lstrip('/')
+
+    parts = []
+    for token in _GLOB_RE.findall(pattern):
+        if token == '**/':
+            parts.append('(?:.*/)?')
+        elif token == '/**':
+            parts.append('/.*')
+        elif token == '**':
+            parts.append('.*')
+        elif token == '*':
+            parts.append('[^/]*')
+        elif token == '?':
+            parts.append('[^/]')
+        else:
+            parts.append(re.escape(token))
+
+    return (
+        ('' if anchored else '(?:.*/)?')
+        + ''.join(parts)
+        + contents
+    )
+
+
+class GroupRules:
+    """Glob rules mapping paths to groups, e.g. the code owners of files.
+
+    All rules are compiled into a single regular expression, with the rules in
+    reverse order, such that a path is matched in one go and the last matching
+    rule wins (as in CODEOWNERS files).
+
+    Args:
+        rules: The pairs of glob pattern and group. A group of None removes
+               the path from any group of previous rules.
+    """
+    def __init__(self, rules: Rules) -> None:
+        if isinstance(rules, Mapping):
+            rules = rules.items()
+        self._groups: list[str | None] = []
+        alternatives = []
+        for idx, (pattern, group) in enumerate(rules):
+            self._groups.append(group)
+            alternatives.append(f'(?P<r{idx}>{_glob_to_regex(pattern)})')
+        self._regex = re.compile('|'.join(reversed(alternatives)) or '(?!)')
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def group_of(self, path: str) -> str | None:
+        """The group of a path (relative to the root, separated by '/'), None
+        if no rule matches."""
+        match = self._regex.fullmatch(path)
+        if match is None or match.lastgroup is None:
+            return None
+        return self._groups[int(match.lastgroup[1:])]
+
+
+def read_codeowners(file: str) -> GroupRules:
+    """Read the rules of a CODEOWNERS file. The group of a rule are its owners
+    (separated by spaces), rules without owners remove any owners.
+
+    Args:
+        file: The path to the CODEOWNERS file.
+
+    Returns:
+        The compiled rules.
+    """
+    rules: list[tuple[str, str | None]] = []
+    with open(file) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            pattern, *owners = line.split()
+            rules.append((pattern, ' '.join(owners) or None))
+    return GroupRules(rules)
+
+
+def group_tree(
+        tree: CovNode,
+        rules: GroupRules | Rules,
+        prefix: str = '',
+        default: str = '<none>',
+) -> CovNode:
+    """Roll up the coverage of the files in a tree by groups.
+
+    Args:
+        tree: The coverage tree.
+        rules: The rules assigning files to groups.
+        prefix: The path of the root of the tree (of the base directory, if
+                the root is a synthetic ``<root>`` node) relative to the root
+                the rules refer to (e.g. 'src' if the tree is of the directory
+                'src' in the repository), separated by '/'.
+        default: The group of the files without a group.
+
+    Returns:
+        A tree with the same root name and one child per group (in the order
+        of their first file), which has the aggregates of the group's files.
+
+    Raises:
+        ValueError: If the tree has collapsed modules (whose files are not
+                    known), e.g. from :func:`~cov_tree.summarize_cov_tree`.
+    """
+    if not isinstance(rules, GroupRules):
+        rules = GroupRules(rules)
+    prefix = prefix.strip('/')
+    prefix = prefix + '/' if prefix else ''
+    # the paths of the files are relative to the root of the tree
+    root_len = len(_source_path(tree, tree))
+
+    stats: dict[str, list[int]] = {}
+    for node in tree.iter_tree():
+        if isinstance(node, _CollapsedModule):
+            raise ValueError(f'Cannot group the collapsed module '
+                             f'"{node.name}"')
+        if not isinstance(node, CovFile):
+            continue
+        path = prefix + '/'.join(_source_path(node, tree)[root_len:])
+        group = rules.group_of(path)
+        counts = stats.setdefault(default if group is None else group,
+                                  [0, 0, 0])
+        counts[0] += node.num_executable_lines
+        counts[1] += node.num_skipped_lines
+        counts[2] += node.num_missed_lines
+
+    root = CovModule(tree.name)
+    for group, (executable, skipped, missed) in stats.items():
+        root.insert_child(
+            _CollapsedModule(group, (executable, skipped, missed))
+        )
+    return root
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Iterator, Sequence
+import heapq
+import itertools
+
+from .node import CovNode, CovModule, CovFile
+from .stream import _CollapsedModule
+from .regions import CovRegion
+
+
+def _merge_files(files: Sequence[CovFile]) -> CovFile:
+    """A file (or region) with the union of the coverage of the given files."""
+    executable: set[int] = set()
+    covered: set[int] = set()
+    skipped: set[int] = set()
+    for file in files:
+        executable |= file.executable_lines
+        covered |= file.executable_lines - file.missed_lines
+        skipped |= file.skipped_lines
+    return (CovRegion if isinstance(files[0], CovRegion) else CovFile)(
+        files[0].name,
+        executable_lines=executable,
+        skipped_lines=skipped - executable,
+        missed_lines=executable - covered,
+    )
+
+
+def _join_children(
+        modules: Sequence[CovNode],
+) -> Iterator[list[CovNode]]:
+    """Merge join the children of the modules by name, yielding the lists of
+    children of the same name in sorted order."""
+    sorted_children = [
+        [(name, idx) for name in sorted(module.children_names)]
+        for idx, module in enumerate(modules)
+    ]
+    for _, group in itertools.groupby(
+            heapq.merge(*sorted_children), key=lambda item: item[0]):
+        yield [modules[idx][name] for name, idx in group]
+
+
+def merge_trees(tree: CovNode, *others: CovNode) -> CovNode:
+    """Merge coverage trees (e.g. from separate jobs) into a tree with the
+    union of their coverage.
+
+    The trees are merged by the paths of their nodes (relative to their
+    roots). A line of a file is executable, if it is executable in any of the
+    trees, and covered, if it is covered in any of them. The children of
+    modules are matched by a merge join of their sorted names, hence merging
+    ``N`` trees with ``F`` files each costs ``O(N F)`` (up to sorting).
+
+    Args:
+        tree: The first tree, which also gives the name of the root.
+        others: The trees to merge with it.
+
+    Returns:
+        A new tree of :class:`CovModule` and :class:`CovFile` nodes. The
+        children are in sorted order.
+
+    Raises:
+        ValueError: If a path is a file in one tree and a module in another, or
+                    if a tree has modules without their children (see
+                    :func:`~cov_tree.core.stream.summarize_cov_tree`).
+    """
+    trees = [tree, *others]
+    root: CovNode | None = None
+    # pairs of nodes of the same path and the parent of the merged node
+    stack: list[tuple[list[CovNode], CovNode | None]] = [(trees, None)]
+    while stack:
+        nodes, parent = stack.pop()
+        files = [node for node in nodes if isinstance(node, CovFile)]
+        if any(isinstance(node, _CollapsedModule) for node in nodes):
+            raise ValueError(f'Cannot merge the collapsed module '
+                             f'"{nodes[0].name}"')
+        if files and len(files) != len(nodes):
+            raise ValueError(f'"{nodes[0].name}" is a file in one tree and a '
+                             f'module in another')
+
+        merged = _merge_files(files) if files else CovModule(nodes[0].name)
+        if parent is None:
+            root = merged
+        else:
+            parent.insert_child(merged)
+        if not files:
+            stack.extend(
+                (children, merged)
+                for children in reversed(list(_join_children(nodes)))
+            )
+
+    assert root is not None
+    return root
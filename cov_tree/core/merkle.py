@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import Any, Callable, Hashable, Iterator, NamedTuple
+from collections import OrderedDict
+import threading
+
+from .node import Path, CovNode, CovModule
+from .stream import _CollapsedModule
+
+
+class TreeChange(NamedTuple):
+    """A changed, added or removed node of two compared trees."""
+    path: Path
+    """The names of the node and its ancestors below the roots."""
+    old: CovNode | None
+    """The node in the old tree, None if it was added."""
+    new: CovNode | None
+    """The node in the new tree, None if it was removed."""
+
+
+def _has_children(node: CovNode) -> bool:
+    return (
+        isinstance(node, CovModule)
+        and not isinstance(node, _CollapsedModule)
+    )
+
+
+def compare_trees(old: CovNode, new: CovNode) -> Iterator[TreeChange]:
+    """Yield the differences of two trees in tree order.
+
+    The trees are compared by the content hashes of their nodes (see
+    :attr:`~cov_tree.core.node.CovNode.content_hash`), descending only into
+    subtrees whose hashes differ. As the hashes are cached on the nodes, the
+    comparison of trees that have been hashed before only visits the changed
+    parts of the trees.
+
+    Args:
+        old: The root of the old tree.
+        new: The root of the new tree. The names of the roots are ignored.
+
+    Yields:
+        The changed files (and changed collapsed modules, and nodes that are a
+        file in one tree but a module in the other), and the added and removed
+        subtrees (as a single change of the root of the subtree each).
+    """
+    stack: list[tuple[Path, CovNode | None, CovNode | None]] = [
+        ((), old, new),
+    ]
+    while stack:
+        path, old_node, new_node = stack.pop()
+        if old_node is None or new_node is None:
+            yield TreeChange(path, old_node, new_node)
+            continue
+        if old_node.content_hash == new_node.content_hash:
+            continue
+        if not (_has_children(old_node) and _has_children(new_node)):
+            yield TreeChange(path, old_node, new_node)
+            continue
+        old_children = old_node._children
+        new_children = new_node._children
+        names = list(old_children)
+        names.extend(name for name in new_children if name not in old_children)
+        stack.extend(
+            (path + (name,), old_children.get(name), new_children.get(name))
+            for name in reversed(names)
+        )
+
+
+class RenderCache:
+    """A thread-safe LRU cache of rendered (sub-)trees, e.g. text or exports.
+
+    Renderings are keyed by the name and content hash of the tree and by the
+    render options. Hence, a subtree is rendered once for all trees in which
+    it is unchanged (e.g. after a coverage file was re-built).
+
+    Args:
+        maxsize: The maximum number of renderings to keep.
+    """
+    def __init__(self, maxsize: int = 256) -> None:
+        if maxsize < 1:
+            raise ValueError(f'Cache size must be positive, got {maxsize}')
+        self.maxsize = maxsize
+        self._renders: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._renders)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._renders.clear()
+
+    def get(
+            self,
+            tree: CovNode,
+            options: Hashable,
+            render: Callable[[CovNode], Any],
+    ) -> Any:
+        """Get the rendering of a tree, rendering it if needed.
+
+        Args:
+            tree: The (sub-)tree to render.
+            options: All options the rendering depends on (besides the tree),
+                     e.g. a tuple of the format and its settings.
+            render: The function rendering the tree (with these options).
+
+        Returns:
+            The (cached) return value of ``render(tree)``.
+        """
+        key = (tree.name, tree.content_hash, options)
+        with self._lock:
+            if key in self._renders:
+                self._renders.move_to_end(key)
+                self.hits += 1
+                return self._renders[key]
+            self.misses += 1
+
+        result = render(tree)
+        with self._lock:
+            self._renders[key] = result
+            while len(self._renders) > self.maxsize:
+                self._renders.popitem(last=False)
+        return result
@@ -6,11 +6,17 @@ else:
     from typing_extensions import TypeAlias  # pragma: no cover
     if sys.version_info < (3, 9):  # pragma: no cover
         from typing import Tuple
-from typing import Sequence, Collection, Iterator, Callable
+from typing import Sequence, Collection, Iterator, Callable, TYPE_CHECKING
+from typing import Any, cast
 from abc import ABC, abstractproperty, abstractmethod
+from array import array
+from types import MappingProxyType
+import heapq
 import os
-from coverage import Coverage  # type: ignore
-from coverage.types import TMorf  # type: ignore
+if TYPE_CHECKING:  # pragma: no cover
+    # importing coverage is slow, we only need it for annotations
+    from coverage import Coverage  # type: ignore
+    from coverage.types import TMorf  # type: ignore
 
 from .tools import missed_lines_str
 
@@ -21,18 +27,69 @@ else:
     Path: TypeAlias = Tuple[str, ...]
 """A convenience type alias for a tree path, i.e. a tuple of node names."""
 
+_ROOT_NAME = '<root>'
+"""The name of the root node of a tree of files without a common directory."""
+
 PathLike: TypeAlias = Sequence[str]
 """A convenience type alias for a tree path-like type,
 i.e. a sequence of node names. It can, but does not need to be a
 :class:`~Path`."""
 
 
+_SORT_KEYS: dict[str, Callable[['CovNode'], float]] = {
+    'missed': lambda n: n.num_missed_lines,
+    'coverage': lambda n: -n.coverage,
+    'stmts': lambda n: n.num_executable_lines,
+}
+"""Functions to rank nodes by, the larger the value the worse the node."""
+
+# keys which never increase from a node to its descendants
+_MONOTONE_SORT_KEYS = {'missed', 'stmts'}
+
+
+def get_available_sort_keys() -> list[str]:
+    return list(_SORT_KEYS.keys())
+
+
+def _get_sort_key(key: str) -> Callable[['CovNode'], float]:
+    try:
+        return _SORT_KEYS[key]
+    except KeyError:
+        raise ValueError(f'Unknown key "{key}", choose one of: '
+                         f'{", ".join(_SORT_KEYS)}') from None
+
+
+# the (read-only) children of all leaves, which hence need no mapping of their
+# own (typed as dict, as the children of modules, which are never read-only)
+_NO_CHILDREN = cast('dict[str, CovNode]', MappingProxyType({}))
+
+
+def _new_hash(kind: bytes) -> Any:
+    """A new hash object for the content hashes of nodes, initialised with the
+    kind of the node."""
+    # hashlib is rather slow to import and only needed for content hashes
+    from hashlib import blake2b
+    return blake2b(kind, digest_size=16)
+
+
 class CovNode(ABC):
-    """A general node (i.e. a directory or file) of a module structure."""
+    """A general node (i.e. a directory or file) of a module structure.
+
+    The nodes have ``__slots__`` (i.e. no ``__dict__``), as trees can have
+    very many of them.
+    """
+    __slots__ = ('_name', '_children', '_parent', '_sorted_children', '_hash')
+
+    # whether the nodes of the class never have children
+    _is_leaf_class = False
+
     def __init__(self, name: str) -> None:
         self._name = name
-        self._children: dict[str, 'CovNode'] = dict()
+        self._children: dict[str, 'CovNode'] = \
+            _NO_CHILDREN if self._is_leaf_class else {}
         self._parent: 'CovNode | None' = None
+        self._sorted_children: dict[str, tuple['CovNode', ...]] | None = None
+        self._hash: bytes | None = None
         super().__init__()
 
     @property
@@ -129,6 +186,7 @@ class CovNode(ABC):
     def iter_tree(
             self,
             descend: Callable[['CovNode'], bool] | None = None,
+            sort: str | None = None,
     ) -> Iterator['CovNode']:
         """Iterator over all node (leaf or not and self) in this tree.
 
@@ -136,6 +194,8 @@ class CovNode(ABC):
             descend: An optional callable that takes a node. If there turn value
                      is True, descend into this node, otherwise do not yield its
                      children.
+            sort: If given, visit the children of each node in the order of
+                  :meth:`~sorted_children` with this key.
 
         Yields:
             All the nodes in this tree.
@@ -143,8 +203,37 @@ class CovNode(ABC):
         yield self
 
         if descend is None or descend(self):
-            for child in self._children.values():
-                yield from child.iter_tree(descend)
+            children = self._children.values() if sort is None else \
+                self.sorted_children(sort)
+            for child in children:
+                yield from child.iter_tree(descend, sort)
+
+    def sorted_children(self, key: str) -> tuple['CovNode', ...]:
+        """The (direct) children, the worst first with respect to ``key``.
+
+        The sort values are the (cached) aggregates of the children, and the
+        sorted order is cached per key until this node is invalidated (see
+        :meth:`~invalidate`). Hence, sorting a tree again (by any key) does not
+        traverse it again.
+
+        Args:
+            key: The criterion: 'missed' (most missed lines), 'coverage'
+                 (lowest coverage) or 'stmts' (most statements).
+
+        Returns:
+            The children, the worst first. Ties keep the order of
+            :attr:`~children`.
+        """
+        if self._sorted_children is None:
+            self._sorted_children = {}
+        elif key in self._sorted_children:
+            return self._sorted_children[key]
+        value_of = _get_sort_key(key)
+        children = tuple(sorted(
+            self._children.values(), key=value_of, reverse=True,
+        ))
+        self._sorted_children[key] = children
+        return children
 
     def insert_child(
             self,
@@ -173,6 +262,95 @@ class CovNode(ABC):
                                    f'named "{node._name}"')
             self._children[node._name] = node
             node._parent = self
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Clear the cached aggregates of this node and all its ancestors.
+
+        The aggregates of modules are cached. If the line sets of a file in a
+        tree are modified, this needs to be called on the file node.
+        """
+        node: CovNode | None = self
+        while node is not None:
+            node._clear_cache()
+            node = node._parent
+
+    def _clear_cache(self) -> None:
+        self._sorted_children = None
+        self._hash = None
+
+    @property
+    def content_hash(self) -> bytes:
+        """A hash of the content of this subtree, i.e. of the line sets of its
+        files and of its structure, but not of the name of this node.
+
+        The hashes are Merkle hashes: The hash of a module is computed from
+        the names and hashes of its children. The hashes are cached (until the
+        node is invalidated, see :meth:`~invalidate`), hence equal subtrees of
+        two trees are recognised by comparing a single hash (see
+        :func:`~cov_tree.core.merkle.compare_trees`).
+        """
+        if self._hash is None:
+            self._hash = self._compute_hash()
+        return self._hash
+
+    @abstractmethod
+    def _compute_hash(self) -> bytes:
+        ...
+
+    def top_k(
+            self,
+            key: str,
+            k: int,
+            min_statements: int = 0,
+            files_only: bool = True,
+    ) -> list['CovNode']:
+        """Find the ``k`` worst nodes in this tree with respect to ``key``.
+
+        A heap of the ``k`` worst nodes found so far is kept while walking the
+        tree. Subtrees with less than ``min_statements`` statements are skipped,
+        as are subtrees which cannot beat the heap, if the key never increases
+        towards the leaves (as the number of missed lines).
+
+        Args:
+            key: The criterion: 'missed' (most missed lines), 'coverage'
+                 (lowest coverage) or 'stmts' (most statements).
+            k: The (maximum) number of nodes to return.
+            min_statements: Only consider nodes with at least this number of
+                            executable lines.
+            files_only: Only consider files, otherwise also consider modules
+                        (including this node).
+
+        Returns:
+            The worst nodes, the worst first. Ties are broken by tree order.
+        """
+        value_of = _get_sort_key(key)
+        if k <= 0:
+            return []
+        monotone = key in _MONOTONE_SORT_KEYS
+
+        heap: list[tuple[float, int, CovNode]] = []
+        stack: list[CovNode] = [self]
+        counter = 0
+        while stack:
+            node = stack.pop()
+            if node.num_executable_lines < min_statements:
+                continue
+            value = value_of(node)
+            if monotone and len(heap) == k and value <= heap[0][0]:
+                continue
+            if not files_only or node.is_leaf:
+                # later nodes compare smaller on ties, hence are dropped first
+                item = (value, -counter, node)
+                counter += 1
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+            stack.extend(reversed(node.children))
+
+        heap.sort(key=lambda item: (-item[0], -item[1]))
+        return [node for _, _, node in heap]
 
     @property
     def num_children(self) -> int:
@@ -214,8 +392,23 @@ class CovNode(ABC):
             cnt += len(child)
         return cnt
 
+    def __reduce__(self) -> tuple[Callable[[bytes], 'CovNode'], tuple[bytes]]:
+        """Pickle this node and its subtree as binary snapshot (see
+        :func:`~cov_tree.core.snapshot.tree_to_bytes`).
+
+        The snapshot is compact (the line sets are delta-encoded) and written
+        and read without recursion, hence also deep trees can be pickled. The
+        node becomes the root of the unpickled tree, i.e. the parent is not
+        pickled. Lazily loaded nodes are unpickled as ordinary nodes.
+        """
+        from .snapshot import tree_to_bytes, tree_from_bytes
+        return tree_from_bytes, (tree_to_bytes(self),)
+
 
 class CovFile(CovNode):
+    __slots__ = ('executable_lines', 'skipped_lines', 'missed_lines')
+    _is_leaf_class = True
+
     def __init__(
             self,
             name: str,
@@ -231,13 +424,13 @@ class CovFile(CovNode):
         self.missed_lines = set(missed_lines)
 
         if strict:
-            if set(missed_lines) - set(executable_lines):
-                off = set(missed_lines) - set(executable_lines)
+            if self.missed_lines - self.executable_lines:
+                off = self.missed_lines - self.executable_lines
                 raise ValueError(
                     f'Some missed lines that are not executable: {off}'
                 )
-            if set(skipped_lines) & set(executable_lines):
-                off = set(skipped_lines) & set(executable_lines)
+            if self.skipped_lines & self.executable_lines:
+                off = self.skipped_lines & self.executable_lines
                 raise ValueError(
                     f'Some skipped lines that are executable: {off}'
                 )
@@ -291,31 +484,61 @@ class CovFile(CovNode):
     def missed_lines_str(self, recursive: bool = True) -> str:
         return missed_lines_str(self.missed_lines, self.executable_lines)
 
+    def _compute_hash(self) -> bytes:
+        hash_ = _new_hash(b'file')
+        for lines in (
+                self.executable_lines, self.skipped_lines, self.missed_lines):
+            hash_.update(len(lines).to_bytes(8, 'little'))
+            hash_.update(array('q', sorted(lines)).tobytes())
+        return hash_.digest()
+
     def insert_child(self, child: 'CovNode', path: PathLike = tuple()) -> None:
         raise RuntimeError('Cannot insert a child to a file node!')
 
 
 class CovModule(CovNode):
+    __slots__ = ('_stats',)
+
     def __init__(self, name: str) -> None:
         super().__init__(name)
+        self._stats: tuple[int, int, int] | None = None
+
+    def _clear_cache(self) -> None:
+        super()._clear_cache()
+        self._stats = None
+
+    def _compute_hash(self) -> bytes:
+        # the children in sorted order, as the order does not matter
+        hash_ = _new_hash(b'module')
+        for name in sorted(self._children):
+            encoded = name.encode('utf-8', 'surrogateescape')
+            hash_.update(len(encoded).to_bytes(8, 'little'))
+            hash_.update(encoded)
+            hash_.update(self._children[name].content_hash)
+        return hash_.digest()
+
+    def _aggregate(self) -> tuple[int, int, int]:
+        """The cached numbers of executable, skipped and missed lines."""
+        if self._stats is None:
+            executable = skipped = missed = 0
+            for child in self._children.values():
+                executable += child.num_executable_lines
+                skipped += child.num_skipped_lines
+                missed += child.num_missed_lines
+            self._stats = executable, skipped, missed
+        return self._stats
 
     @property
     def num_executable_lines(self) -> int:
-        return sum(
-            child.num_executable_lines for child in self._children.values()
-        )
+        return self._aggregate()[0]
 
     @property
     def num_skipped_lines(self) -> int:
-        return sum(
-            child.num_skipped_lines for child in self._children.values()
-        )
+        return self._aggregate()[1]
 
     @property
     def num_missed_lines(self) -> int:
-        return sum(
-            child.num_missed_lines for child in self._children.values()
-        )
+        return self._aggregate()[2]
 
     def missed_lines_str(self, recursive: bool = True) -> str:
         if not recursive:
@@ -327,3 +550,25 @@ class CovModule(CovNode):
             if child_miss:
                 missed.append(f'[{child._name}: {child_miss}]')
         return ', '.join(missed)
+
+
+def _source_path(node: CovNode, tree: CovNode | None = None) -> Path:
+    """The path of the source file (or directory) of a node, relative to the
+    base directory of a tree (as returned by
+    :func:`~cov_tree.core.builder.build_cov_tree`). This is the path of the
+    node in the tree, without the name of a synthetic root (which is no
+    directory) and without the name of a region (which is in its file).
+
+    Args:
+        node: The node.
+        tree: The root of the (sub-)tree, defaults to the root of the node.
+    """
+    # regions are only imported by trees having them
+    from .regions import CovRegion
+
+    path = node.path if tree is None else node.path[tree.depth:]
+    if path[:1] == (_ROOT_NAME,):
+        path = path[1:]
+    if isinstance(node, CovRegion):
+        path = path[:-1]
+    return path
@@ -0,0 +1,84 @@
+from __future__ import annotations
+from typing import NamedTuple, Callable
+import threading
+import time
+
+
+class BuildCancelled(Exception):
+    """Raised by a build cancelled with a :class:`~CancelToken`."""
+
+
+class CancelToken:
+    """A thread-safe flag to cancel a running build (e.g. from another
+    thread). The build checks it before analysing each file and raises
+    :class:`~BuildCancelled` once it is set."""
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise BuildCancelled('The build was cancelled')
+
+
+class BuildProgress(NamedTuple):
+    """The progress of a build, as passed to progress callbacks."""
+    done: int
+    """The number of analysed files."""
+    total: int
+    """The total number of files."""
+    path: str
+    """The path of the file (or shard) analysed last."""
+    elapsed: float
+    """The seconds since the start of the analysis."""
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def eta(self) -> float | None:
+        """The estimated seconds until the build is done, None if unknown."""
+        if self.done == 0:
+            return None
+        return self.elapsed / self.done * (self.total - self.done)
+
+
+ProgressCallback = Callable[[BuildProgress], None]
+
+
+class _ProgressTracker:
+    """Reports the progress of a build to an optional callback and checks an
+    optional cancel token."""
+    def __init__(
+            self,
+            total: int,
+            callback: ProgressCallback | None,
+            cancel: CancelToken | None,
+    ) -> None:
+        self.total = total
+        self.done = 0
+        self._callback = callback
+        self._cancel = cancel
+        self._start = time.monotonic()
+        self._report('')
+
+    def check(self) -> None:
+        if self._cancel is not None:
+            self._cancel.raise_if_cancelled()
+
+    def advance(self, path: str, num_files: int = 1) -> None:
+        self.done += num_files
+        self._report(path)
+
+    def _report(self, path: str) -> None:
+        if self._callback is not None:
+            self._callback(BuildProgress(
+                self.done, self.total, path, time.monotonic() - self._start,
+            ))
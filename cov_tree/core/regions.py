@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import Any
+from bisect import bisect_right
+
+from .node import CovNode, CovModule, CovFile
+
+
+MODULE_REGION = '<module>'
+"""The name of the region of the lines outside of any class or function."""
+
+
+class CovRegion(CovFile):
+    """A leaf node of a region of a file, i.e. a top-level class (without its
+    methods) or function, a method, or the rest of the file. Its parent is the
+    module node of the file."""
+    __slots__ = ()
+
+
+def _span(node: Any) -> tuple[int, int]:
+    """The first and last line of a class or function, including its
+    decorators."""
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    return start, node.end_lineno
+
+
+class RegionIndex:
+    """A sorted index of the regions of a source file.
+
+    The (nested) spans of the regions are flattened into disjoint segments,
+    each assigned to the innermost region covering it. Hence, the region of a
+    line is found by a binary search.
+
+    Args:
+        spans: The regions as tuples of their first and last line and name.
+               The spans are either disjoint or nested.
+    """
+    def __init__(self, spans: list[tuple[int, int, str]]) -> None:
+        self.names = [MODULE_REGION]
+        self._starts = [1]
+        self._regions = [0]
+        ids: dict[str, int] = {MODULE_REGION: 0}
+        stack: list[tuple[int, int]] = []  # the ends and ids of open regions
+
+        def close() -> None:
+            end, _ = stack.pop()
+            self._add(end + 1, stack[-1][1] if stack else 0)
+
+        for start, end, name in sorted(spans, key=lambda s: (s[0], -s[1])):
+            while stack and stack[-1][0] < start:
+                close()
+            region = ids.setdefault(name, len(ids))
+            if region == len(self.names):
+                self.names.append(name)
+            self._add(start, region)
+            stack.append((end, region))
+        while stack:
+            close()
+
+    def _add(self, start: int, region: int) -> None:
+        if self._regions[-1] == region:
+            return
+        if self._starts[-1] == start:
+            self._regions[-1] = region
+            if len(self._regions) > 1 and self._regions[-2] == region:
+                self._starts.pop()
+                self._regions.pop()
+        else:
+            self._starts.append(start)
+            self._regions.append(region)
+
+    @property
+    def segments(self) -> list[tuple[int, str]]:
+        """The first lines of the segments and the names of their regions."""
+        return [
+            (start, self.names[region])
+            for start, region in zip(self._starts, self._regions)
+        ]
+
+    def region_of(self, line: int) -> str:
+        """The name of the region of a line."""
+        idx = bisect_right(self._starts, line) - 1
+        return self.names[self._regions[max(idx, 0)]]
+
+    @classmethod
+    def from_source(cls, source: bytes | str) -> 'RegionIndex':
+        """Find the top-level classes and functions and the methods of the
+        classes in a Python source.
+
+        Raises:
+            SyntaxError: If the source cannot be parsed.
+        """
+        import ast
+
+        defs = (ast.FunctionDef, ast.AsyncFunctionDef)
+        spans = []
+        for node in ast.parse(source).body:
+            if isinstance(node, defs):
+                spans.append(_span(node) + (f'{node.name}()',))
+            elif isinstance(node, ast.ClassDef):
+                spans.append(_span(node) + (node.name,))
+                spans.extend(
+                    _span(child) + (f'{node.name}.{child.name}()',)
+                    for child in node.body if isinstance(child, defs)
+                )
+        return cls(spans)
+
+
+class RegionCache:
+    """A cache of the region indices of source files by the hash of their
+    source, e.g. to be shared by the builds of several coverage files."""
+    def __init__(self) -> None:
+        self._indices: dict[bytes, RegionIndex | None] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def clear(self) -> None:
+        self._indices.clear()
+
+    def get(self, path: str) -> RegionIndex | None:
+        """The region index of a source file, None if it cannot be read or
+        parsed."""
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+        except OSError:
+            return None
+        # hashlib is rather slow to import, and only needed for builds
+        import hashlib
+        key = hashlib.sha1(source).digest()
+        try:
+            index = self._indices[key]
+            self.hits += 1
+        except KeyError:
+            try:
+                index = RegionIndex.from_source(source)
+            except (SyntaxError, ValueError):
+                index = None
+            self._indices[key] = index
+            self.misses += 1
+        return index
+
+
+def split_regions(file: CovFile, source: str, cache: RegionCache) -> CovNode:
+    """Split a file node into the regions of its source.
+
+    Args:
+        file: The file node.
+        source: The path of the source file.
+        cache: The cache of the region indices.
+
+    Returns:
+        A :class:`CovModule` of the name of the file with one
+        :class:`CovRegion` per region with executable or excluded lines (the
+        rest of the file first, then in the order of the source). The file
+        itself, if it has no such regions except for the rest of the file.
+    """
+    index = cache.get(source)
+    if index is None:
+        return file
+
+    # the executable, skipped and missed lines per region
+    lines: dict[str, tuple[set[int], set[int], set[int]]] = {}
+    for idx, line_set in enumerate((
+            file.executable_lines, file.skipped_lines, file.missed_lines)):
+        for line in line_set:
+            region = index.region_of(line)
+            if region not in lines:
+                lines[region] = set(), set(), set()
+            lines[region][idx].add(line)
+    if not lines.keys() - {MODULE_REGION}:
+        return file
+
+    module = CovModule(file.name)
+    for name in index.names:
+        if name in lines:
+            executable, skipped, missed = lines[name]
+            module.insert_child(CovRegion(name, executable, skipped, missed))
+    return module
@@ -0,0 +1,118 @@
+from __future__ import annotations
+from typing import Iterable, Mapping, Sequence, Union
+import fnmatch
+import os
+import re
+
+
+Rules = Union[
+    Mapping[str, Sequence[str]],
+    Iterable['tuple[str, Sequence[str]]'],
+]
+"""Remapping rules given as pairs of the canonical path and its aliases."""
+
+_SEP_RE = re.compile(r'[\\/]+')
+
+
+def _split(path: str) -> tuple[str, ...]:
+    # paths recorded on other machines may use either separator
+    parts = _SEP_RE.split(path)
+    if len(parts) > 1 and parts[-1] == '':
+        parts.pop()
+    return tuple(parts)
+
+
+class _TrieNode:
+    __slots__ = ('exact', 'wild', 'target')
+
+    def __init__(self) -> None:
+        self.exact: dict[str, _TrieNode] = {}
+        self.wild: list[tuple[re.Pattern, _TrieNode]] = []
+        self.target: tuple[str, ...] | None = None
+
+    def child(self, part: str) -> _TrieNode:
+        if not any(c in part for c in '*?['):
+            return self.exact.setdefault(part, _TrieNode())
+        pattern = re.compile(fnmatch.translate(part))
+        for wild_pattern, node in self.wild:
+            if wild_pattern.pattern == pattern.pattern:
+                return node
+        node = _TrieNode()
+        self.wild.append((pattern, node))
+        return node
+
+
+class PathRemapper:
+    """Remap the paths of measured files, like the ``[paths]`` setting of
+    `coverage`, e.g. to unify the paths of several CI runners.
+
+    The aliases are compiled into a trie of path components, hence a path is
+    matched in a single walk along its components, independent of the number
+    of rules. Alias components can contain wildcards (``*``, ``?``, ``[...]``),
+    which match within a single component. If several aliases match, the
+    longest one wins.
+
+    Args:
+        rules: Pairs of a canonical (local) path and its aliases, i.e. the
+               prefixes of the paths to replace by it. Relative canonical paths
+               are relative to the current directory.
+    """
+    def __init__(self, rules: Rules) -> None:
+        if isinstance(rules, Mapping):
+            rules = rules.items()
+        self._root = _TrieNode()
+        self._num_rules = 0
+        for canonical, aliases in rules:
+            target = _split(os.path.abspath(canonical))
+            for alias in aliases:
+                node = self._root
+                for part in _split(alias):
+                    node = node.child(part)
+                node.target = target
+                self._num_rules += 1
+
+    def __len__(self) -> int:
+        """The number of aliases."""
+        return self._num_rules
+
+    def match(self, path: str) -> tuple[int, tuple[str, ...]] | None:
+        """Find the longest alias matching the beginning of a path.
+
+        Returns:
+            The number of matched components and the components of the
+            canonical path to replace them with, or None if no alias matches.
+        """
+        parts = _split(path)
+        best: tuple[int, tuple[str, ...]] | None = None
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node.target is not None and (best is None or depth > best[0]):
+                best = depth, node.target
+            if depth == len(parts):
+                continue
+            part = parts[depth]
+            for pattern, child in node.wild:
+                if pattern.match(part):
+                    stack.append((child, depth + 1))
+            exact = node.exact.get(part)
+            if exact is not None:
+                stack.append((exact, depth + 1))
+        return best
+
+    def remap(self, path: str) -> str:
+        """The remapped path, which is the path itself if no alias matches."""
+        match = self.match(path)
+        if match is None:
+            return path
+        depth, target = match
+        return os.sep.join(target + _split(path)[depth:])
+
+
+def parse_remap_rule(rule: str) -> tuple[str, list[str]]:
+    """Parse a rule given as ``CANONICAL=ALIAS[,ALIAS...]``."""
+    canonical, sep, aliases = rule.partition('=')
+    if not sep or not canonical or not aliases:
+        raise ValueError(f'Bad remapping rule "{rule}", expected '
+                         f'CANONICAL=ALIAS[,ALIAS...]')
+    return canonical, aliases.split(',')
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from typing import Any, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing
+import os
+
+from .node import CovNode, CovModule, _ROOT_NAME
+from .builder import _read_coverage, _build_leaf, _collapse_root
+from .builder import _common_prefix_len
+from .snapshot import tree_to_bytes, tree_from_bytes
+from .progress import ProgressCallback, CancelToken, BuildCancelled
+from .progress import _ProgressTracker
+if TYPE_CHECKING:  # pragma: no cover
+    from coverage import Coverage  # type: ignore
+
+
+# the coverage data of a worker process, read once per process
+_worker_cov: Coverage | None = None
+# set by the main process to stop the workers
+_worker_cancel: Any = None
+
+# the interval (in seconds) of checking the cancel token while waiting
+_POLL_INTERVAL = 0.1
+
+
+def _init_worker(cov_file: str, cancel_event: Any) -> None:
+    global _worker_cov, _worker_cancel
+    _worker_cancel = cancel_event
+    _worker_cov = _read_coverage(cov_file)
+
+
+def _build_shard(files: list[str], drop_ext: bool, depth: int) -> bytes:
+    """Build the subtree of the given files (in a worker process), the shard's
+    root is at the given depth of the file paths."""
+    assert _worker_cov is not None
+    root: CovNode = CovModule(name="<shard>")
+    for full_path in files:
+        if _worker_cancel is not None and _worker_cancel.is_set():
+            raise BuildCancelled('The build was cancelled')
+        path, leaf = _build_leaf(_worker_cov, full_path, drop_ext)
+        root.insert_child(leaf, path[depth:])
+    return tree_to_bytes(root.children[0])
+
+
+def build_sharded_cov_tree(
+        cov_file: str = ".coverage",
+        drop_ext: bool = False,
+        max_workers: int | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+) -> tuple[str, CovNode]:
+    """Build a coverage tree with each top-level subtree (i.e. each child of
+    the root) built as independent shard in a pool of worker processes.
+
+    The workers send their shards as binary snapshots (see
+    :func:`~cov_tree.core.snapshot.tree_to_bytes`), which are only decoded
+    node by node when they are accessed. The aggregates of the shards, and
+    hence the summary of the root, are available without decoding anything.
+
+    Args:
+        cov_file: The path to the coverage file created by `coverage`.
+        drop_ext: Drop file extenstions for the node names.
+        max_workers: The maximum number of worker processes. Defaults to the
+                     number of CPUs.
+        progress: A callback called before the first and after each finished
+                  shard, see :func:`~cov_tree.build_cov_tree`.
+        cancel: A token to cancel the build. Once set, the workers stop before
+                their next file and the pool is shut down.
+
+    Returns:
+        A tuple of the path to the root node and the root node of the tree.
+        This is the same tree as built by :func:`~cov_tree.build_cov_tree`,
+        only that its nodes are lazily loaded (sub-classes of the usual
+        nodes).
+    """
+    cov = _read_coverage(cov_file)
+    files = sorted(cov.get_data().measured_files())
+    split_paths = [os.path.normpath(path).split(os.sep) for path in files]
+
+    # the root of the tree is where the paths split, see `_collapse_root`
+    depth = _common_prefix_len(split_paths)
+    if not files or any(len(path) <= depth for path in split_paths):
+        # a single file: nothing to shard
+        root: CovNode = CovModule(name=_ROOT_NAME)
+        tracker = _ProgressTracker(len(files), progress, cancel)
+        for full_path in files:
+            tracker.check()
+            path, leaf = _build_leaf(cov, full_path, drop_ext)
+            root.insert_child(leaf, path)
+            tracker.advance(full_path)
+        return _collapse_root(root)
+
+    prefix = split_paths[0][:depth]
+    root = CovModule(prefix[-1] if prefix else _ROOT_NAME)
+    shards: dict[str, list[str]] = {}
+    for full_path, split_path in zip(files, split_paths):
+        shards.setdefault(split_path[depth], []).append(full_path)
+
+    tracker = _ProgressTracker(len(files), progress, cancel)
+    cancel_event = multiprocessing.Event()
+    with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(cov_file, cancel_event),
+    ) as executor:
+        futures = {
+            executor.submit(_build_shard, shard, drop_ext, depth): name
+            for name, shard in shards.items()
+        }
+        pending = set(futures)
+        try:
+            while pending:
+                tracker.check()
+                done, pending = wait(pending, timeout=_POLL_INTERVAL,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                    tracker.advance(futures[future],
+                                    len(shards[futures[future]]))
+        except BaseException:
+            # stop the running shards and drop the queued ones
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            raise
+
+        # keep the order of the shards
+        for future in futures:
+            root.insert_child(tree_from_bytes(future.result(), lazy=True))
+
+    return os.sep.join(prefix[:-1]), root
@@ -0,0 +1,457 @@
+from __future__ import annotations
+from typing import BinaryIO, Iterable, Iterator, Union
+from contextlib import contextmanager
+import os
+import mmap
+import struct
+
+from .node import CovNode, CovModule, CovFile
+from .stream import _CollapsedModule
+from .regions import CovRegion
+
+
+FileLike = Union[str, 'os.PathLike[str]', BinaryIO]
+"""A path to a file or an open binary file object."""
+
+_MAGIC = b'CVTR'
+_VERSION = 1
+
+# magic, version, reserved, #strings, #nodes,
+# offset of string table, node array and blobs
+_HEADER = struct.Struct('<4sHHIIQQQ')
+# name index, parent index, kind, #executable, #skipped, #missed,
+# #descendants, blob offset, blob length
+_RECORD = struct.Struct('<IiBIIIIQI')
+_OFFSET = struct.Struct('<I')
+
+_KIND_MODULE = 0
+_KIND_FILE = 1
+# a module with fixed aggregates, but without children
+_KIND_COLLAPSED = 2
+# a region of a file (see cov_tree.core.regions)
+_KIND_REGION = 3
+
+
+def _encode_lines(lines: Iterable[int], out: bytearray) -> None:
+    """Append the sorted lines as a count followed by varint-encoded deltas."""
+    lines = sorted(lines)
+    _encode_varint(len(lines), out)
+    prev = 0
+    for line in lines:
+        _encode_varint(line - prev, out)
+        prev = line
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    if value < 0:
+        raise ValueError(f'Cannot encode negative line number: {value}')
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_lines(blob: bytes, pos: int) -> tuple[set[int], int]:
+    """Decode a line set written by :func:`_encode_lines` at ``pos`` and return
+    it together with the position after it."""
+    count, pos = _decode_varint(blob, pos)
+    lines = set()
+    line = 0
+    for _ in range(count):
+        delta, pos = _decode_varint(blob, pos)
+        line += delta
+        lines.add(line)
+    return lines, pos
+
+
+def _decode_varint(blob: bytes, pos: int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = blob[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def tree_to_bytes(tree: CovNode) -> bytes:
+    """Serialize a (sub-)tree into the binary snapshot format.
+
+    The layout consists of a fixed header, a string table (offsets followed by
+    UTF-8 data), an array of fixed-size node records in pre-order and a blob
+    section with the delta-encoded line sets of the files. The node records
+    contain the aggregated line counts and the number of descendants, such
+    that a reader can answer summaries and find children without touching the
+    rest of the file.
+
+    The tree is traversed iteratively, hence arbitrarily deep trees can be
+    serialized. If ``tree`` is not a root, it becomes the root of the
+    snapshot.
+
+    Args:
+        tree: The root of the (sub-)tree to serialize.
+
+    Returns:
+        The serialized tree.
+    """
+    nodes: list[CovNode] = []
+    parents: list[int] = []
+    stack: list[tuple[CovNode, int]] = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        idx = len(nodes)
+        nodes.append(node)
+        parents.append(parent)
+        stack.extend((child, idx) for child in reversed(node.children))
+
+    # aggregate bottom-up, which avoids recursing through the modules
+    num_desc = [0] * len(nodes)
+    counts = [[0, 0, 0] for _ in nodes]
+    for idx in range(len(nodes) - 1, -1, -1):
+        node = nodes[idx]
+        if isinstance(node, (CovFile, _CollapsedModule)):
+            counts[idx] = [
+                node.num_executable_lines,
+                node.num_skipped_lines,
+                node.num_missed_lines,
+            ]
+        parent = parents[idx]
+        if parent >= 0:
+            num_desc[parent] += num_desc[idx] + 1
+            for i in range(3):
+                counts[parent][i] += counts[idx][i]
+
+    strings: dict[str, int] = {}
+    records = bytearray()
+    blobs = bytearray()
+    for idx, node in enumerate(nodes):
+        name_idx = strings.setdefault(node.name, len(strings))
+        offset = len(blobs)
+        if isinstance(node, CovFile):
+            kind = _KIND_REGION if isinstance(node, CovRegion) else _KIND_FILE
+            _encode_lines(node.executable_lines, blobs)
+            _encode_lines(node.skipped_lines, blobs)
+            _encode_lines(node.missed_lines, blobs)
+        elif isinstance(node, _CollapsedModule):
+            kind = _KIND_COLLAPSED
+        else:
+            kind = _KIND_MODULE
+        records += _RECORD.pack(
+            name_idx, parents[idx], kind, *counts[idx], num_desc[idx],
+            offset, len(blobs) - offset,
+        )
+
+    string_data = bytearray()
+    string_offsets = bytearray()
+    for name in strings:
+        string_offsets += _OFFSET.pack(len(string_data))
+        string_data += name.encode('utf-8')
+    string_offsets += _OFFSET.pack(len(string_data))
+
+    strings_offset = _HEADER.size
+    nodes_offset = strings_offset + len(string_offsets) + len(string_data)
+    blobs_offset = nodes_offset + len(records)
+    header = _HEADER.pack(
+        _MAGIC, _VERSION, 0, len(strings), len(nodes),
+        strings_offset, nodes_offset, blobs_offset,
+    )
+    return b''.join((header, string_offsets, string_data, records, blobs))
+
+
+def save_tree(tree: CovNode, file: FileLike) -> None:
+    """Save a (sub-)tree as binary snapshot, see :func:`~tree_to_bytes`.
+
+    Args:
+        tree: The root of the (sub-)tree to save.
+        file: The path of the file to write or a binary file object.
+    """
+    data = tree_to_bytes(tree)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as f:
+            f.write(data)
+    else:
+        file.write(data)
+
+
+class _SnapshotReader:
+    """Random access to the sections of a binary snapshot."""
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        if len(buffer) < _HEADER.size:
+            raise ValueError('Not a cov-tree snapshot (too short)')
+        (
+            magic, version, _, self.num_strings, self.num_nodes,
+            self.strings_offset, self.nodes_offset, self.blobs_offset,
+        ) = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError('Not a cov-tree snapshot (bad magic number)')
+        if version != _VERSION:
+            raise ValueError(f'Unsupported snapshot version: {version}')
+        self.buffer = buffer
+        self._strings: dict[int, str] = {}
+
+    def string(self, idx: int) -> str:
+        try:
+            return self._strings[idx]
+        except KeyError:
+            pass
+        table = self.strings_offset
+        data = table + (self.num_strings + 1) * _OFFSET.size
+        start, = _OFFSET.unpack_from(self.buffer, table + idx * _OFFSET.size)
+        end, = _OFFSET.unpack_from(
+            self.buffer, table + (idx + 1) * _OFFSET.size
+        )
+        name = bytes(self.buffer[data + start:data + end]).decode('utf-8')
+        self._strings[idx] = name
+        return name
+
+    def record(self, idx: int) -> tuple[int, ...]:
+        return _RECORD.unpack_from(
+            self.buffer, self.nodes_offset + idx * _RECORD.size
+        )
+
+    def children(self, idx: int) -> Iterable[int]:
+        num_desc = self.record(idx)[6]
+        child = idx + 1
+        while child <= idx + num_desc:
+            yield child
+            child += self.record(child)[6] + 1
+
+    def lines(self, idx: int) -> tuple[set[int], set[int], set[int]]:
+        *_, offset, length = self.record(idx)
+        start = self.blobs_offset + offset
+        blob = bytes(self.buffer[start:start + length])
+        executable, pos = _decode_lines(blob, 0)
+        skipped, pos = _decode_lines(blob, pos)
+        missed, pos = _decode_lines(blob, pos)
+        return executable, skipped, missed
+
+    def node(self, idx: int) -> CovNode:
+        """Create a lazy node for the record at ``idx``."""
+        name_idx, _, kind, *_ = self.record(idx)
+        name = self.string(name_idx)
+        if kind == _KIND_FILE:
+            return _SnapshotFile(name, self, idx)
+        if kind == _KIND_REGION:
+            return _SnapshotRegion(name, self, idx)
+        if kind == _KIND_COLLAPSED:
+            return self._collapsed(idx)
+        return _SnapshotModule(name, self, idx)
+
+    def _collapsed(self, idx: int) -> CovNode:
+        name_idx, _, _, executable, skipped, missed, *_ = self.record(idx)
+        return _CollapsedModule(
+            self.string(name_idx), (executable, skipped, missed),
+        )
+
+    def materialize(self, idx: int = 0) -> CovNode:
+        """Eagerly create ordinary nodes for the subtree at ``idx``."""
+        nodes: list[CovNode] = []
+        for i in range(idx, idx + self.record(idx)[6] + 1):
+            name_idx, parent, kind, *_ = self.record(i)
+            node: CovNode
+            if kind in (_KIND_FILE, _KIND_REGION):
+                executable, skipped, missed = self.lines(i)
+                node = (CovRegion if kind == _KIND_REGION else CovFile)(
+                    self.string(name_idx), executable, skipped, missed,
+                    strict=False,
+                )
+            elif kind == _KIND_COLLAPSED:
+                node = self._collapsed(i)
+            else:
+                node = CovModule(self.string(name_idx))
+            nodes.append(node)
+            if i != idx:
+                nodes[parent - idx].insert_child(node)
+        return nodes[0]
+
+
+class _SnapshotModule(CovModule):
+    """A module node of a memory-mapped snapshot. Its children are only read
+    when they are accessed, its aggregates are taken from the snapshot until
+    then."""
+    __slots__ = ('_reader', '_idx', '_loaded', '__children')
+
+    def __init__(self, name: str, reader: _SnapshotReader, idx: int) -> None:
+        super().__init__(name)
+        self._reader = reader
+        self._idx = idx
+        self._loaded = False
+
+    def _load(self) -> dict[str, CovNode]:
+        children: dict[str, CovNode] = {}
+        for idx in self._reader.children(self._idx):
+            child = self._reader.node(idx)
+            child._parent = self
+            children[child.name] = child
+        return children
+
+    @property  # type: ignore[override]
+    def _children(self) -> dict[str, CovNode]:
+        if not self._loaded:
+            self._loaded = True
+            self.__children = self._load()
+        return self.__children
+
+    @_children.setter
+    def _children(self, children: dict[str, CovNode]) -> None:
+        self.__children = children
+
+    @property
+    def num_executable_lines(self) -> int:
+        if self._loaded:
+            return super().num_executable_lines
+        return self._reader.record(self._idx)[3]
+
+    @property
+    def num_skipped_lines(self) -> int:
+        if self._loaded:
+            return super().num_skipped_lines
+        return self._reader.record(self._idx)[4]
+
+    @property
+    def num_missed_lines(self) -> int:
+        if self._loaded:
+            return super().num_missed_lines
+        return self._reader.record(self._idx)[5]
+
+    def __len__(self) -> int:
+        if self._loaded:
+            return super().__len__()
+        return self._reader.record(self._idx)[6] + 1
+
+
+class _SnapshotFile(CovFile):
+    """A file node of a memory-mapped snapshot. Its line sets are only decoded
+    when they are accessed."""
+    __slots__ = ('_reader', '_idx', '_lines')
+
+    def __init__(self, name: str, reader: _SnapshotReader, idx: int) -> None:
+        CovNode.__init__(self, name)
+        self._reader = reader
+        self._idx = idx
+        self._lines: tuple[set[int], set[int], set[int]] | None = None
+
+    def _get_lines(self) -> tuple[set[int], set[int], set[int]]:
+        if self._lines is None:
+            self._lines = self._reader.lines(self._idx)
+        return self._lines
+
+    def _set_lines(self, pos: int, lines: set[int]) -> None:
+        all_lines = list(self._get_lines())
+        all_lines[pos] = lines
+        self._lines = all_lines[0], all_lines[1], all_lines[2]
+
+    @property  # type: ignore[override]
+    def executable_lines(self) -> set[int]:
+        return self._get_lines()[0]
+
+    @executable_lines.setter
+    def executable_lines(self, lines: set[int]) -> None:
+        self._set_lines(0, lines)
+
+    @property  # type: ignore[override]
+    def skipped_lines(self) -> set[int]:
+        return self._get_lines()[1]
+
+    @skipped_lines.setter
+    def skipped_lines(self, lines: set[int]) -> None:
+        self._set_lines(1, lines)
+
+    @property  # type: ignore[override]
+    def missed_lines(self) -> set[int]:
+        return self._get_lines()[2]
+
+    @missed_lines.setter
+    def missed_lines(self, lines: set[int]) -> None:
+        self._set_lines(2, lines)
+
+    @property
+    def num_executable_lines(self) -> int:
+        if self._lines is None:
+            return self._reader.record(self._idx)[3]
+        return len(self._lines[0])
+
+    @property
+    def num_skipped_lines(self) -> int:
+        if self._lines is None:
+            return self._reader.record(self._idx)[4]
+        return len(self._lines[1])
+
+    @property
+    def num_missed_lines(self) -> int:
+        if self._lines is None:
+            return self._reader.record(self._idx)[5]
+        return len(self._lines[2])
+
+
+class _SnapshotRegion(_SnapshotFile, CovRegion):
+    """A region node of a memory-mapped snapshot."""
+    __slots__ = ()
+
+
+def tree_from_bytes(data: bytes | mmap.mmap, lazy: bool = False) -> CovNode:
+    """Deserialize a tree serialized by :func:`~tree_to_bytes`.
+
+    Args:
+        data: The serialized tree.
+        lazy: If True, return lazy nodes, which read children and line sets
+              only on access (and keep a reference to ``data``). Otherwise,
+              create an ordinary tree of :class:`~CovModule` and
+              :class:`~CovFile` nodes.
+
+    Returns:
+        The root node of the tree.
+    """
+    reader = _SnapshotReader(data)
+    if lazy:
+        return reader.node(0)
+    return reader.materialize()
+
+
+def load_tree(file: FileLike, lazy: bool = True) -> CovNode:
+    """Load a tree saved by :func:`~save_tree`.
+
+    Args:
+        file: The path of the snapshot file or a binary file object.
+        lazy: If True and ``file`` is a path, memory-map the file and only read
+              the parts of subtrees and line sets that are accessed.
+              Otherwise, read the entire tree into memory. The map is owned by
+              the tree, i.e. the file stays open (and cannot be removed on
+              Windows) until the tree is garbage collected. Use
+              :func:`~open_tree` to close it at a defined point.
+
+    Returns:
+        The root node of the tree.
+    """
+    if not isinstance(file, (str, os.PathLike)):
+        return tree_from_bytes(file.read(), lazy=lazy)
+
+    with open(file, 'rb') as f:
+        if lazy:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return tree_from_bytes(data, lazy=True)
+        return tree_from_bytes(f.read())
+
+
+@contextmanager
+def open_tree(file: str | os.PathLike[str]) -> Iterator[CovNode]:
+    """Lazily load a tree saved by :func:`~save_tree` (like
+    :func:`~load_tree`), and close the file at the end of the ``with`` block.
+
+    Example:
+        >>> with open_tree('tree.cvt') as tree:  # doctest: +SKIP
+        ...     print(tree.num_missed_lines)
+
+    Args:
+        file: The path of the snapshot file.
+
+    Yields:
+        The root node of the tree. The parts of the tree which have not been
+        accessed within the block cannot be read after it.
+    """
+    with open(file, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with data:
+        yield tree_from_bytes(data, lazy=True)
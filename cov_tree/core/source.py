@@ -0,0 +1,107 @@
+from __future__ import annotations
+from typing import Iterable
+import mmap
+import os
+
+from .node import CovFile, _source_path
+
+
+class _LineIndex:
+    """The offsets of the lines of a source file, found lazily up to the
+    highest line requested so far."""
+    __slots__ = ('key', 'offsets', 'complete')
+
+    def __init__(self, key: tuple[int, int]) -> None:
+        self.key = key
+        # the offset of the start of line ``n`` is ``offsets[n - 1]``
+        self.offsets = [0]
+        self.complete = False
+
+    def extend(self, data: bytes | mmap.mmap, lineno: int) -> None:
+        """Find the offsets of the lines up to (and including) line
+        ``lineno``, i.e. up to the start of the following line."""
+        offsets = self.offsets
+        while len(offsets) <= lineno and not self.complete:
+            pos = data.find(b'\n', offsets[-1])
+            if pos < 0:
+                if offsets[-1] < len(data):
+                    offsets.append(len(data))
+                self.complete = True
+            else:
+                offsets.append(pos + 1)
+
+
+class SourceFiles:
+    """Read lines of source files, e.g. the missed lines of files in a tree.
+
+    The files are read through memory maps, and the offsets of their lines are
+    cached per file (by modification time and size). The offsets are only
+    searched up to the highest line requested so far, hence only the pages of
+    a file up to its last requested line are touched, and later requests read
+    just the pages of the requested lines.
+
+    Args:
+        base: The directory of the root of the trees, as returned by
+              :func:`~cov_tree.core.builder.build_cov_tree`.
+    """
+    def __init__(self, base: str = '') -> None:
+        self.base = base
+        self._indices: dict[str, _LineIndex] = {}
+
+    def __len__(self) -> int:
+        """The number of indexed files."""
+        return len(self._indices)
+
+    def clear(self) -> None:
+        self._indices.clear()
+
+    def lines(self, path: str, line_numbers: Iterable[int]) -> dict[int, str]:
+        """Read lines of a file.
+
+        Args:
+            path: The path of the file (relative to the base directory).
+            line_numbers: The numbers of the lines to read (starting at 1).
+
+        Returns:
+            The lines (without line breaks) by their numbers. Lines beyond the
+            end of the file are left out, as are all lines if the file cannot
+            be read.
+        """
+        line_numbers = sorted(set(line_numbers))
+        if not line_numbers:
+            return {}
+        path = os.path.join(self.base, path)
+        try:
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                key = (stat.st_mtime_ns, stat.st_size)
+                index = self._indices.get(path)
+                if index is None or index.key != key:
+                    index = self._indices[path] = _LineIndex(key)
+                if stat.st_size == 0:
+                    return {}
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return self._read(mm, index, line_numbers)
+        except OSError:
+            return {}
+
+    @staticmethod
+    def _read(
+            data: mmap.mmap,
+            index: _LineIndex,
+            line_numbers: list[int],
+    ) -> dict[int, str]:
+        index.extend(data, line_numbers[-1])
+        offsets = index.offsets
+        lines = {}
+        for lineno in line_numbers:
+            if lineno < 1 or lineno >= len(offsets):
+                continue
+            line = data[offsets[lineno - 1]:offsets[lineno]]
+            lines[lineno] = line.decode('utf-8', 'replace').rstrip('\r\n')
+        return lines
+
+    def missed_lines(self, node: CovFile) -> dict[int, str]:
+        """The missed lines of a file (or region) node, by their numbers. The
+        node is in a tree whose base directory is ``base``."""
+        return self.lines(os.path.join(*_source_path(node)), node.missed_lines)
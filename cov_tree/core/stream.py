@@ -0,0 +1,195 @@
+from __future__ import annotations
+from typing import NamedTuple, Iterator, TYPE_CHECKING
+import os
+
+from .node import Path, CovNode, CovModule, CovFile, _new_hash, _ROOT_NAME
+from .builder import _read_coverage, _common_prefix_len
+if TYPE_CHECKING:  # pragma: no cover
+    from coverage import Coverage  # type: ignore
+
+
+class CovSummary(NamedTuple):
+    """The aggregates of a node, as yielded by :func:`~stream_cov_tree`."""
+    path: Path
+    num_executable_lines: int
+    num_skipped_lines: int
+    num_missed_lines: int
+    node: CovFile | None
+    """The leaf node for files, None for modules."""
+
+    @property
+    def is_file(self) -> bool:
+        return self.node is not None
+
+    @property
+    def coverage(self) -> float:
+        """The coverage, see :attr:`CovNode.coverage`."""
+        if self.num_executable_lines == 0:
+            return 1.0
+        return 1 - self.num_missed_lines / self.num_executable_lines
+
+
+class _OpenModule:
+    """A module in the streamed build that has not been finished yet."""
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.stats = [0, 0, 0]
+
+    def add(self, summary: CovSummary) -> None:
+        self.stats[0] += summary.num_executable_lines
+        self.stats[1] += summary.num_skipped_lines
+        self.stats[2] += summary.num_missed_lines
+
+    def summary(self) -> CovSummary:
+        executable, skipped, missed = self.stats
+        return CovSummary(self.path, executable, skipped, missed, None)
+
+
+def stream_cov_tree(
+        cov_file: str = ".coverage",
+        drop_ext: bool = False,
+) -> tuple[str, Iterator[CovSummary]]:
+    """Analyse a coverage file in sorted order, yielding the summaries of the
+    nodes as soon as they are finished.
+
+    The measured files are processed sorted by their path. Hence, all files of
+    a directory are processed contiguously and the summary of a directory is
+    yielded as soon as the order leaves it. Only the directories from the root
+    to the current file are kept in memory; the line sets of the files are only
+    kept if the consumer keeps the yielded file nodes.
+
+    The paths are the same as for :func:`~cov_tree.build_cov_tree`, i.e. they
+    start at the first directory where the paths split.
+
+    Args:
+        cov_file: The path to the coverage file created by `coverage`.
+        drop_ext: Drop file extenstions for the node names.
+
+    Returns:
+        A tuple of the path to the root node and an iterator of the summaries
+        of all nodes in post-order, the last one being the root.
+    """
+    cov = _read_coverage(cov_file)
+    files = sorted(
+        (os.path.normpath(path).split(os.sep), path)
+        for path in cov.get_data().measured_files()
+    )
+    depth = _common_prefix_len([split_path for split_path, _ in files])
+    if files and any(len(split_path) <= depth for split_path, _ in files):
+        # unlike `build_cov_tree`, keep the directory of a single file as root
+        depth -= 1
+    prefix = files[0][0][:depth] if files else []
+
+    summaries = _iter_summaries(cov, files, prefix, drop_ext)
+    return os.sep.join(prefix[:-1]), summaries
+
+
+def _iter_summaries(
+        cov: Coverage,
+        files: list[tuple[list[str], str]],
+        prefix: list[str],
+        drop_ext: bool,
+) -> Iterator[CovSummary]:
+    stack = [_OpenModule((prefix[-1] if prefix else _ROOT_NAME,))]
+    for split_path, full_path in files:
+        *dirs, name = split_path[len(prefix):]
+        if drop_ext:
+            name, _ = os.path.splitext(name)
+
+        yield from _leave_modules(stack, dirs)
+        for dir_name in dirs[len(stack) - 1:]:
+            stack.append(_OpenModule(stack[-1].path + (dir_name,)))
+
+        leaf = CovFile.from_coverage(cov, full_path, name)
+        summary = CovSummary(
+            stack[-1].path + (name,),
+            leaf.num_executable_lines,
+            leaf.num_skipped_lines,
+            leaf.num_missed_lines,
+            leaf,
+        )
+        stack[-1].add(summary)
+        yield summary
+
+    yield from _leave_modules(stack, [])
+    yield stack[0].summary()
+
+
+def _leave_modules(
+        stack: list[_OpenModule],
+        dirs: list[str],
+) -> Iterator[CovSummary]:
+    """Finish the open modules (except the root) which are not on the path of
+    the given directories."""
+    common = 0
+    for open_module, dir_name in zip(stack[1:], dirs):
+        if open_module.path[-1] != dir_name:
+            break
+        common += 1
+    while len(stack) > common + 1:
+        summary = stack.pop().summary()
+        stack[-1].add(summary)
+        yield summary
+
+
+class _CollapsedModule(CovModule):
+    """A module of which only the aggregates are kept, not its children."""
+    __slots__ = ('_fixed_stats',)
+
+    def __init__(self, name: str, stats: tuple[int, int, int]) -> None:
+        super().__init__(name)
+        self._fixed_stats = stats
+
+    def _aggregate(self) -> tuple[int, int, int]:
+        return self._fixed_stats
+
+    def _compute_hash(self) -> bytes:
+        hash_ = _new_hash(b'collapsed')
+        for count in self._fixed_stats:
+            hash_.update(count.to_bytes(8, 'little'))
+        return hash_.digest()
+
+
+def summarize_cov_tree(
+        cov_file: str = ".coverage",
+        max_depth: int | None = None,
+        drop_ext: bool = False,
+) -> tuple[str, CovNode]:
+    """Build a coverage tree up to a maximal depth with the streamed build of
+    :func:`~stream_cov_tree`.
+
+    Modules at the maximal depth are collapsed: They only keep their
+    aggregates, but neither their children nor any line sets. Hence, the memory
+    needed is independent of the number of files below this depth.
+
+    Args:
+        cov_file: The path to the coverage file created by `coverage`.
+        max_depth: The maximal depth of the nodes, the root has depth 0. If
+                   None, build the entire tree.
+        drop_ext: Drop file extenstions for the node names.
+
+    Returns:
+        A tuple of the path to the root node and the root node of the tree.
+    """
+    base, summaries = stream_cov_tree(cov_file, drop_ext)
+
+    # the finished children of the modules not yet finished
+    pending: dict[Path, list[CovNode]] = {}
+    node: CovNode | None = None
+    for summary in summaries:
+        depth = len(summary.path) - 1
+        if max_depth is not None and depth > max_depth:
+            continue
+
+        if summary.node is not None:
+            node = summary.node
+        elif max_depth is not None and depth == max_depth:
+            node = _CollapsedModule(summary.path[-1], summary[1:4])
+        else:
+            node = CovModule(summary.path[-1])
+            for child in pending.pop(summary.path, []):
+                node.insert_child(child)
+        pending.setdefault(summary.path[:-1], []).append(node)
+
+    assert node is not None
+    return base, node
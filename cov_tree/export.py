@@ -0,0 +1,42 @@
+from __future__ import annotations
+from typing import Any, Callable
+
+from .core import CovNode, CovFile
+
+
+def tree_to_dict(
+        tree: CovNode,
+        descend: Callable[[CovNode], bool] | None = None,
+        show_missing: bool = True,
+) -> dict[str, Any]:
+    """Convert a (sub-)tree into a JSON serializable dictionary.
+
+    Args:
+        tree: The root of the (sub-)tree to convert.
+        descend: An optional callable that takes a node. If the return value
+                 is False, the children of this node are not included.
+        show_missing: Whether to include the human readable missed lines of
+                      the files.
+
+    Returns:
+        A nested dictionary with the name, the statistics and the children of
+        each node. Modules always have a list of children (which is empty if
+        they are collapsed), files do not.
+    """
+    data: dict[str, Any] = {
+        'name': tree.name,
+        'num_executable_lines': tree.num_executable_lines,
+        'num_skipped_lines': tree.num_skipped_lines,
+        'num_missed_lines': tree.num_missed_lines,
+        'coverage': tree.coverage,
+    }
+    if isinstance(tree, CovFile):
+        if show_missing:
+            data['missed_lines'] = tree.missed_lines_str()
+    else:
+        do_descend = descend is None or descend(tree)
+        data['children'] = [
+            tree_to_dict(child, descend, show_missing)
+            for child in tree.children
+        ] if do_descend else []
+    return data
@@ -0,0 +1,281 @@
+from __future__ import annotations
+from typing import NamedTuple, Sequence, Iterator, Any
+from argparse import ArgumentParser
+import os
+import pathlib
+import sqlite3
+import time
+
+from .core import CovNode, build_cov_tree
+
+
+DEFAULT_DB = '.cov-tree-history.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    id INTEGER PRIMARY KEY,
+    sha TEXT UNIQUE NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    path_id INTEGER NOT NULL REFERENCES paths (id),
+    commit_id INTEGER NOT NULL REFERENCES commits (id),
+    executable INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    missed INTEGER NOT NULL,
+    PRIMARY KEY (path_id, commit_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stats_commit ON stats (commit_id);
+CREATE INDEX IF NOT EXISTS commits_recorded_at ON commits (recorded_at);
+"""
+
+
+class HistoryEntry(NamedTuple):
+    """The aggregates of a node recorded for a commit."""
+    sha: str
+    recorded_at: float
+    num_executable_lines: int
+    num_skipped_lines: int
+    num_missed_lines: int
+
+    @property
+    def coverage(self) -> float:
+        """The coverage, see :attr:`CovNode.coverage`."""
+        if self.num_executable_lines == 0:
+            return 1.0
+        return 1 - self.num_missed_lines / self.num_executable_lines
+
+
+def _iter_paths(tree: CovNode) -> Iterator[tuple[str, CovNode]]:
+    """Iterate over all nodes with their paths (joined by '/')."""
+    stack = [(tree.name, tree)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        stack.extend(
+            (f'{path}/{child.name}', child) for child in node.children
+        )
+
+
+class HistoryStore:
+    """A SQLite based store of the aggregates of all nodes over commits.
+
+    Node paths are stored once in a dictionary table, the aggregates per commit
+    refer to them by id. The aggregates are clustered by path, such that the
+    trend of a node is a range scan.
+
+    Args:
+        db_file: The path to the database file (created if needed).
+        read_only: Open an existing database for queries only, without
+                   creating it.
+
+    Raises:
+        sqlite3.OperationalError: If a database opened ``read_only`` does not
+                                  exist.
+    """
+    def __init__(
+            self,
+            db_file: str = DEFAULT_DB,
+            read_only: bool = False,
+    ) -> None:
+        if read_only:
+            uri = pathlib.Path(os.path.abspath(db_file)).as_uri()
+            self._conn = sqlite3.connect(f'{uri}?mode=ro', uri=True)
+        else:
+            self._conn = sqlite3.connect(db_file)
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> HistoryStore:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def record(
+            self,
+            sha: str,
+            tree: CovNode,
+            recorded_at: float | None = None,
+    ) -> None:
+        """Record the aggregates of all nodes of a tree for a commit. Recording
+        a commit again replaces its previous record.
+
+        Args:
+            sha: The commit identifier.
+            tree: The coverage tree. The paths of the nodes are relative to
+                  (and include) its root.
+            recorded_at: The timestamp of the record, defaults to now.
+        """
+        if recorded_at is None:
+            recorded_at = time.time()
+        nodes = list(_iter_paths(tree))
+
+        with self._conn:
+            cur = self._conn.cursor()
+            cur.execute(
+                'SELECT id FROM commits WHERE sha = ?', (sha,)
+            )
+            row = cur.fetchone()
+            if row is not None:
+                cur.execute('DELETE FROM stats WHERE commit_id = ?', row)
+                cur.execute('DELETE FROM commits WHERE id = ?', row)
+            cur.execute(
+                'INSERT INTO commits (sha, recorded_at) VALUES (?, ?)',
+                (sha, recorded_at),
+            )
+            commit_id = cur.lastrowid
+
+            path_ids = self._path_ids(cur, [path for path, _ in nodes])
+            cur.executemany(
+                'INSERT INTO stats VALUES (?, ?, ?, ?, ?)',
+                (
+                    (
+                        path_ids[path], commit_id,
+                        node.num_executable_lines,
+                        node.num_skipped_lines,
+                        node.num_missed_lines,
+                    )
+                    for path, node in nodes
+                ),
+            )
+
+    @staticmethod
+    def _path_ids(cur: sqlite3.Cursor, paths: list[str]) -> dict[str, int]:
+        path_ids = dict(cur.execute('SELECT path, id FROM paths'))
+        new_paths = [path for path in paths if path not in path_ids]
+        if new_paths:
+            cur.executemany(
+                'INSERT INTO paths (path) VALUES (?)',
+                ((path,) for path in new_paths),
+            )
+            path_ids = dict(cur.execute('SELECT path, id FROM paths'))
+        return path_ids
+
+    def commits(self) -> list[tuple[str, float]]:
+        """All recorded commits with their timestamps, oldest first."""
+        return list(self._conn.execute(
+            'SELECT sha, recorded_at FROM commits ORDER BY recorded_at, id'
+        ))
+
+    def history(
+            self,
+            path: str,
+            limit: int | None = None,
+    ) -> list[HistoryEntry]:
+        """The recorded aggregates of a node.
+
+        Args:
+            path: The path of the node, e.g. 'project/pkg/module.py'.
+            limit: Only return the latest ``limit`` entries.
+
+        Returns:
+            The entries of all commits with this node, oldest first.
+        """
+        rows = self._conn.execute(
+            """
+            SELECT c.sha, c.recorded_at, s.executable, s.skipped, s.missed
+            FROM paths p
+            JOIN stats s ON s.path_id = p.id
+            JOIN commits c ON c.id = s.commit_id
+            WHERE p.path = ?
+            ORDER BY c.recorded_at DESC, c.id DESC
+            LIMIT ?
+            """,
+            (
+                path.replace('\\', '/').strip('/'),
+                -1 if limit is None else limit,
+            ),
+        ).fetchall()
+        return [HistoryEntry(*row) for row in reversed(rows)]
+
+
+def record_main(args: Sequence[str] | None = None) -> int:
+    """Entry point for ``cov-tree record``."""
+    args_ns = get_record_arg_parser().parse_args(args)
+    try:
+        _, tree = build_cov_tree(args_ns.coverage_file)
+        with HistoryStore(args_ns.db) as store:
+            store.record(args_ns.commit, tree)
+    except Exception as e:
+        print(e)
+        return 1
+    return 0
+
+
+def history_main(args: Sequence[str] | None = None) -> int:
+    """Entry point for ``cov-tree history``."""
+    args_ns = get_history_arg_parser().parse_args(args)
+    # a query must not create the database, e.g. for a mistyped path
+    if not os.path.isfile(args_ns.db):
+        print(f'No history database "{args_ns.db}"')
+        return 1
+    try:
+        with HistoryStore(args_ns.db, read_only=True) as store:
+            entries = store.history(args_ns.path, args_ns.limit)
+    except sqlite3.Error as e:
+        print(f'Cannot read the history database "{args_ns.db}": {e}')
+        return 1
+    if not entries:
+        print(f'No history for "{args_ns.path}"')
+        return 1
+
+    width = max(len('Commit'), *(len(entry.sha) for entry in entries))
+    print('{:{w}}  {:>6s}  {:>6s}  {:>5s}'.format(
+        'Commit', 'Stmts', 'Miss', 'Cover', w=width))
+    print('-' * (width + 2 + 6 + 2 + 6 + 2 + 5))
+    for entry in entries:
+        print('{:{w}}  {:6,d}  {:6,d}  {:5.0%}'.format(
+            entry.sha,
+            entry.num_executable_lines,
+            entry.num_missed_lines,
+            entry.coverage, w=width))
+    return 0
+
+
+def get_record_arg_parser() -> ArgumentParser:
+    argparser = ArgumentParser(
+        'cov-tree record --commit SHA [coverage-file]',
+        description='Record the coverage of all nodes for a commit.',
+    )
+    argparser.add_argument(
+        'coverage_file',
+        nargs='?', default='.coverage',
+        help='The path to the coverage report file to record.',
+    )
+    argparser.add_argument(
+        '--commit', required=True,
+        help='The commit (or any other identifier) to record the coverage for.',
+    )
+    argparser.add_argument(
+        '--db', default=DEFAULT_DB,
+        help='The history database file.',
+    )
+    return argparser
+
+
+def get_history_arg_parser() -> ArgumentParser:
+    argparser = ArgumentParser(
+        'cov-tree history PATH',
+        description='Print the recorded coverage of a node over the commits.',
+    )
+    argparser.add_argument(
+        'path',
+        help='The path of the node in the tree, including the root, '
+        'e.g. "project/pkg/module.py".',
+    )
+    argparser.add_argument(
+        '-n', '--limit', default=None, type=int,
+        help='Only show the latest entries.',
+    )
+    argparser.add_argument(
+        '--db', default=DEFAULT_DB,
+        help='The history database file.',
+    )
+    return argparser
@@ -0,0 +1,221 @@
+from __future__ import annotations
+from typing import Any, Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import FIRST_COMPLETED
+import html
+import json
+import os
+
+from .core import CovNode, CovFile
+
+# the directory of the chunks, relative to the output directory
+_CHUNK_DIR = 'chunks'
+
+_PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Coverage: {title}</title>
+<style>
+body {{ font-family: monospace; margin: 2em; }}
+ul {{ list-style: none; padding-left: 1.5em; margin: 0; }}
+#tree > ul {{ padding-left: 0; }}
+.row {{ display: flex; white-space: pre; }}
+.row:hover {{ background: #eee; }}
+.name {{ flex: 1; overflow: hidden; text-overflow: ellipsis; }}
+.module > .row .name {{ cursor: pointer; font-weight: bold; }}
+.module > .row .name::before {{ content: "+ "; }}
+.module.open > .row .name::before {{ content: "- "; }}
+.leaf > .row .name::before {{ content: "  "; }}
+.num {{ width: 7em; text-align: right; }}
+.missing {{ width: 30em; padding-left: 2em; overflow: hidden;
+            text-overflow: ellipsis; color: #666; }}
+.good {{ color: #080; }} .ok {{ color: #a70; }} .bad {{ color: #c00; }}
+</style>
+</head>
+<body>
+<h1>Coverage: {title}</h1>
+<div class="row"><span class="name"></span><span class="num">Stmts</span>\
+<span class="num">Miss</span><span class="num">Cover</span>\
+<span class="missing">Missing</span></div>
+<div id="tree"></div>
+<script>
+var root = {root};
+var pending = {{}};
+
+// called by the chunk scripts, which (unlike fetch) also load from file://
+function covTreeChunk(id, rows) {{
+  var callback = pending[id];
+  delete pending[id];
+  if (callback) callback(rows);
+}}
+
+function loadChunk(id, callback) {{
+  pending[id] = callback;
+  var script = document.createElement('script');
+  script.src = '{chunk_dir}/' + id + '.js';
+  document.head.appendChild(script);
+}}
+
+function span(cls, text) {{
+  var el = document.createElement('span');
+  el.className = cls;
+  el.textContent = text;
+  return el;
+}}
+
+function makeNode(row) {{
+  var li = document.createElement('li');
+  var div = document.createElement('div');
+  var cov = row.p >= 0.97 ? 'good' : row.p >= 0.8 ? 'ok' : 'bad';
+  div.className = 'row ' + cov;
+  div.appendChild(span('name', row.n));
+  div.appendChild(span('num', row.s.toLocaleString()));
+  div.appendChild(span('num', row.m.toLocaleString()));
+  div.appendChild(span('num', Math.round(100 * row.p) + '%'));
+  div.appendChild(span('missing', row.l || ''));
+  li.appendChild(div);
+  if (row.c === undefined) {{
+    li.className = 'leaf';
+    return li;
+  }}
+  li.className = 'module';
+  var list = null;
+  div.firstChild.onclick = function () {{
+    if (list === null) {{
+      list = document.createElement('ul');
+      li.appendChild(list);
+      loadChunk(row.c, function (rows) {{ rows.forEach(function (child) {{
+        list.appendChild(makeNode(child));
+      }}); }});
+    }} else {{
+      list.hidden = !list.hidden;
+    }}
+    li.classList.toggle('open');
+  }};
+  return li;
+}}
+
+var rootList = document.createElement('ul');
+var node = makeNode(root);
+rootList.appendChild(node);
+document.getElementById('tree').appendChild(rootList);
+if (root.c !== undefined) node.firstChild.firstChild.onclick();
+</script>
+</body>
+</html>
+'''
+
+
+def _row(
+        node: CovNode,
+        chunk: int | None,
+        show_missing: bool,
+) -> dict[str, Any]:
+    """The (compact) data of a node in a chunk."""
+    row: dict[str, Any] = {
+        'n': node.name,
+        's': node.num_executable_lines,
+        'm': node.num_missed_lines,
+        'p': round(node.coverage, 4),
+    }
+    if chunk is not None:
+        row['c'] = chunk
+    elif show_missing and isinstance(node, CovFile) and node.missed_lines:
+        row['l'] = node.missed_lines_str()
+    return row
+
+
+def _expandable(
+        node: CovNode,
+        descend: Callable[[CovNode], bool] | None,
+) -> bool:
+    return len(node.children) > 0 and (descend is None or descend(node))
+
+
+def _iter_chunks(
+        tree: CovNode,
+        descend: Callable[[CovNode], bool] | None,
+        show_missing: bool,
+) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+    """Yield the chunks (the ids and rows of the children of the expandable
+    modules) in a single, iterative traversal of the tree."""
+    stack = [(0, tree)] if _expandable(tree, descend) else []
+    next_id = 1
+    while stack:
+        chunk, module = stack.pop()
+        rows = []
+        for child in module.children:
+            child_chunk = None
+            if _expandable(child, descend):
+                child_chunk = next_id
+                next_id += 1
+                stack.append((child_chunk, child))
+            rows.append(_row(child, child_chunk, show_missing))
+        yield chunk, rows
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def write_html(
+        tree: CovNode,
+        out_dir: str,
+        descend: Callable[[CovNode], bool] | None = None,
+        show_missing: bool = True,
+        max_workers: int | None = None,
+) -> int:
+    """Write an HTML report of a tree, whose modules are expanded on click.
+
+    The page only contains the root, the children of each module are written
+    to a separate small chunk (a script with the JSON of the rows), which is
+    loaded when the module is expanded first. Hence, the page opens instantly
+    independent of the size of the tree. The chunks are generated in a single
+    traversal of the tree and written by a pool of threads while the traversal
+    goes on.
+
+    Args:
+        tree: The tree to write.
+        out_dir: The directory to write ``index.html`` and the chunks to. It is
+                 created, if needed, and existing reports are overwritten.
+        descend: An optional callable that takes a node. If the return value
+                 is False, the node cannot be expanded.
+        show_missing: Whether to include the missed lines of the files.
+        max_workers: The maximal number of threads writing chunks.
+
+    Returns:
+        The number of chunks written.
+    """
+    chunk_dir = os.path.join(out_dir, _CHUNK_DIR)
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    root_chunk = 0 if _expandable(tree, descend) else None
+    root = json.dumps(
+        _row(tree, root_chunk, show_missing),
+    ).replace('</', '<\\/')
+    _write(os.path.join(out_dir, 'index.html'), _PAGE.format(
+        title=html.escape(tree.name), root=root, chunk_dir=_CHUNK_DIR,
+    ))
+
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    # bound the number of chunks in memory
+    max_pending = 4 * max_workers
+
+    num_chunks = 0
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending: set[Future] = set()
+        for chunk, rows in _iter_chunks(tree, descend, show_missing):
+            text = f'covTreeChunk({chunk}, {json.dumps(rows)});\n'
+            path = os.path.join(chunk_dir, f'{chunk}.js')
+            pending.add(executor.submit(_write, path, text))
+            num_chunks += 1
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+        for future in pending:
+            future.result()
+    return num_chunks
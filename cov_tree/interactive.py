@@ -0,0 +1,193 @@
+from __future__ import annotations
+from typing import Any
+
+from .core import CovNode
+
+
+class TreeView:
+    """The state of an interactive, virtualized tree view.
+
+    Only the rows of expanded modules are kept (as flat list of nodes and
+    their depths) and only the rows within the viewport are rendered. Hence,
+    neither opening nor scrolling depends on the size of the tree, and the
+    statistics of a node are only computed once it is shown.
+
+    Args:
+        tree: The tree to show. Initially, only the root is expanded.
+        height: The number of rows of the viewport.
+    """
+    def __init__(self, tree: CovNode, height: int = 20) -> None:
+        self.tree = tree
+        self.height = max(1, height)
+        self.rows: list[tuple[CovNode, int]] = [(tree, 0)]
+        self.cursor = 0
+        self.top = 0
+        self._expanded: set[int] = set()
+        self.expand(0)
+
+    @property
+    def current(self) -> CovNode:
+        """The node at the cursor."""
+        return self.rows[self.cursor][0]
+
+    def is_expanded(self, node: CovNode) -> bool:
+        return id(node) in self._expanded
+
+    def expand(self, row: int | None = None) -> None:
+        """Expand a module (at the cursor, by default)."""
+        row = self.cursor if row is None else row
+        node, depth = self.rows[row]
+        if node.is_leaf or self.is_expanded(node):
+            return
+        self._expanded.add(id(node))
+        self.rows[row + 1:row + 1] = [
+            (child, depth + 1) for child in node.children
+        ]
+
+    def collapse(self, row: int | None = None) -> None:
+        """Collapse a module (at the cursor, by default). If it is not
+        expanded, move the cursor to its parent instead."""
+        row = self.cursor if row is None else row
+        node, depth = self.rows[row]
+        if not self.is_expanded(node):
+            if row == self.cursor:
+                while row > 0 and self.rows[row][1] >= depth:
+                    row -= 1
+                self.move_to(row)
+            return
+
+        end = row + 1
+        while end < len(self.rows) and self.rows[end][1] > depth:
+            end += 1
+        for child, _ in self.rows[row + 1:end]:
+            self._expanded.discard(id(child))
+        self._expanded.discard(id(node))
+        del self.rows[row + 1:end]
+        self.move_to(min(self.cursor, len(self.rows) - 1))
+
+    def toggle(self) -> None:
+        """Expand or collapse the module at the cursor."""
+        if self.is_expanded(self.current):
+            self.collapse()
+        else:
+            self.expand()
+
+    def move(self, delta: int) -> None:
+        """Move the cursor by ``delta`` rows."""
+        self.move_to(self.cursor + delta)
+
+    def move_to(self, row: int) -> None:
+        """Move the cursor to the given row, scrolling as needed."""
+        self.cursor = max(0, min(row, len(self.rows) - 1))
+        self.top = max(0, min(self.top, len(self.rows) - self.height))
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.height:
+            self.top = self.cursor - self.height + 1
+
+    def resize(self, height: int) -> None:
+        self.height = max(1, height)
+        self.move_to(self.cursor)
+
+    def visible_rows(self) -> list[tuple[CovNode, int]]:
+        """The nodes and their depths within the viewport."""
+        return self.rows[self.top:self.top + self.height]
+
+    def format_row(self, node: CovNode, depth: int, width: int) -> str:
+        """Format a row to the given width."""
+        if node.is_leaf:
+            marker = '  '
+        else:
+            marker = '- ' if self.is_expanded(node) else '+ '
+        return _columns(
+            '  ' * depth + marker + node.name,
+            f'{node.num_executable_lines:,d}',
+            f'{node.num_missed_lines:,d}',
+            f'{node.coverage:.0%}',
+            width,
+        )
+
+    def format_header(self, width: int) -> str:
+        """Format the header of the rows to the given width."""
+        return _columns('Name', 'Stmts', 'Miss', 'Cover', width)
+
+
+def _columns(name: str, stmts: str, miss: str, cover: str, width: int) -> str:
+    """The columns of a row, with the name truncated to fit the width."""
+    stats = f'  {stmts:>6}  {miss:>6}  {cover:>5}'
+    name_width = max(0, width - len(stats))
+    if len(name) > name_width:
+        name = name[:max(0, name_width - 1)] + '~'
+    return f'{name:{name_width}}{stats}'[:width]
+
+
+_HELP = ' up/down/pgup/pgdn: move  enter/space: toggle  ' \
+    'right/left: expand/collapse  q: quit'
+
+
+def run(tree: CovNode) -> None:  # pragma: no cover
+    """Show the tree in an interactive terminal viewer (using curses)."""
+    import curses
+    curses.wrapper(_main_loop, tree)
+
+
+def _main_loop(screen: Any, tree: CovNode) -> None:  # pragma: no cover
+    import curses
+    from .print import cov_color
+
+    curses.curs_set(0)
+    colors = {}
+    if curses.has_colors():
+        curses.use_default_colors()
+        for i, (name, color) in enumerate([
+                ('light_red', curses.COLOR_RED),
+                ('yellow', curses.COLOR_YELLOW),
+                ('light_green', curses.COLOR_GREEN),
+        ], start=1):
+            curses.init_pair(i, color, -1)
+            colors[name] = curses.color_pair(i)
+
+    height, width = screen.getmaxyx()
+    view = TreeView(tree, height - 2)
+    while True:
+        screen.erase()
+        screen.addnstr(0, 0, view.format_header(width - 1), width - 1,
+                       curses.A_BOLD)
+        for y, (node, depth) in enumerate(view.visible_rows(), start=1):
+            attr = colors.get(cov_color(node.coverage) or '', 0)
+            if not node.is_leaf:
+                attr |= curses.A_BOLD
+            if node is view.current:
+                attr |= curses.A_REVERSE
+            screen.addnstr(y, 0, view.format_row(node, depth, width - 1),
+                           width - 1, attr)
+        screen.addnstr(height - 1, 0, _HELP, width - 1, curses.A_DIM)
+        screen.refresh()
+
+        key = screen.getch()
+        if key in (ord('q'), 27):
+            return
+        elif key == curses.KEY_RESIZE:
+            height, width = screen.getmaxyx()
+            view.resize(height - 2)
+        else:
+            _handle_key(view, key)
+
+
+def _handle_key(view: TreeView, key: int) -> None:  # pragma: no cover
+    import curses
+
+    if key in (curses.KEY_UP, ord('k')):
+        view.move(-1)
+    elif key in (curses.KEY_DOWN, ord('j')):
+        view.move(1)
+    elif key == curses.KEY_NPAGE:
+        view.move(view.height)
+    elif key == curses.KEY_PPAGE:
+        view.move(-view.height)
+    elif key in (curses.KEY_ENTER, 10, 13, ord(' ')):
+        view.toggle()
+    elif key in (curses.KEY_RIGHT, ord('l')):
+        view.expand()
+    elif key in (curses.KEY_LEFT, ord('h')):
+        view.collapse()
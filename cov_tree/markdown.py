@@ -0,0 +1,156 @@
+from __future__ import annotations
+from typing import Callable
+
+from .core import CovNode, CovFile
+from .print import SupportsWrite
+
+
+def _code(text: str) -> str:
+    """The text as code span in a table cell."""
+    text = text.replace('|', '\\|')
+    return f'`` {text} ``' if '`' in text else f'`{text}`'
+
+
+def _cells(name: str, node: CovNode, missing: str | None) -> str:
+    row = (
+        f'| {name} | {node.num_executable_lines:,d} '
+        f'| {node.num_missed_lines:,d} | {node.coverage:.0%} |'
+    )
+    if missing is not None:
+        row += f' {missing} |'
+    return row + '\n'
+
+
+class MarkdownTable:
+    """A Markdown table of a tree, collapsed to fit a size limit (e.g. of
+    comments on pull requests or of CI job summaries).
+
+    The table lists the nodes by their paths relative to the root, in tree
+    order, followed by the total. Collapsing it to a maximal depth leaves out
+    the nodes below this depth.
+
+    A single traversal renders the row of each node and sums the sizes of the
+    rows by depth. Hence, the size of the table for any maximal depth is a sum
+    of these sizes, and the deepest table fitting a size limit is found without
+    rendering any table.
+
+    Args:
+        tree: The tree to show.
+        descend: An optional callable that takes a node. If the return value
+                 is False, the children of this node are not shown.
+        show_missing: Add a column with the missed lines of the files.
+    """
+    def __init__(
+            self,
+            tree: CovNode,
+            descend: Callable[[CovNode], bool] | None = None,
+            show_missing: bool = False,
+    ) -> None:
+        self.tree = tree
+        self._rows: list[tuple[int, str]] = []
+        # the sizes (in bytes, UTF-8) of the rows by their depth
+        self._depth_sizes = [0]
+
+        missing = '' if show_missing else None
+        self._head = '| Name | Stmts | Miss | Cover |'
+        self._head += ' Missing |\n' if show_missing else '\n'
+        self._head += '|:--|--:|--:|--:|' + ('--|' if show_missing else '')
+        self._head += '\n'
+        self._total = _cells('**TOTAL**', tree, missing)
+
+        stack: list[tuple[CovNode, int, str]] = []
+        if descend is None or descend(tree):
+            stack.extend((child, 1, '') for child in reversed(tree.children))
+        while stack:
+            node, depth, prefix = stack.pop()
+            path = prefix + node.name
+            if isinstance(node, CovFile):
+                file_missing = missing
+                if show_missing and node.missed_lines:
+                    file_missing = _code(node.missed_lines_str())
+                row = _cells(_code(path), node, file_missing)
+            else:
+                row = _cells(_code(path + '/'), node, missing)
+            self._rows.append((depth, row))
+            if depth == len(self._depth_sizes):
+                self._depth_sizes.append(0)
+            self._depth_sizes[depth] += len(row.encode('utf-8'))
+            if descend is None or descend(node):
+                stack.extend(
+                    (child, depth + 1, path + '/')
+                    for child in reversed(node.children)
+                )
+
+    @property
+    def max_depth(self) -> int:
+        """The depth of the deepest row."""
+        return len(self._depth_sizes) - 1
+
+    def _note(self, depth: int) -> str:
+        if depth >= self.max_depth:
+            return ''
+        return f'\n_Collapsed below depth {depth} to fit the size limit._\n'
+
+    def size(self, depth: int | None = None) -> int:
+        """The size of the table in bytes (UTF-8) with the rows up to the
+        given depth (None for all)."""
+        if depth is None:
+            depth = self.max_depth
+        return (
+            len(self._head) + len(self._total.encode('utf-8'))
+            + sum(self._depth_sizes[:depth + 1]) + len(self._note(depth))
+        )
+
+    def fit(self, max_bytes: int) -> int:
+        """The largest depth of the rows for which the table fits into
+        ``max_bytes`` bytes.
+
+        Raises:
+            ValueError: If not even the total fits.
+        """
+        size = self.size(0)
+        if size > max_bytes:
+            raise ValueError(f'The table needs at least {size:,d} bytes, '
+                             f'which is more than {max_bytes:,d}')
+        # the note on collapsing is left out for the entire table, hence a
+        # deeper table can be smaller than a shallower one
+        best = 0
+        size = self.size(0) - len(self._note(0))
+        for depth in range(1, self.max_depth + 1):
+            size += self._depth_sizes[depth]
+            if size + len(self._note(depth)) <= max_bytes:
+                best = depth
+        return best
+
+    def render(self, depth: int | None = None) -> str:
+        """The table with the rows up to the given depth (None for all)."""
+        if depth is None:
+            depth = self.max_depth
+        rows = (row for row_depth, row in self._rows if row_depth <= depth)
+        return self._head + ''.join(rows) + self._total + self._note(depth)
+
+
+def write_markdown(
+        tree: CovNode,
+        file: SupportsWrite,
+        descend: Callable[[CovNode], bool] | None = None,
+        show_missing: bool = False,
+        max_bytes: int | None = None,
+) -> None:
+    """Write a Markdown table of a tree (see :class:`~MarkdownTable`).
+
+    Args:
+        tree: The tree to write.
+        file: The file to write to.
+        descend: An optional callable that takes a node. If the return value
+                 is False, the children of this node are not shown.
+        show_missing: Add a column with the missed lines of the files.
+        max_bytes: If given, collapse the table to the largest depth at which
+                   its size (in bytes, UTF-8) is at most this.
+
+    Raises:
+        ValueError: If not even the total fits into ``max_bytes``.
+    """
+    table = MarkdownTable(tree, descend, show_missing)
+    depth = None if max_bytes is None else table.fit(max_bytes)
+    file.write(table.render(depth))
@@ -1,9 +1,10 @@
 from __future__ import annotations
 from typing import Callable, Sequence
-from typing import Protocol, Any
-from termcolor import cprint
+from typing import Protocol, Any, TYPE_CHECKING
 
-from .core import CovNode
+from .core import CovNode, CovFile
+if TYPE_CHECKING:  # pragma: no cover
+    from .core.source import SourceFiles
 
 
 class SupportsWrite(Protocol):
@@ -48,6 +49,8 @@ def _print_tree(
         descend: Callable[[CovNode], bool] | None,
         file: SupportsWrite | None = None,
         no_ansi_escape: bool = False,
+        show_source: SourceFiles | None = None,
+        sort: str | None = None,
 ) -> None:
     print_: Callable[..., None]
     kwargs: dict[str, Any] = dict(
@@ -57,6 +60,7 @@ def _print_tree(
     if no_ansi_escape:
         print_ = print
     else:
+        from termcolor import cprint
         print_ = cprint
         kwargs.update(dict(
             color=cov_color(node.coverage) if cov_color else None,
@@ -91,9 +95,17 @@ def _print_tree(
             )
     print_('', file=file)
 
+    if show_source is not None and isinstance(node, CovFile):
+        indent = ''.join(
+            tree_set[0] if last else tree_set[1] for last in level_last
+        )
+        _print_source(node, show_source, indent, file)
+
     if not is_leaf_like:
-        for child in node.children:
-            last = child is node.children[-1]
+        children = node.children if sort is None else \
+            node.sorted_children(sort)
+        for child in children:
+            last = child is children[-1]
             _print_tree(
                 child,
                 level_last=level_last+(last,),
@@ -105,9 +117,24 @@ def _print_tree(
                 descend=descend,
                 file=file,
                 no_ansi_escape=no_ansi_escape,
+                show_source=show_source,
+                sort=sort,
             )
 
 
+def _print_source(
+        node: CovFile,
+        sources: SourceFiles,
+        indent: str,
+        file: SupportsWrite | None,
+) -> None:
+    """Print the missed source lines of a file, prefixed by their numbers."""
+    lines = sources.missed_lines(node)
+    width = len(str(max(lines, default=0)))
+    for lineno, line in sorted(lines.items()):
+        print(f'{indent}  {lineno:>{width}}  {line}'.rstrip(), file=file)
+
+
 def _max_tree_width(tree: CovNode, tab: int = 4) -> int:
     return max(
         (tab + _max_tree_width(child, tab) for child in tree.children),
@@ -124,32 +151,15 @@ def print_tree(
         descend: Callable[[CovNode], bool] | None = None,
         file: SupportsWrite | None = None,
         no_ansi_escape: bool = False,
+        show_source: SourceFiles | None = None,
+        sort: str | None = None,
 ) -> None:
     tree_set_ = _TREE_SET[tree_set]
     tab = len(tree_set_[0])
     tree_width = _max_tree_width(tree, tab)
 
-    print_: Callable[..., None]
-    if no_ansi_escape:
-        print_ = print
-        args = dict()
-    else:
-        print_ = cprint
-        args = dict(attrs=['bold'])
-
-    print_(
-        '{:{w}}  {:>6s}  {:>6s}  {:>5s}'.format(
-            '', 'Stmts', 'Miss', 'Cover', w=tree_width),
-        end='', file=file, **args
-    )
-    if show_missing:
-        print_('  Missing', end='', file=file, **args)
-    print_('', file=file)
-
-    print_('-' * (tree_width + 2 + 6 + 2 + 6 + 2 + 5), end='', file=file)
-    if show_missing:
-        print_('---------', end='', file=file)
-    print_('', file=file)
+    print_, args = _get_print(no_ansi_escape)
+    _print_header(print_, args, tree_width, show_missing, file)
 
     _print_tree(
         tree, tuple(),
@@ -161,17 +171,112 @@ def print_tree(
         descend=descend,
         file=file,
         no_ansi_escape=no_ansi_escape,
+        show_source=show_source,
+        sort=sort,
+    )
+
+    _print_footer(print_, tree, tree_width, show_missing, file)
+
+
+def print_top(
+        tree: CovNode,
+        nodes: Sequence[CovNode],
+        show_missing: bool = False,
+        cov_color: Callable[[float], str | None] | None = None,
+        file: SupportsWrite | None = None,
+        no_ansi_escape: bool = False,
+        show_source: SourceFiles | None = None,
+) -> None:
+    """Print a flat table of nodes (e.g. as found by :meth:`CovNode.top_k`),
+    named by their paths relative to ``tree``.
+
+    Args:
+        tree: The tree containing the nodes, used for the names and the total.
+        nodes: The nodes to print, in this order.
+        show_missing: Show the missed lines of each node.
+        cov_color: An optional function, mapping the coverage to a color.
+        file: The file to print to. Defaults to ``sys.stdout``.
+        no_ansi_escape: Do not use ANSI escape sequences (i.e. no colors).
+        show_source: If given, print the missed source lines of the files,
+                     as read from these source files.
+    """
+    depth = tree.depth
+    names = ['/'.join(node.path[depth:]) for node in nodes]
+    width = max(map(len, names), default=0)
+    width = max(width, len('TOTAL'))
+
+    print_, args = _get_print(no_ansi_escape)
+    _print_header(print_, args, width, show_missing, file)
+
+    for name, node in zip(names, nodes):
+        kwargs: dict[str, Any] = dict(file=file)
+        if not no_ansi_escape and cov_color:
+            kwargs['color'] = cov_color(node.coverage)
+        line = '{:{w}}  {:6,d}  {:6,d}  {:5.0%}'.format(
+            name,
+            node.num_executable_lines,
+            node.num_missed_lines,
+            node.coverage, w=width)
+        if show_missing:
+            line += f'  {node.missed_lines_str()}'
+        print_(line, **kwargs)
+        if show_source is not None and isinstance(node, CovFile):
+            _print_source(node, show_source, '', file)
+
+    _print_footer(print_, tree, width, show_missing, file)
+
+
+def _get_print(no_ansi_escape: bool) -> tuple[Callable[..., None], Any]:
+    """The print function to use and the arguments for bold printing."""
+    if no_ansi_escape:
+        return print, dict()
+    from termcolor import cprint
+    return cprint, dict(attrs=['bold'])
+
+
+def _print_header(
+        print_: Callable[..., None],
+        args: dict[str, Any],
+        width: int,
+        show_missing: bool,
+        file: SupportsWrite | None,
+) -> None:
+    print_(
+        '{:{w}}  {:>6s}  {:>6s}  {:>5s}'.format(
+            '', 'Stmts', 'Miss', 'Cover', w=width),
+        end='', file=file, **args
     )
+    if show_missing:
+        print_('  Missing', end='', file=file, **args)
+    print_('', file=file)
+    _print_divider(print_, width, show_missing, file)
+
 
-    print_('-' * (tree_width + 2 + 6 + 2 + 6 + 2 + 5), end='', file=file)
+def _print_divider(
+        print_: Callable[..., None],
+        width: int,
+        show_missing: bool,
+        file: SupportsWrite | None,
+) -> None:
+    print_('-' * (width + 2 + 6 + 2 + 6 + 2 + 5), end='', file=file)
     if show_missing:
         print_('---------', end='', file=file)
     print_('', file=file)
+
+
+def _print_footer(
+        print_: Callable[..., None],
+        tree: CovNode,
+        width: int,
+        show_missing: bool,
+        file: SupportsWrite | None,
+) -> None:
+    _print_divider(print_, width, show_missing, file)
     print_(
         '{:{w}}  {:6,d}  {:6,d}  {:5.0%}'.format(
             'TOTAL',
             tree.num_executable_lines,
             tree.num_missed_lines,
-            tree.coverage, w=tree_width),
+            tree.coverage, w=width),
         file=file,
     )
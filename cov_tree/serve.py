@@ -0,0 +1,269 @@
+from __future__ import annotations
+from typing import Sequence, Callable
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import StringIO
+from urllib.parse import urlsplit, parse_qs, unquote
+import json
+import os
+import threading
+
+from .core import CovNode, build_cov_tree
+from .core.merkle import RenderCache
+from .export import tree_to_dict
+from .print import print_tree
+
+
+class TreeCache:
+    """A thread-safe LRU cache of coverage trees.
+
+    Trees are keyed by the absolute path, the modification time and the size
+    of the coverage file. Hence, a changed coverage file is re-built on the
+    next access. Concurrent requests for a tree being built wait for this
+    build instead of building it again.
+
+    Args:
+        maxsize: The maximum number of trees to keep.
+        build: The function building a tree from a coverage file.
+    """
+    def __init__(
+            self,
+            maxsize: int = 8,
+            build: Callable[[str], tuple[str, CovNode]] = build_cov_tree,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError(f'Cache size must be positive, got {maxsize}')
+        self.maxsize = maxsize
+        self._build = build
+        self._trees: OrderedDict[tuple[str, int, int], tuple[str, CovNode]]
+        self._trees = OrderedDict()
+        # the builds in progress
+        self._building: dict[tuple[str, int, int], Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trees)
+
+    def get(self, cov_file: str) -> tuple[str, CovNode]:
+        """Get the tree for a coverage file, building it if needed.
+
+        Args:
+            cov_file: The path to the coverage file.
+
+        Returns:
+            A tuple of the path to the root node and the root node of the tree
+            (as returned by :func:`~cov_tree.build_cov_tree`).
+        """
+        path = os.path.abspath(cov_file)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._trees:
+                self._trees.move_to_end(key)
+                return self._trees[key]
+            building = self._building.get(key)
+            if building is None:
+                future: Future = Future()
+                self._building[key] = future
+        if building is not None:
+            return building.result()
+
+        try:
+            result = self._build(path)
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._building[key]
+            # drop outdated versions of the same file
+            for old in [k for k in self._trees if k[0] == path]:
+                del self._trees[old]
+            self._trees[key] = result
+            while len(self._trees) > self.maxsize:
+                self._trees.popitem(last=False)
+        future.set_result(result)
+        return result
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _render_text(
+        tree: CovNode,
+        descend: Callable[[CovNode], bool] | None,
+        show_missing: bool,
+) -> str:
+    with StringIO() as string_io:
+        print_tree(
+            tree, file=string_io, no_ansi_escape=True,
+            show_missing=show_missing, descend=descend,
+        )
+        return string_io.getvalue()
+
+
+class CovTreeRequestHandler(BaseHTTPRequestHandler):
+    """Handle requests for the rendered (sub-)trees.
+
+    The request path is the path of the subtree below the root (e.g.
+    ``/pkg/sub``, or ``/`` for the entire tree). The query parameters are:
+
+    * ``file``: one of the coverage files served (defaults to the first one)
+    * ``format``: ``text`` (default) or ``json``
+    * ``threshold``: collapse modules with at least this coverage (in percent)
+    * ``missing``: show the missing lines, if ``1``
+
+    The rendered subtrees are cached by their content hashes, hence subtrees
+    that did not change with a re-built coverage file are not rendered again.
+    """
+    server: CovTreeServer
+
+    def do_GET(self) -> None:
+        try:
+            content_type, body = self._render()
+            status = HTTPStatus.OK
+        except _HTTPError as e:
+            content_type, body = 'text/plain', f'{e}\n'
+            status = e.status
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)  # pragma: no cover
+
+    def _render(self) -> tuple[str, str]:
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        tree = self._get_tree(unquote(url.path), query)
+
+        descend: Callable[[CovNode], bool] | None = None
+        threshold: float | None = None
+        if 'threshold' in query:
+            try:
+                threshold = float(query['threshold']) / 100
+            except ValueError:
+                raise _HTTPError(HTTPStatus.BAD_REQUEST,
+                                 'The threshold must be a number') from None
+            descend = lambda n: n.coverage < threshold  # noqa: E731
+        show_missing = query.get('missing', '0') == '1'
+
+        fmt = query.get('format', 'text')
+        if fmt == 'json':
+            content_type, render = 'application/json', lambda node: json.dumps(
+                tree_to_dict(node, descend, show_missing))
+        elif fmt == 'text':
+            content_type, render = 'text/plain', lambda node: _render_text(
+                node, descend, show_missing)
+        else:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, f'Unknown format: {fmt}')
+        options = (fmt, threshold, show_missing)
+        return content_type, self.server.renders.get(tree, options, render)
+
+    def _get_tree(self, path: str, query: dict[str, str]) -> CovNode:
+        cov_file = query.get('file', self.server.cov_files[0])
+        if cov_file not in self.server.cov_files:
+            raise _HTTPError(HTTPStatus.NOT_FOUND,
+                             f'Unknown coverage file: {cov_file}')
+        try:
+            _, tree = self.server.cache.get(cov_file)
+        except Exception as e:
+            raise _HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+
+        for name in path.strip('/').split('/'):
+            if not name:
+                continue
+            try:
+                tree = tree[name]
+            except KeyError:
+                raise _HTTPError(HTTPStatus.NOT_FOUND,
+                                 f'No such node: {path}') from None
+        return tree
+
+
+class CovTreeServer(ThreadingHTTPServer):
+    """A local HTTP server for rendered coverage trees, see
+    :class:`~CovTreeRequestHandler`.
+
+    Args:
+        cov_files: The coverage files that can be requested.
+        address: The host and port to listen on.
+        cache_size: The number of trees to cache.
+        render_cache_size: The number of rendered subtrees to cache.
+        quiet: Do not log the requests.
+    """
+    daemon_threads = True
+
+    def __init__(
+            self,
+            cov_files: Sequence[str],
+            address: tuple[str, int] = ('127.0.0.1', 8000),
+            cache_size: int = 8,
+            render_cache_size: int = 256,
+            quiet: bool = False,
+    ) -> None:
+        if not cov_files:
+            raise ValueError('At least one coverage file must be served')
+        self.cov_files = list(cov_files)
+        self.cache = TreeCache(cache_size)
+        self.renders = RenderCache(render_cache_size)
+        self.quiet = quiet
+        super().__init__(address, CovTreeRequestHandler)
+
+
+def main(args: Sequence[str] | None = None) -> int:
+    """Entry point for ``cov-tree serve``."""
+    args_ns = get_arg_parser().parse_args(args)
+
+    server = CovTreeServer(
+        args_ns.coverage_files,
+        (args_ns.host, args_ns.port),
+        cache_size=args_ns.cache_size,
+    )
+    print(f'Serving coverage trees on '
+          f'http://{args_ns.host}:{server.server_port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def get_arg_parser() -> ArgumentParser:
+    argparser = ArgumentParser(
+        'cov-tree serve [coverage-file ...]',
+        description='Serve rendered coverage trees (as text or JSON) via HTTP.',
+    )
+
+    argparser.add_argument(
+        'coverage_files',
+        nargs='*', default=['.coverage'],
+        help='The path(s) to the coverage report file(s) to serve.',
+    )
+    argparser.add_argument(
+        '--host', default='127.0.0.1',
+        help='The host to listen on.',
+    )
+    argparser.add_argument(
+        '-p', '--port', default=8000, type=int,
+        help='The port to listen on.',
+    )
+    argparser.add_argument(
+        '--cache-size', default=8, type=int,
+        help='The maximum number of trees to keep in memory.',
+    )
+
+    return argparser
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import pytest
+import json
+import os
+import pathlib
+
+from cov_tree.batch import read_manifest, run_batch, get_available_formats
+from cov_tree.core import AnalysisCache
+
+
+def test_read_manifest(tmp_path: pathlib.Path) -> None:
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text(
+        '# services\n'
+        'svc_a/.coverage\n'
+        '\n'
+        '  /abs/svc_b/.coverage.unit  \n'
+        'data/cov.db  custom name\n'
+        'svc_c/.coverage\tname\twith tab\n'
+    )
+    assert read_manifest(str(manifest)) == [
+        ('svc_a', str(tmp_path / 'svc_a/.coverage')),
+        ('svc_b.unit', '/abs/svc_b/.coverage.unit'),
+        ('custom name', str(tmp_path / 'data/cov.db')),
+        ('name\twith tab', str(tmp_path / 'svc_c/.coverage')),
+    ]
+
+    manifest.write_text('a/.coverage\nb/.coverage a\n')
+    with pytest.raises(ValueError, match='Duplicate'):
+        read_manifest(str(manifest))
+
+
+@pytest.mark.parametrize('max_workers', [None, 2])
+def test_run_batch(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        max_workers: int | None,
+) -> None:
+    out_dir = tmp_path / 'reports'
+    cache = AnalysisCache()
+    results = run_batch(
+        [('first', cov_file), ('second', cov_file),
+         ('broken', str(tmp_path / 'missing'))],
+        str(out_dir),
+        show_missing=True,
+        threshold=0.9,
+        max_workers=max_workers,
+        analysis_cache=cache,
+    )
+    assert [r.name for r in results] == ['first', 'second', 'broken']
+    assert [r.error is None for r in results] == [True, True, False]
+    assert sorted(os.listdir(out_dir)) == ['first.txt', 'second.txt']
+
+    text = (out_dir / 'first.txt').read_text()
+    assert text == (out_dir / 'second.txt').read_text()
+    assert '\x1b' not in text
+    assert 'tool.py' in text and '3-4' in text
+    # pkg_a/sub is fully covered, hence collapsed
+    assert 'mod.py' in text and 'deep.py' not in text
+
+    if max_workers is None:
+        assert cache.hits == cache.misses == 6
+    else:
+        assert len(cache) == 0
+
+
+def test_run_batch_json(cov_file: str, tmp_path: pathlib.Path) -> None:
+    assert 'json' in get_available_formats()
+    result, = run_batch([('x', cov_file)], str(tmp_path), 'json')
+    assert result.out_file == str(tmp_path / 'x.json')
+    with open(result.out_file) as f:
+        data = json.load(f)
+    assert data['name'] == 'project'
+    assert data['num_missed_lines'] == 4
+
+    with pytest.raises(ValueError, match='Unknown format'):
+        run_batch([('x', cov_file)], str(tmp_path), 'xml')
+
+
+def test_run_batch_markdown(cov_file: str, tmp_path: pathlib.Path) -> None:
+    result, = run_batch([('x', cov_file)], str(tmp_path), 'markdown',
+                        threshold=0.9)
+    assert result.out_file == str(tmp_path / 'x.md')
+    with open(result.out_file) as f:
+        lines = f.read().splitlines()
+    assert lines[2] == '| `pkg_a/` | 13 | 2 | 85% |'
+    assert '| `pkg_a/sub/` | 3 | 0 | 100% |' in lines
+    assert lines[-1] == '| **TOTAL** | 18 | 4 | 78% |'
@@ -1,17 +1,44 @@
 from __future__ import annotations
 import pytest
+import pathlib
+import os
+import io
+import json
+import sys
+from typing import Any
+from pytest_mock import MockFixture
 
-from cov_tree.cmdline import get_arg_parser, main
+from cov_tree.cmdline import get_arg_parser, main, _ProgressLine
+from cov_tree.core import BuildProgress
 from cov_tree import __version__
 
 
-DEF_ARGS = {
+DEF_ARGS: dict[str, Any] = {
     'coverage_file': '.coverage',
     'threshold': None,
     'show_missing': False,
     'summarize': False,
     'set': 'ascii',
     'color': False,
+    'top': None,
+    'top_by': 'missed',
+    'min_statements': 0,
+    'max_rows': None,
+    'jobs': None,
+    'max_depth': None,
+    'diff_from': None,
+    'diff_root': None,
+    'interactive': False,
+    'batch': None,
+    'out_dir': 'reports',
+    'format': 'text',
+    'group_by': None,
+    'remap': [],
+    'show_source': False,
+    'html': None,
+    'sort': None,
+    'regions': False,
+    'max_bytes': None,
 }
 
 
@@ -21,7 +48,10 @@ def test_args() -> None:
 
     assert set(name for name, _ in args._get_kwargs()) == {
         'coverage_file', 'threshold', 'show_missing', 'summarize', 'set',
-        'color',
+        'color', 'top', 'top_by', 'min_statements', 'max_rows',
+        'jobs', 'max_depth', 'diff_from', 'diff_root', 'interactive',
+        'batch', 'out_dir', 'format', 'group_by',
+        'remap', 'show_source', 'html', 'sort', 'regions', 'max_bytes',
     }
 
     assert args.coverage_file == '.coverage'
@@ -38,3 +68,332 @@ def test_main_version(capsys: pytest.CaptureFixture) -> None:
     captured = capsys.readouterr()
     assert __version__ in captured.out
     assert captured.err == ""
+
+
+def test_main_sub_command(mocker: MockFixture) -> None:
+    serve_main = mocker.patch('cov_tree.serve.main', return_value=0)
+    assert main(['serve', 'a', '--port', '1234']) == 0
+    serve_main.assert_called_once_with(['a', '--port', '1234'])
+
+
+def test_main_tree(cov_file: str, capsys: pytest.CaptureFixture) -> None:
+    assert main([cov_file, '--no-color', '-m']) == 0
+    captured = capsys.readouterr()
+    assert captured.out.splitlines()[2].startswith('project')
+    assert 'tool.py' in captured.out
+
+
+def test_main_jobs(cov_file: str, capsys: pytest.CaptureFixture) -> None:
+    assert main([cov_file, '--no-color']) == 0
+    expect = capsys.readouterr().out
+    assert main([cov_file, '--no-color', '-j', '2']) == 0
+    assert capsys.readouterr().out == expect
+
+
+def test_progress_line(mocker: MockFixture) -> None:
+    mocker.patch('time.monotonic', side_effect=[10.0, 10.05, 10.2, 10.25])
+    out = io.StringIO()
+    line = _ProgressLine(out)
+    line(BuildProgress(0, 200, '', 0.0))
+    line(BuildProgress(1, 200, 'a.py', 1.0))  # throttled
+    line(BuildProgress(100, 200, 'b.py', 90.0))
+    line(BuildProgress(200, 200, 'c.py', 180.0))  # the last is not throttled
+    lines = out.getvalue().split('\r')[1:]
+    assert lines == [
+        '  0% 0/200 files, ETA -:--  ',
+        ' 50% 100/200 files, ETA 1:30  b.py',
+        '100% 200/200 files, ETA 0:00  c.py',
+    ]
+
+    out.seek(0)
+    out.truncate()
+    line.clear()
+    assert out.getvalue() == '\r' + ' ' * 34 + '\r'
+    line.clear()
+    assert out.getvalue() == '\r' + ' ' * 34 + '\r'
+
+
+def test_main_progress(
+        cov_file: str,
+        mocker: MockFixture,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    mocker.patch.object(sys.stderr, 'isatty', return_value=True)
+    assert main([cov_file, '--no-color']) == 0
+    captured = capsys.readouterr()
+    assert '6/6 files' in captured.err
+    assert captured.err.endswith('\r')
+    assert 'project' in captured.out
+
+
+def test_main_show_source(
+        cov_file: str,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    assert main([cov_file, '--no-color', '--show-source']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    idx = next(i for i, line in enumerate(lines) if 'tool.py' in line)
+    assert lines[idx + 1:idx + 3] == [
+        '          3  c = 3',
+        '          4  d = 4',
+    ]
+
+
+def test_main_html(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    out_dir = tmp_path / 'html'
+    assert main([cov_file, '--html', str(out_dir), '-t', '90']) == 0
+    assert capsys.readouterr().out == f'{out_dir / "index.html"}\n'
+    assert (out_dir / 'index.html').exists()
+    # pkg_a/sub is collapsed
+    assert len(list((out_dir / 'chunks').iterdir())) == 3
+
+
+def test_main_html_jobs(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        mocker: MockFixture,
+) -> None:
+    # the writer threads are not set by --jobs, which would make the build
+    # sharded (and hence fail with --regions)
+    write_html = mocker.patch('cov_tree.html_report.write_html')
+    assert main([cov_file, '--html', str(tmp_path), '--regions']) == 0
+    assert 'max_workers' not in write_html.call_args.kwargs
+
+
+@pytest.mark.parametrize('options, show_missing', [([], False), (['-m'], True)])
+def test_main_html_show_missing(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        mocker: MockFixture,
+        options: list[str],
+        show_missing: bool,
+) -> None:
+    write_html = mocker.patch('cov_tree.html_report.write_html')
+    assert main([cov_file, '--html', str(tmp_path), *options]) == 0
+    assert write_html.call_args.kwargs['show_missing'] is show_missing
+
+
+def test_main_sort(cov_file: str, capsys: pytest.CaptureFixture) -> None:
+    assert main([cov_file, '--no-color', '-s', '--sort', 'coverage']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    names = [line.split()[-4] for line in lines[3:-2]]
+    assert names == [
+        'pkg_b', 'tool.py', '__init__.py',
+        'pkg_a', 'mod.py', '__init__.py', 'sub', '__init__.py', 'deep.py',
+    ]
+
+
+def test_main_regions(
+        cov_file: str,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    assert main([cov_file, '--no-color', '--regions', '--show-source']) == 0
+    out = capsys.readouterr().out
+    assert 'Klass.method()' in out
+    assert 'return self.attr' in out
+
+    assert main([cov_file, '--regions', '-d', '1']) == 1
+    assert 'cannot be combined' in capsys.readouterr().out
+
+
+def test_main_markdown(
+        cov_file: str,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    assert main([cov_file, '--format', 'markdown']) == 0
+    full = capsys.readouterr().out
+    assert '| `pkg_a/sub/deep.py` | 3 | 0 | 100% |' in full
+
+    assert main([cov_file, '--format', 'markdown', '--max-bytes', '380']) == 0
+    out = capsys.readouterr().out
+    assert len(out.encode('utf-8')) <= 380
+    assert '| `pkg_a/mod.py` | 9 | 2 | 78% |' in out
+    assert 'deep.py' not in out
+    assert 'Collapsed below depth 2' in out
+
+    assert main([cov_file, '--format', 'markdown', '--max-bytes', '10']) == 1
+    assert 'more than 10' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('options, message', [
+    ([], 'requires --format markdown\n'),
+    (['--format', 'json'], 'requires --format markdown\n'),
+    (['--format', 'markdown', '--top', '3'], 'combined with --top\n'),
+    (['--format', 'markdown', '--html', 'out', '-i'],
+     'combined with --html, --interactive\n'),
+])
+def test_main_max_bytes_ignored(
+        cov_file: str,
+        capsys: pytest.CaptureFixture,
+        options: list[str],
+        message: str,
+) -> None:
+    with pytest.raises(SystemExit):
+        main([cov_file, '--max-bytes', '1000', *options])
+    assert capsys.readouterr().err.endswith(message)
+
+
+def test_main_json(cov_file: str, capsys: pytest.CaptureFixture) -> None:
+    assert main([cov_file, '--format', 'json']) == 0
+    data = json.loads(capsys.readouterr().out)
+    assert data['name'] == 'project'
+    assert data['num_missed_lines'] == 4
+
+
+def test_main_top(cov_file: str, capsys: pytest.CaptureFixture) -> None:
+    assert main([cov_file, '--top', '1', '--top-by', 'coverage']) == 0
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    assert lines[2].startswith('project/pkg_b/tool.py')
+    assert len(lines) == 5
+
+
+def test_main_error(capsys: pytest.CaptureFixture) -> None:
+    assert main(['does/not/exist']) == 1
+    assert capsys.readouterr().out
+
+
+@pytest.mark.parametrize('options, num_rows', [
+    ([], 10),
+    (['-t', '80'], 5),
+    (['-t', '0'], 1),
+    (['--max-rows', '6'], 5),
+    (['--max-rows', '5'], 5),
+    (['--max-rows', '4'], 1),
+    (['--max-rows', '100'], 10),
+    (['--max-rows', '7', '-t', '80'], 5),
+    (['--max-depth', '1'], 3),
+    (['--max-depth', '2', '-t', '80'], 5),
+])
+def test_main_collapse(
+        cov_file: str,
+        capsys: pytest.CaptureFixture,
+        options: list[str],
+        num_rows: int,
+) -> None:
+    assert main([cov_file, *options]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    # header, divider, the tree rows, divider and total
+    assert len(lines) == num_rows + 4
+
+
+def test_main_diff(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    patch = tmp_path / 'change.patch'
+    patch.write_text(
+        '--- a/pkg_b/tool.py\n'
+        '+++ b/pkg_b/tool.py\n'
+        '@@ -2,0 +3,2 @@\n'
+        '+c = 3\n'
+        '+d = 4\n'
+    )
+    project = str(tmp_path / 'project')
+    assert main([
+        cov_file, '--diff-from', str(patch), '--diff-root', project, '-m',
+    ]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3 + 4
+    assert lines[4].startswith('    └── tool.py')
+    assert lines[4].endswith('2       2     0%  3-4')
+
+    # relative to the git repository of the files by default
+    assert main([cov_file, '--diff-from', str(patch)]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1 + 4
+    (tmp_path / 'project' / '.git').mkdir()
+    assert main([cov_file, '--diff-from', str(patch), '-m']) == 0
+    assert capsys.readouterr().out.splitlines()[4].endswith('0%  3-4')
+
+    # collapsed modules have no lines to restrict
+    assert main([cov_file, '--diff-from', str(patch), '-d', '1']) == 1
+    assert 'cannot be combined' in capsys.readouterr().out
+
+
+def test_main_interactive(cov_file: str, mocker: MockFixture) -> None:
+    run = mocker.patch('cov_tree.interactive.run')
+    assert main([cov_file, '-i']) == 0
+    assert run.call_args[0][0].name == 'project'
+
+
+def test_main_batch(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text(f'{cov_file} ok\n')
+    out_dir = tmp_path / 'out'
+    assert main(['--batch', str(manifest), '--out-dir', str(out_dir),
+                 '--format', 'json', '-t', '90']) == 0
+    assert os.listdir(out_dir) == ['ok.json']
+    assert capsys.readouterr().out.endswith('ok.json\n')
+
+    manifest.write_text(f'{cov_file}.missing bad\n')
+    assert main(['--batch', str(manifest), '--out-dir', str(out_dir)]) == 1
+    assert capsys.readouterr().out.startswith(f'{cov_file}.missing: ')
+
+
+def test_main_group_by(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    codeowners = tmp_path / '.github' / 'CODEOWNERS'
+    codeowners.parent.mkdir()
+    codeowners.write_text(
+        '*  @all\n'
+        '/project/pkg_a/  @team-a  # the first package\n'
+        '/project/pkg_a/sub/\n'
+    )
+    assert main([cov_file, '--group-by', str(codeowners), '-s']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[-4:] for line in lines[2:-2]] == [
+        ['project', '18', '4', '78%'],
+        ['@team-a', '10', '2', '80%'],
+        ['<none>', '3', '0', '100%'],
+        ['@all', '5', '2', '60%'],
+    ]
+
+    # collapsed modules have no files to group
+    assert main([cov_file, '--group-by', str(codeowners), '-d', '1']) == 1
+    assert 'cannot be combined' in capsys.readouterr().out
+
+
+def test_main_group_by_relative_paths(
+        relative_cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    codeowners = tmp_path / 'project' / 'CODEOWNERS'
+    codeowners.write_text('/pkg_a/  @team-a\n')
+    assert main([relative_cov_file, '--group-by', str(codeowners), '-s']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[-4:] for line in lines[2:-2]] == [
+        ['<root>', '18', '4', '78%'],
+        ['@team-a', '13', '2', '85%'],
+        ['<none>', '5', '2', '60%'],
+    ]
+
+
+def test_main_remap(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    # the sources moved after measuring
+    other = tmp_path / 'other'
+    (tmp_path / 'project').rename(other)
+    assert main([cov_file]) == 1
+    capsys.readouterr()
+    assert main([cov_file, '--remap', f'{other}={tmp_path}/project']) == 0
+    captured = capsys.readouterr()
+    assert captured.out.splitlines()[2].startswith('other')
+
+    assert main([cov_file, '--remap', 'bad']) == 1
+    assert main([cov_file, '--remap', 'a=b', '-d', '1']) == 1
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import pytest
+import pathlib
+from typing import Any, Callable
+
+
+SOURCES = {
+    'pkg_a/__init__.py': 'from .mod import func\n',
+    'pkg_a/mod.py': (
+        'import os\n'
+        '\n'
+        '\n'
+        'def func(x):\n'
+        '    if x:\n'
+        '        return 1\n'
+        '    return 2\n'
+        '\n'
+        '\n'
+        'class Klass:\n'
+        '    attr = 1\n'
+        '\n'
+        '    def method(self):\n'
+        '        return self.attr\n'
+    ),
+    'pkg_a/sub/__init__.py': '',
+    'pkg_a/sub/deep.py': 'x = 1\ny = 2\nz = 3\n',
+    'pkg_b/__init__.py': 'VERSION = 1\n',
+    'pkg_b/tool.py': 'a = 1\nb = 2\nc = 3\nd = 4\n',
+}
+
+EXECUTED = {
+    'pkg_a/__init__.py': [1],
+    'pkg_a/mod.py': [1, 4, 5, 6, 10, 11, 13],
+    'pkg_a/sub/__init__.py': [],
+    'pkg_a/sub/deep.py': [1, 2, 3],
+    'pkg_b/__init__.py': [1],
+    'pkg_b/tool.py': [1, 2],
+}
+
+
+def write_project(
+        root: pathlib.Path,
+        executed: dict[str, list[int]] = EXECUTED,
+        data_file: str = '.coverage',
+        relative: bool = False,
+) -> str:
+    """Write the sample sources below ``root / 'project'`` and a coverage data
+    file with the given executed lines, measured at paths relative to the
+    project if ``relative``. Returns the path to the data file."""
+    from coverage import CoverageData  # type: ignore
+
+    for rel_path, source in SOURCES.items():
+        path = root / 'project' / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+
+    data = CoverageData(basename=str(root / data_file))
+    data.add_lines({
+        rel_path if relative else str(root / 'project' / rel_path): lines
+        for rel_path, lines in executed.items()
+    })
+    data.write()
+    return str(root / data_file)
+
+
+@pytest.fixture
+def cov_file(tmp_path: pathlib.Path) -> str:
+    """The path to a coverage data file of a small sample project."""
+    return write_project(tmp_path)
+
+
+@pytest.fixture
+def relative_cov_file(
+        tmp_path: pathlib.Path,
+        monkeypatch: pytest.MonkeyPatch,
+) -> str:
+    """The path to a coverage data file of the sample project measured at
+    relative paths (e.g. in a CI job), with the project as current directory.
+    The tree has a synthetic root, as the packages are top-level directories.
+    """
+    cov_file = write_project(tmp_path, relative=True)
+    monkeypatch.chdir(tmp_path / 'project')
+    return cov_file
+
+
+@pytest.fixture
+def make_cov_file(tmp_path: pathlib.Path) -> Callable[..., str]:
+    """A function writing the sample project with custom executed lines, see
+    :func:`write_project`."""
+    def make(
+            executed: dict[str, list[int]] = EXECUTED,
+            **kwargs: Any,
+    ) -> str:
+        return write_project(tmp_path, executed, **kwargs)
+    return make
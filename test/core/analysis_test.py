@@ -0,0 +1,73 @@
+from __future__ import annotations
+import os
+from typing import Callable
+from coverage import CoverageData  # type: ignore
+
+from cov_tree.core.analysis import AnalysisCache
+from cov_tree.core.builder import build_cov_tree, _read_coverage
+
+
+def test_analysis_cache(make_cov_file: Callable[..., str]) -> None:
+    cov_file = make_cov_file()
+    cov = _read_coverage(cov_file)
+    cache = AnalysisCache()
+    files = sorted(cov.get_data().measured_files())
+    for path in files:
+        _, executable, skipped, missed, _ = cov.analysis2(path)
+        assert cache.analyse(cov, path) == \
+            (set(executable), set(skipped), set(missed))
+    assert len(cache) == len(files)
+    assert (cache.hits, cache.misses) == (0, len(files))
+
+    # the same sources with other data only reuse the analysis
+    other = cov_file + '.other'
+    data = CoverageData(basename=other)
+    data.add_lines({files[-1]: [1, 2, 3, 4]})
+    data.write()
+    _, tree = build_cov_tree(other, analysis_cache=cache)
+    assert tree.name == 'tool.py'
+    assert tree.num_missed_lines == 0
+    assert (cache.hits, cache.misses) == (1, len(files))
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_analysis_cache_source_changed(
+        make_cov_file: Callable[..., str],
+) -> None:
+    cov_file = make_cov_file()
+    cache = AnalysisCache()
+    _, tree = build_cov_tree(cov_file, analysis_cache=cache)
+    assert tree['pkg_b']['tool.py'].num_executable_lines == 4
+
+    source = os.path.join(os.path.dirname(cov_file), 'project', 'pkg_b',
+                          'tool.py')
+    with open(source, 'a') as f:
+        f.write('e = 5\n')
+    _, tree = build_cov_tree(cov_file, analysis_cache=cache)
+    assert tree['pkg_b']['tool.py'].num_executable_lines == 5
+    assert tree['pkg_b']['tool.py'].missed_lines_str() == '3-5'
+    assert cache.misses == 7
+
+
+def test_analysis_cache_copies(make_cov_file: Callable[..., str]) -> None:
+    cov_file = make_cov_file()
+    source = os.path.join(os.path.dirname(cov_file), 'project', 'pkg_b',
+                          'tool.py')
+    copy = os.path.join(os.path.dirname(cov_file), 'vendor', 'tool.py')
+    os.makedirs(os.path.dirname(copy))
+    with open(source) as f_in, open(copy, 'w') as f_out:
+        f_out.write(f_in.read())
+
+    other = cov_file + '.other'
+    data = CoverageData(basename=other)
+    data.add_lines({source: [1, 2], copy: [1, 2, 3, 4]})
+    data.write()
+    cov = _read_coverage(other)
+    cache = AnalysisCache()
+    # copies of a source at other paths share its analysis
+    assert cache.analyse(cov, source) == ({1, 2, 3, 4}, set(), {3, 4})
+    assert cache.analyse(cov, copy) == ({1, 2, 3, 4}, set(), set())
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import pytest
+import asyncio
+from typing import Any
+
+from cov_tree.core.builder import build_cov_tree
+from cov_tree.core.async_builder import build_cov_tree_async, _IN_FLIGHT
+from cov_tree.core.progress import BuildProgress, CancelToken, BuildCancelled
+
+
+def test_build_cov_tree_async(cov_file: str) -> None:
+    progress: list[BuildProgress] = []
+    base, tree = asyncio.run(build_cov_tree_async(
+        cov_file, batch_size=4, progress=progress.append,
+    ))
+    expect_base, expect = build_cov_tree(cov_file)
+
+    assert base == expect_base
+    assert tree.is_root
+    assert [
+        (n.path, n.num_executable_lines, n.num_missed_lines)
+        for n in tree.iter_tree()
+    ] == [
+        (n.path, n.num_executable_lines, n.num_missed_lines)
+        for n in expect.iter_tree()
+    ]
+    assert [(p.done, p.total) for p in progress] == [(0, 6), (4, 6), (6, 6)]
+    assert progress[0].path == ''
+    assert progress[-1].path.endswith('tool.py')
+
+
+def test_build_cov_tree_async_shared(cov_file: str) -> None:
+    async def run() -> Any:
+        return await asyncio.gather(
+            build_cov_tree_async(cov_file, batch_size=1),
+            build_cov_tree_async(cov_file, batch_size=1),
+            build_cov_tree_async(cov_file, drop_ext=True),
+        )
+
+    (_, tree_1), (_, tree_2), (_, tree_3) = asyncio.run(run())
+    assert tree_1 is tree_2
+    assert tree_1 is not tree_3
+
+
+def test_build_cov_tree_async_cancel(cov_file: str) -> None:
+    async def run() -> None:
+        task = asyncio.ensure_future(
+            build_cov_tree_async(cov_file, batch_size=1)
+        )
+        await asyncio.sleep(0)
+        assert len(_IN_FLIGHT[asyncio.get_running_loop()]) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        assert len(_IN_FLIGHT[asyncio.get_running_loop()]) == 0
+
+    asyncio.run(run())
+
+
+def test_build_cov_tree_async_cancel_token(cov_file: str) -> None:
+    token = CancelToken()
+    progress: list[int] = []
+
+    def cancel_after_first_batch(p: BuildProgress) -> None:
+        progress.append(p.done)
+        if p.done > 0:
+            token.cancel()
+
+    async def run() -> Any:
+        return await asyncio.gather(
+            build_cov_tree_async(
+                cov_file, batch_size=2, cancel=token,
+                progress=cancel_after_first_batch,
+            ),
+            # not shared with the cancelled build
+            build_cov_tree_async(cov_file, batch_size=2),
+            return_exceptions=True,
+        )
+
+    cancelled, (_, tree) = asyncio.run(run())
+    assert isinstance(cancelled, BuildCancelled)
+    assert progress == [0, 2]
+    assert tree.num_children == 2
+
+
+def test_build_cov_tree_async_bad_batch_size() -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(build_cov_tree_async(batch_size=0))
@@ -1,9 +1,13 @@
 from __future__ import annotations
+import pytest
+import os
 from pytest_mock import MockFixture
 from typing import Collection
 
 from cov_tree.core.node import CovFile
 from cov_tree.core.builder import build_cov_tree
+from cov_tree.core.analysis import AnalysisCache
+from cov_tree.core.progress import BuildProgress, CancelToken, BuildCancelled
 
 
 MOCK_TREE: dict[str, dict[str, Collection[int]]] = {
@@ -54,3 +58,66 @@ def test_build_cov_tree(mocker: MockFixture) -> None:
     base, tree = build_cov_tree(drop_ext=True)
     names = {node.name for node in tree.iter_tree()}
     assert names == set('file1 file2 mod1 mod2 root'.split())
+
+
+def test_build_cov_tree_from_file(cov_file: str) -> None:
+    base, tree = build_cov_tree(cov_file)
+    assert base == os.path.dirname(cov_file)
+    assert tree.name == 'project'
+    assert tree.children_names == ('pkg_a', 'pkg_b')
+    assert tree['pkg_b']['tool.py'].missed_lines_str() == '3-4'
+    assert tree.num_executable_lines == 18
+    assert tree.num_missed_lines == 4
+
+
+def test_build_cov_tree_relative_paths(relative_cov_file: str) -> None:
+    base, tree = build_cov_tree(relative_cov_file)
+    assert (base, tree.name) == ('', '<root>')
+    assert tree.children_names == ('pkg_a', 'pkg_b')
+    assert tree['pkg_b']['tool.py'].missed_lines_str() == '3-4'
+    assert tree.num_missed_lines == 4
+
+
+def test_build_cov_tree_analysis_cache(cov_file: str) -> None:
+    _, expected = build_cov_tree(cov_file)
+    cache = AnalysisCache()
+    for _ in range(2):
+        _, tree = build_cov_tree(cov_file, analysis_cache=cache)
+        assert [(n.name, n.num_executable_lines, n.num_missed_lines)
+                for n in tree.iter_tree()] == \
+            [(n.name, n.num_executable_lines, n.num_missed_lines)
+             for n in expected.iter_tree()]
+    assert cache.hits == cache.misses == 6
+
+
+def test_build_cov_tree_progress(cov_file: str) -> None:
+    reports: list[BuildProgress] = []
+    build_cov_tree(cov_file, progress=reports.append)
+    assert [(p.done, p.total) for p in reports] == \
+        [(i, 6) for i in range(7)]
+    assert reports[0].path == ''
+    assert reports[-1].path.endswith(os.path.join('pkg_b', 'tool.py'))
+    assert all(a.elapsed <= b.elapsed for a, b in zip(reports, reports[1:]))
+
+
+def test_build_cov_tree_cancel(cov_file: str) -> None:
+    token = CancelToken()
+    reports: list[BuildProgress] = []
+
+    def progress(report: BuildProgress) -> None:
+        reports.append(report)
+        if report.done == 2:
+            token.cancel()
+
+    with pytest.raises(BuildCancelled):
+        build_cov_tree(cov_file, progress=progress, cancel=token)
+    assert reports[-1].done == 2
+
+
+def test_build_cov_tree_interned_names(cov_file: str) -> None:
+    _, tree = build_cov_tree(cov_file)
+    names = [
+        node.name for node in tree.iter_tree() if node.name == '__init__.py'
+    ]
+    assert len(names) == 3
+    assert all(name is names[0] for name in names)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+import pytest
+
+from cov_tree.core.node import CovFile, CovModule, CovNode
+from cov_tree.core.collapse import CollapseIndex
+
+
+def build_sample_tree() -> CovModule:
+    root = CovModule('root')
+    root.insert_child(CovFile('a.py', range(10), [], range(5)))  # 50%
+    root.insert_child(CovFile('b.py', range(10), [], []), ['good'])  # 100%
+    root.insert_child(CovFile('c.py', range(10), [], [1]), ['good'])  # 90%
+    root.insert_child(CovFile('d.py', range(10), [], range(3)),
+                      ['bad', 'sub'])  # 70%
+    root.insert_child(CovFile('e.py', range(10), [], range(4)),
+                      ['bad'])  # 60%
+    return root
+
+
+def count_rows(tree: CovNode, threshold: float) -> int:
+    return sum(1 for _ in tree.iter_tree(lambda n: n.coverage < threshold))
+
+
+@pytest.mark.parametrize('threshold', [
+    0.0, 0.5, 0.6, 0.65, 0.7, 0.75, 0.8, 0.9, 0.95, 1.0, 1.01,
+])
+def test_collapse_index(threshold: float) -> None:
+    tree = build_sample_tree()
+    index = CollapseIndex(tree)
+    assert len(index) == len(tree)
+
+    expected = list(tree.iter_tree(lambda n: n.coverage < threshold))
+    assert list(tree.iter_tree(index.descend(threshold))) == expected
+    assert index.num_rows(threshold) == len(expected)
+
+
+def test_collapse_index_many() -> None:
+    tree = build_sample_tree()
+    index = CollapseIndex(tree)
+    thresholds = [i / 20 for i in range(22)]
+    assert index.num_rows_many(thresholds) == [
+        count_rows(tree, threshold) for threshold in thresholds
+    ]
+
+
+@pytest.mark.parametrize('max_rows', range(1, 12))
+def test_collapse_index_max_threshold(max_rows: int) -> None:
+    tree = build_sample_tree()
+    index = CollapseIndex(tree)
+    threshold = index.max_threshold(max_rows)
+    if threshold is None:
+        assert len(tree) <= max_rows
+        return
+
+    assert count_rows(tree, threshold) <= max_rows
+    # any larger threshold shows too many rows
+    assert count_rows(tree, threshold + 1e-9) > max_rows
+
+
+def test_collapse_index_bad_max_rows() -> None:
+    with pytest.raises(ValueError):
+        CollapseIndex(build_sample_tree()).max_threshold(0)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import pytest
+import pathlib
+
+from cov_tree.core.node import CovFile, CovModule
+from cov_tree.core.diff import IntervalIndex, parse_unified_diff
+from cov_tree.core.diff import restrict_to_diff, find_repo_root
+
+
+def test_interval_index() -> None:
+    index = IntervalIndex([(10, 12), (1, 3), (4, 5), (11, 20), (30, 29)])
+    assert index.intervals == [(1, 5), (10, 20)]
+    assert len(index) == 16
+    assert [line in index for line in (0, 1, 5, 6, 9, 10, 20, 21)] == [
+        False, True, True, False, False, True, True, False,
+    ]
+    assert 'x' not in index
+    assert index.intersect(range(0, 30, 3)) == {3, 12, 15, 18}
+    assert IntervalIndex().intersect([1, 2]) == set()
+
+
+DIFF = """\
+diff --git a/src/pkg/mod.py b/src/pkg/mod.py
+index 1111111..2222222 100644
+--- a/src/pkg/mod.py
++++ b/src/pkg/mod.py
+@@ -1,4 +1,5 @@
+ import os
++import sys
+ 
+-x = 1
++x = 2
+ y = 3
+@@ -10,2 +11,3 @@ def func():
+     a = 1
++    b = 2
+     c = 3
+\\ No newline at end of file
+diff --git a/old.py b/old.py
+deleted file mode 100644
+--- a/old.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-a = 1
+-b = 2
+diff --git a/new.py b/new.py
+new file mode 100644
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1,3 @@
++a = 1
++b = 2
++c = 3
+"""
+
+
+def test_parse_unified_diff() -> None:
+    changed = parse_unified_diff(DIFF)
+    assert set(changed) == {'src/pkg/mod.py', 'new.py'}
+    assert changed['src/pkg/mod.py'].intervals == [(2, 2), (4, 4), (12, 12)]
+    assert changed['new.py'].intervals == [(1, 3)]
+
+
+def test_parse_unified_diff_hunk_lengths() -> None:
+    # added lines looking like file headers are found by the hunk lengths
+    changed = parse_unified_diff(
+        '--- a/notes.txt\n'
+        '+++ b/notes.txt\n'
+        '@@ -1,2 +1,4 @@\n'
+        ' a\n'
+        '+++ b\n'
+        '+--- c\n'
+        '\n'
+        '--- a/x.py\n'
+        '+++ b/x.py\n'
+        '@@ -5 +5 @@\n'
+        '-x = 1\n'
+        '+x = 2\n'
+    )
+    assert set(changed) == {'notes.txt', 'x.py'}
+    assert changed['notes.txt'].intervals == [(2, 3)]
+    assert changed['x.py'].intervals == [(5, 5)]
+
+
+@pytest.mark.parametrize('base', ['/home/me/src', '/home/me/src/'])
+def test_restrict_to_diff(base: str) -> None:
+    tree = CovModule('pkg')
+    tree.insert_child(
+        CovFile('mod.py', range(1, 20), [20], [2, 3, 12, 13]),
+    )
+    tree.insert_child(CovFile('other.py', range(1, 20), [], [2]), ['sub'])
+    tree.insert_child(CovFile('new.py', range(1, 4), [], [3]), ['sub'])
+
+    changed = parse_unified_diff(DIFF)
+    changed['src/pkg/sub/new.py'] = changed.pop('new.py')
+    diff_tree = restrict_to_diff(tree, changed, base, '/home/me')
+
+    assert diff_tree.name == 'pkg'
+    assert diff_tree.children_names == ('mod.py', 'sub')
+    mod = diff_tree['mod.py']
+    assert isinstance(mod, CovFile)
+    assert mod.executable_lines == {2, 4, 12}
+    assert mod.missed_lines == {2, 12}
+    assert mod.skipped_lines == set()
+    assert diff_tree['sub'].children_names == ('new.py',)
+    assert diff_tree.num_executable_lines == 6
+    assert diff_tree.num_missed_lines == 3
+
+    # sub-trees keep their paths relative to their root
+    sub_tree = restrict_to_diff(tree['sub'], changed, base + '/pkg', '/home/me')
+    assert sub_tree.name == 'sub'
+    assert sub_tree.children_names == ('new.py',)
+
+    assert restrict_to_diff(tree, {}, base, '/home/me').children == ()
+    # the paths are relative to the root, not just suffixes of the files
+    assert restrict_to_diff(tree, changed, base, '/home').children == ()
+
+
+def test_restrict_to_diff_root_files(tmp_path: pathlib.Path) -> None:
+    repo = tmp_path / 'repo'
+    (repo / '.git').mkdir(parents=True)
+    (repo / 'tests').mkdir()
+    assert find_repo_root(str(repo / 'tests')) == str(repo)
+    assert find_repo_root(str(tmp_path)) is None
+
+    tree = CovModule('repo')
+    tree.insert_child(CovFile('conftest.py', range(1, 10), [], [3]))
+    tree.insert_child(CovFile('conftest.py', range(1, 10), [], [3]), ['tests'])
+    changed = {'conftest.py': IntervalIndex([(1, 5)])}
+
+    # a file in the root of the repository does not match other files of the
+    # same name
+    diff_tree = restrict_to_diff(tree, changed, str(tmp_path))
+    assert [n.path for n in diff_tree.iter_tree()] == [
+        ('repo',), ('repo', 'conftest.py'),
+    ]
+    assert diff_tree.num_executable_lines == 5
+
+
+def test_restrict_to_diff_relative_paths(
+        tmp_path: pathlib.Path,
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from coverage import CoverageData  # type: ignore
+    from cov_tree.core.builder import build_cov_tree
+
+    # relative paths in several top-level directories, e.g. of a CI job
+    (tmp_path / '.git').mkdir()
+    for directory in ('src', 'tools'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'x.py').write_text('a = 1\nb = 2\n')
+    monkeypatch.chdir(tmp_path)
+    data = CoverageData(basename='.coverage')
+    data.add_lines({'src/x.py': [1], 'tools/x.py': [1, 2]})
+    data.write()
+    base, tree = build_cov_tree('.coverage')
+    assert (base, tree.name) == ('', '<root>')
+
+    changed = {'src/x.py': IntervalIndex([(2, 2)])}
+    diff_tree = restrict_to_diff(tree, changed, base)
+    assert [n.path for n in diff_tree.iter_tree()] == [
+        ('<root>',), ('<root>', 'src'), ('<root>', 'src', 'x.py'),
+    ]
+    assert diff_tree.num_missed_lines == 1
+
+
+def test_restrict_to_diff_collapsed() -> None:
+    from cov_tree.core.stream import _CollapsedModule
+
+    tree = CovModule('pkg')
+    tree.insert_child(_CollapsedModule('sub', (2, 0, 2)))
+    with pytest.raises(ValueError, match='collapsed'):
+        restrict_to_diff(tree, {'pkg/sub/x.py': IntervalIndex([(1, 2)])})
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import pickle
+import threading
+import pytest
+
+from cov_tree.core.node import CovFile, CovModule, CovNode
+from cov_tree.core.frozen import FrozenNode, FrozenFile, FrozenModule
+from cov_tree.core.frozen import AtomicTree, freeze, thaw
+from cov_tree.core.stream import _CollapsedModule
+
+
+def build_sample_tree() -> CovModule:
+    root = CovModule('root')
+    root.insert_child(CovFile('a.py', range(10), [20], range(5)))
+    root.insert_child(CovFile('b.py', range(10), [], []), ['good'])
+    root.insert_child(CovFile('c.py', range(10), [], [1]), ['good'])
+    root.insert_child(CovFile('d.py', range(10), [], range(3)),
+                      ['bad', 'sub'])
+    return root
+
+
+def assert_same(frozen: FrozenNode, tree: CovNode) -> None:
+    assert [n.name for n in frozen.iter_tree()] == \
+        [n.name for n in tree.iter_tree()]
+    for f, n in zip(frozen.iter_tree(), tree.iter_tree()):
+        assert f.is_leaf == n.is_leaf
+        assert f.num_executable_lines == n.num_executable_lines
+        assert f.num_skipped_lines == n.num_skipped_lines
+        assert f.num_missed_lines == n.num_missed_lines
+        assert f.num_total_lines == n.num_total_lines
+        assert f.num_covered_lines == n.num_covered_lines
+        assert f.coverage == n.coverage
+        assert f.missed_lines_str() == n.missed_lines_str()
+        assert f.children_names == n.children_names
+        assert f.num_children == n.num_children
+
+
+def test_freeze_thaw() -> None:
+    tree = build_sample_tree()
+    frozen = freeze(tree)
+    assert isinstance(frozen, FrozenModule)
+    assert len(frozen) == len(tree) == 8
+    assert_same(frozen, tree)
+
+    a = frozen['a.py']
+    assert isinstance(a, FrozenFile)
+    assert a.executable_lines == frozenset(range(10))
+    assert a.skipped_lines == {20}
+    assert a.missed_lines == set(range(5))
+    assert frozen.get_node(['bad', 'sub', 'd.py']).num_missed_lines == 3
+    assert repr(frozen) == '<FrozenModule "root" 78%>'
+
+    thawed = thaw(frozen)
+    assert isinstance(thawed['bad'], CovModule)
+    assert_same(frozen, thawed)
+    assert_same(frozen['good'], frozen['good'].thaw())
+
+    # the frozen tree does not change with the original one
+    tree.insert_child(CovFile('e.py', range(10), [], range(10)))
+    assert len(frozen) == 8
+
+
+def test_frozen_is_immutable() -> None:
+    frozen = freeze(build_sample_tree())
+    with pytest.raises(AttributeError):
+        frozen._name = 'other'  # type: ignore
+    with pytest.raises(AttributeError):
+        del frozen['a.py']._missed_lines  # type: ignore
+    with pytest.raises(AttributeError):
+        frozen.foo = 1  # type: ignore
+    with pytest.raises(RuntimeError):
+        FrozenModule('m', [FrozenFile('a'), FrozenFile('a')])
+
+
+def test_frozen_replace() -> None:
+    frozen = freeze(build_sample_tree())
+
+    new = frozen.replace(CovFile('d.py', range(10), [], []), ['bad', 'sub'])
+    assert new.name == 'root'
+    assert new.num_missed_lines == frozen.num_missed_lines - 3
+    assert new.get_node(['bad', 'sub', 'd.py']).num_missed_lines == 0
+    assert frozen.get_node(['bad', 'sub', 'd.py']).num_missed_lines == 3
+    # only the path is copied
+    assert new['a.py'] is frozen['a.py']
+    assert new['good'] is frozen['good']
+    assert new['bad'] is not frozen['bad']
+    assert new.children_names == frozen.children_names
+
+    # missing modules are created
+    new = frozen.replace(FrozenFile('x.py', [1, 2], [], [2]), ['new', 'mod'])
+    assert new.children_names == ('a.py', 'good', 'bad', 'new')
+    assert new.get_node(['new', 'mod', 'x.py']).num_missed_lines == 1
+    assert new.num_executable_lines == frozen.num_executable_lines + 2
+    assert len(new) == len(frozen) + 3
+
+    new = frozen.replace(FrozenFile('e.py', [1]))
+    assert new.children_names[-1] == 'e.py'
+
+    with pytest.raises(RuntimeError):
+        frozen.replace(FrozenFile('x.py'), ['a.py'])
+    with pytest.raises(RuntimeError):
+        frozen.replace(FrozenFile('x.py'), ['a.py', 'sub'])
+
+
+def test_frozen_remove() -> None:
+    frozen = freeze(build_sample_tree())
+    new = frozen.remove(['bad', 'sub'])
+    assert new['bad'].children_names == ()
+    assert new.num_executable_lines == 30
+    assert new['good'] is frozen['good']
+    assert frozen['bad'].children_names == ('sub',)
+
+    with pytest.raises(KeyError):
+        frozen.remove(['nope'])
+    with pytest.raises(ValueError):
+        frozen.remove([])
+
+
+def test_freeze_collapsed_module() -> None:
+    tree = build_sample_tree()
+    tree.insert_child(_CollapsedModule('collapsed', (10, 2, 4)), ['good'])
+    frozen = freeze(tree)
+    assert_same(frozen, tree)
+    assert frozen['good']['collapsed'].num_executable_lines == 10
+    assert frozen.num_executable_lines == 50
+
+    thawed = thaw(frozen)
+    assert isinstance(thawed['good']['collapsed'], _CollapsedModule)
+    assert_same(frozen, thawed)
+
+    with pytest.raises(RuntimeError):
+        frozen.replace(FrozenFile('x.py'), ['good', 'collapsed'])
+
+
+def test_pickle_frozen() -> None:
+    tree = build_sample_tree()
+    tree.insert_child(_CollapsedModule('collapsed', (10, 2, 4)))
+    frozen = freeze(tree)
+    loaded = pickle.loads(pickle.dumps(frozen))
+    assert type(loaded) is FrozenModule
+    assert type(loaded['collapsed']) is type(frozen['collapsed'])
+    assert_same(loaded, tree)
+
+    # shared subtrees stay shared
+    new = frozen.remove(['bad'])
+    loaded, loaded_new = pickle.loads(pickle.dumps((frozen, new)))
+    assert loaded_new['good'] is loaded['good']
+    assert_same(loaded_new, thaw(new))
+
+
+def test_atomic_tree() -> None:
+    holder = AtomicTree(build_sample_tree())
+    first = holder.get()
+    assert isinstance(first, FrozenModule)
+
+    old = holder.swap(CovModule('other'))
+    assert old is first
+    assert holder.get().name == 'other'
+
+    holder.swap(first)
+    threads = [
+        threading.Thread(target=holder.update, args=(
+            lambda t, i=i: t.replace(FrozenFile(f'{i}.py', [1], [], [1])),
+        ))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert holder.get().num_children == 3 + 20
+    assert first.num_children == 3
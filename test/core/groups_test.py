@@ -0,0 +1,108 @@
+from __future__ import annotations
+import pytest
+import pathlib
+
+from cov_tree.core.node import CovFile, CovModule
+from cov_tree.core.groups import GroupRules, read_codeowners, group_tree
+
+
+RULES = [
+    ('*', 'all'),
+    ('*.js', 'js'),
+    ('/docs/', 'docs'),
+    ('docs/*', 'docs-direct'),
+    ('**/logs', 'logs'),
+    ('/build/logs/', 'build-logs'),
+    ('apps/', 'apps'),
+    ('/lib/a?.py', 'lib'),
+    ('/lib/**/test_*.py', 'tests'),
+    ('/scripts/', None),
+]
+
+
+@pytest.mark.parametrize('path, group', [
+    ('a.py', 'all'),
+    ('x/y.js', 'js'),
+    ('docs/a.md', 'docs-direct'),
+    ('docs/x/y.md', 'docs'),
+    ('x/docs/a.md', 'all'),
+    ('a/logs/b.txt', 'logs'),
+    ('logs', 'logs'),
+    ('build/logs/x', 'build-logs'),
+    ('z/apps/q.py', 'apps'),
+    ('lib/ab.py', 'lib'),
+    ('lib/abc.py', 'all'),
+    ('lib/test_a.py', 'tests'),
+    ('lib/x/y/test_a.py', 'tests'),
+    ('scripts/a.py', None),
+    ('a.b/c+d.py', 'all'),
+])
+def test_group_rules(path: str, group: str | None) -> None:
+    rules = GroupRules(RULES)
+    assert len(rules) == len(RULES)
+    assert rules.group_of(path) == group
+
+
+def test_group_rules_mapping() -> None:
+    rules = GroupRules({'*.py': 'py', 'src/': 'src'})
+    assert rules.group_of('src/a.py') == 'src'
+    assert rules.group_of('b.py') == 'py'
+    assert rules.group_of('b.txt') is None
+    assert GroupRules([]).group_of('a.py') is None
+
+
+def test_group_rules_many() -> None:
+    rules = GroupRules([(f'/pkg_{i}/', f'team-{i}') for i in range(500)])
+    assert rules.group_of('pkg_123/mod.py') == 'team-123'
+    assert rules.group_of('pkg_500/mod.py') is None
+
+
+def test_read_codeowners(tmp_path: pathlib.Path) -> None:
+    file = tmp_path / 'CODEOWNERS'
+    file.write_text(
+        '# comment\n'
+        '\n'
+        '*       @org/all\n'
+        '/src/   @alice @bob  # the sources\n'
+        '/src/generated/\n'
+    )
+    rules = read_codeowners(str(file))
+    assert rules.group_of('README.md') == '@org/all'
+    assert rules.group_of('src/a.py') == '@alice @bob'
+    assert rules.group_of('src/generated/a.py') is None
+
+
+def test_group_tree() -> None:
+    tree = CovModule('root')
+    tree.insert_child(CovFile('a.py', range(10), [], range(5)))
+    tree.insert_child(CovFile('b.py', range(10), [11], []), ['lib'])
+    tree.insert_child(CovFile('c.py', range(10), [], [1]), ['lib', 'sub'])
+    tree.insert_child(CovFile('d.py', range(20), [], range(4)), ['tools'])
+
+    groups = group_tree(tree, [('*.py', 'py'), ('/lib/', 'lib'),
+                               ('/lib/sub/', None)])
+    assert groups.name == 'root'
+    assert groups.children_names == ('py', 'lib', '<none>')
+    assert [(g.num_executable_lines, g.num_skipped_lines, g.num_missed_lines)
+            for g in groups.children] == [(30, 0, 9), (10, 1, 0), (10, 0, 1)]
+    assert groups.num_missed_lines == tree.num_missed_lines
+    assert all(g.is_leaf for g in groups.children)
+
+    # the name of a synthetic root is not part of the paths
+    synthetic = CovModule('<root>')
+    synthetic.insert_child(CovFile('a.py', range(10), [], []), ['lib'])
+    assert group_tree(synthetic, {'/lib/': 'lib'}).children_names == ('lib',)
+
+    # paths are relative to the root, with the prefix
+    groups = group_tree(tree['lib'], {'/src/lib/sub/': 'sub'}, prefix='src/lib',
+                        default='other')
+    assert groups.children_names == ('other', 'sub')
+
+
+def test_group_tree_collapsed() -> None:
+    from cov_tree.core.stream import _CollapsedModule
+
+    tree = CovModule('root')
+    tree.insert_child(_CollapsedModule('lib', (10, 0, 1)))
+    with pytest.raises(ValueError, match='collapsed'):
+        group_tree(tree, {'*': 'all'})
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import pytest
+
+from cov_tree.core.node import CovFile, CovModule, CovNode
+from cov_tree.core.merge import merge_trees
+from cov_tree.core.snapshot import tree_to_bytes, tree_from_bytes
+from cov_tree.core.stream import _CollapsedModule
+
+
+def build_tree(name: str, files: dict[str, tuple[list[int], list[int]]],
+               ) -> CovModule:
+    """A tree of files given by their path and executable and missed lines."""
+    root = CovModule(name)
+    for path, (executable, missed) in files.items():
+        *dirs, file_name = path.split('/')
+        root.insert_child(CovFile(file_name, executable, [], missed), dirs)
+    return root
+
+
+def summary(tree: CovNode) -> list[tuple]:
+    return [
+        (n.path, n.num_executable_lines, n.num_missed_lines,
+         n.missed_lines_str())
+        for n in tree.iter_tree()
+    ]
+
+
+def test_merge_trees() -> None:
+    a = build_tree('a', {
+        'pkg/x.py': ([1, 2, 3, 4], [3, 4]),
+        'pkg/y.py': ([1, 2], [2]),
+        'z.py': ([1, 2], [1, 2]),
+    })
+    b = build_tree('b', {
+        'pkg/x.py': ([1, 2, 3, 4], [1, 4]),
+        'pkg/sub/w.py': ([1], []),
+        'z.py': ([1, 2], [1]),
+    })
+    c = build_tree('c', {
+        'a.py': ([5, 6], [6]),
+    })
+    merged = merge_trees(a, b, c)
+    assert summary(merged) == [
+        (('a',), 11, 4, '[a.py: 6], [pkg: [x.py: 4], [y.py: 2]], [z.py: 1]'),
+        (('a', 'a.py'), 2, 1, '6'),
+        (('a', 'pkg'), 7, 2, '[x.py: 4], [y.py: 2]'),
+        (('a', 'pkg', 'sub'), 1, 0, ''),
+        (('a', 'pkg', 'sub', 'w.py'), 1, 0, ''),
+        (('a', 'pkg', 'x.py'), 4, 1, '4'),
+        (('a', 'pkg', 'y.py'), 2, 1, '2'),
+        (('a', 'z.py'), 2, 1, '1'),
+    ]
+    # the inputs are unchanged
+    assert a.num_missed_lines == 5
+
+    # merging is commutative (up to the root name)
+    assert summary(merge_trees(a, c, b)) == summary(merged)
+    assert summary(merge_trees(a)) == summary(merge_trees(a, a))
+    assert [n.path for n in merge_trees(b).iter_tree()] == \
+        [('b',), ('b', 'pkg'), ('b', 'pkg', 'sub'), ('b', 'pkg', 'sub', 'w.py'),
+         ('b', 'pkg', 'x.py'), ('b', 'z.py')]
+
+
+def test_merge_trees_lines() -> None:
+    a = CovModule('r')
+    a.insert_child(CovFile('f.py', [1, 2, 3], [4, 5], [2, 3]))
+    b = CovModule('r')
+    b.insert_child(CovFile('f.py', [1, 2, 4], [5, 6], [1, 4]))
+    f = merge_trees(a, b)['f.py']
+    assert isinstance(f, CovFile)
+    assert f.executable_lines == {1, 2, 3, 4}
+    assert f.skipped_lines == {5, 6}
+    assert f.missed_lines == {3, 4}
+
+
+def test_merge_snapshots() -> None:
+    a = build_tree('r', {'m/x.py': ([1, 2], [2])})
+    b = build_tree('r', {'m/x.py': ([1, 2], [1]), 'y.py': ([1], [1])})
+    lazy = tree_from_bytes(tree_to_bytes(b), lazy=True)
+    assert summary(merge_trees(a, lazy)) == summary(merge_trees(a, b))
+
+
+def test_merge_bad_trees() -> None:
+    a = build_tree('r', {'m/x.py': ([1], [])})
+    b = build_tree('r', {'m': ([1], [])})
+    with pytest.raises(ValueError, match='file in one tree'):
+        merge_trees(a, b)
+
+    c = CovModule('r')
+    c.insert_child(_CollapsedModule('m', (1, 0, 0)))
+    with pytest.raises(ValueError, match='collapsed'):
+        merge_trees(a, c)
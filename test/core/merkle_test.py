@@ -0,0 +1,141 @@
+from __future__ import annotations
+import pytest
+import threading
+
+from cov_tree.core.node import CovFile, CovModule, CovNode
+from cov_tree.core.merkle import compare_trees, RenderCache
+from cov_tree.core.stream import _CollapsedModule
+
+
+def build_tree(name: str, files: dict[str, tuple[list[int], list[int]]],
+               ) -> CovModule:
+    """A tree of files given by their path and executable and missed lines."""
+    root = CovModule(name)
+    for path, (executable, missed) in files.items():
+        *dirs, file_name = path.split('/')
+        root.insert_child(CovFile(file_name, executable, [], missed), dirs)
+    return root
+
+
+def changes(old: CovNode, new: CovNode) -> list[tuple]:
+    return [
+        (
+            '/'.join(c.path),
+            None if c.old is None else c.old.name,
+            None if c.new is None else c.new.name,
+        )
+        for c in compare_trees(old, new)
+    ]
+
+
+def test_compare_trees() -> None:
+    old = build_tree('old', {
+        'pkg/a.py': ([1, 2, 3], [3]),
+        'pkg/sub/b.py': ([1, 2], []),
+        'pkg/gone/c.py': ([1], [1]),
+        'same/d.py': ([1, 2], [2]),
+        'e.py': ([1], []),
+    })
+    new = build_tree('new', {
+        'pkg/a.py': ([1, 2, 3], [2, 3]),
+        'pkg/sub/b.py': ([1, 2], []),
+        'pkg/added/f.py': ([4], []),
+        'same/d.py': ([1, 2], [2]),
+        'e/g.py': ([1], []),
+    })
+    assert changes(old, new) == [
+        ('pkg/a.py', 'a.py', 'a.py'),
+        ('pkg/gone', 'gone', None),
+        ('pkg/added', None, 'added'),
+        ('e.py', 'e.py', None),
+        ('e', None, 'e'),
+    ]
+    assert changes(new, old) == [
+        ('pkg/a.py', 'a.py', 'a.py'),
+        ('pkg/added', 'added', None),
+        ('pkg/gone', None, 'gone'),
+        ('e', 'e', None),
+        ('e.py', None, 'e.py'),
+    ]
+    assert changes(old, old) == []
+
+
+def test_compare_trees_skips_equal_subtrees() -> None:
+    old = build_tree('old', {'pkg/a.py': ([1], []), 'b.py': ([1], [1])})
+    new = build_tree('new', {'pkg/a.py': ([1], []), 'b.py': ([1], [])})
+
+    # the children of equal subtrees are not visited once hashed
+    old.content_hash
+    old['pkg']._children = None  # type: ignore
+    assert changes(old, new) == [('b.py', 'b.py', 'b.py')]
+
+
+def test_compare_trees_leaves() -> None:
+    assert changes(CovFile('a.py', [1]), CovFile('b.py', [1])) == []
+    assert changes(CovFile('a.py', [1]), CovFile('a.py', [1], [], [1])) == [
+        ('', 'a.py', 'a.py'),
+    ]
+    file = CovFile('x', [1])
+    module = build_tree('x', {'a.py': ([1], [])})
+    assert changes(file, module) == [('', 'x', 'x')]
+
+    # collapsed modules are compared by their numbers of lines only
+    collapsed = _CollapsedModule('x', (1, 0, 0))
+    assert changes(collapsed, _CollapsedModule('x', (1, 0, 0))) == []
+    assert changes(collapsed, _CollapsedModule('x', (1, 0, 1))) == [
+        ('', 'x', 'x'),
+    ]
+    assert changes(collapsed, module) == [('', 'x', 'x')]
+
+
+def test_render_cache() -> None:
+    renders: list[str] = []
+
+    def render(node: CovNode) -> str:
+        renders.append(node.name)
+        return f'{node.name}: {node.num_missed_lines}'
+
+    old = build_tree('root', {'pkg/a.py': ([1], []), 'b.py': ([1], [1])})
+    new = build_tree('root', {'pkg/a.py': ([1], []), 'b.py': ([1], [])})
+    cache = RenderCache(3)
+    assert cache.get(old, 'text', render) == 'root: 1'
+    assert cache.get(old['pkg'], 'text', render) == 'pkg: 0'
+    assert cache.get(new, 'text', render) == 'root: 0'
+    # unchanged subtrees of another tree are not rendered again
+    assert cache.get(new['pkg'], 'text', render) == 'pkg: 0'
+    assert renders == ['root', 'pkg', 'root']
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # keyed by the options and by the name of the tree
+    assert cache.get(new['pkg'], 'json', render) == 'pkg: 0'
+    assert cache.get(build_tree('other', {}), 'text', render) == 'other: 0'
+    assert renders == ['root', 'pkg', 'root', 'pkg', 'other']
+
+    # least recently used are evicted
+    assert len(cache) == 3
+    cache.get(old, 'text', render)
+    assert renders[-1] == 'root'
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        RenderCache(0)
+
+
+def test_render_cache_threads() -> None:
+    tree = build_tree('root', {'a.py': ([1, 2], [2])})
+    cache = RenderCache()
+    results: list[str] = []
+
+    def work() -> None:
+        for _ in range(100):
+            results.append(cache.get(tree, (), lambda n: n.name))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['root'] * 400
+    assert len(cache) == 1
+    assert cache.hits + cache.misses == 400
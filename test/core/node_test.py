@@ -1,6 +1,7 @@
 from __future__ import annotations
 import pytest
-from typing import Collection
+import sys
+from typing import Callable, Collection, Iterable
 from coverage import Coverage  # type: ignore
 from pytest_mock import MockFixture
 
@@ -259,3 +260,169 @@ def test_cov_module_missed_lines() -> None:
         'module_6.py': '42-43, 53',
         'root': '',
     }
+
+
+def test_cov_module_cached_aggregates() -> None:
+    root, [mod_1, mod_2, mod_3, mod_4, mod_6] = build_sample_tree()
+    assert root.num_missed_lines == 17
+    assert mod_1.num_missed_lines == 13
+
+    root.insert_child(CovFile('new.py', range(10), [], range(4)), ['module_1'])
+    assert root.num_missed_lines == 21
+    assert mod_1.num_missed_lines == 17
+
+    assert isinstance(mod_3, CovFile)
+    mod_3.missed_lines.clear()
+    mod_3.invalidate()
+    assert mod_1.num_missed_lines == 12
+    assert root.num_missed_lines == 16
+
+
+def test_cov_node_content_hash() -> None:
+    root, [mod_1, mod_2, mod_3, mod_4, mod_6] = build_sample_tree()
+    other, _ = build_sample_tree()
+    assert len(root.content_hash) == 16
+    assert root.content_hash == other.content_hash
+    assert mod_1.content_hash != mod_2.content_hash
+
+    # independent of the name of the node and the order of its children
+    shuffled = CovModule('other')
+    for child in reversed(other.children):
+        child._parent = None
+        shuffled.insert_child(child)
+    assert shuffled.content_hash == root.content_hash
+
+    # but not of the names of the children or the kind of lines
+    assert (
+        CovFile('a.py', [1], [2]).content_hash
+        != CovFile('a.py', [2], [1]).content_hash
+    )
+    renamed = CovModule('root')
+    renamed.insert_child(CovFile('b.py', [1, 2], [], [2]))
+    original = CovModule('root')
+    original.insert_child(CovFile('a.py', [1, 2], [], [2]))
+    assert renamed.content_hash != original.content_hash
+
+    # the cached hashes are cleared on invalidation
+    old_root, old_mod_1, old_mod_2 = (
+        root.content_hash, mod_1.content_hash, mod_2.content_hash)
+    assert isinstance(mod_3, CovFile)
+    mod_3.missed_lines.add(1)
+    mod_3.invalidate()
+    assert mod_1.content_hash != old_mod_1
+    assert root.content_hash != old_root
+    assert mod_2.content_hash == old_mod_2
+    mod_3.missed_lines.remove(1)
+    mod_3.invalidate()
+    assert root.content_hash == old_root
+
+
+@pytest.mark.parametrize('key, k, min_stmts, files_only, expect', [
+    ('missed', 2, 0, True, ['module_3.py', 'module_4.py']),
+    ('missed', 3, 0, True, ['module_3.py', 'module_4.py', 'module_2.py']),
+    ('missed', 2, 0, False, ['root', 'module_1']),
+    ('missed', 10, 0, True,
+     ['module_3.py', 'module_4.py', 'module_2.py', 'module_6.py']),
+    ('missed', 2, 31, True, ['module_2.py', 'module_6.py']),
+    ('missed', 0, 0, True, []),
+    ('coverage', 2, 0, True, ['module_4.py', 'module_3.py']),
+    ('coverage', 1, 0, False, ['module_4.py']),
+    ('coverage', 2, 30, True, ['module_3.py', 'module_2.py']),
+    ('stmts', 2, 0, True, ['module_6.py', 'module_2.py']),
+    ('stmts', 1, 0, False, ['root']),
+])
+def test_cov_module_top_k(
+        key: str, k: int, min_stmts: int, files_only: bool, expect: list[str],
+) -> None:
+    root, _ = build_sample_tree()
+    top = root.top_k(key, k, min_statements=min_stmts, files_only=files_only)
+    assert [n.name for n in top] == expect
+
+
+def test_cov_module_top_k_bad_key() -> None:
+    root, _ = build_sample_tree()
+    with pytest.raises(ValueError):
+        root.top_k('bad', 3)
+
+
+def test_cov_module_sorted_children() -> None:
+    root, [mod_1, mod_2, mod_3, mod_4, mod_6] = build_sample_tree()
+
+    def names(nodes: Iterable[CovNode]) -> list[str]:
+        return [node.name for node in nodes]
+
+    # ties keep the order of the children
+    assert names(mod_1.sorted_children('missed')) == \
+        ['module_3.py', 'module_4.py', 'module_5']
+    assert names(mod_1.sorted_children('coverage')) == \
+        ['module_4.py', 'module_3.py', 'module_5']
+    assert names(mod_1.sorted_children('stmts')) == \
+        ['module_5', 'module_3.py', 'module_4.py']
+    assert mod_2.sorted_children('missed') == ()
+    with pytest.raises(ValueError):
+        root.sorted_children('bad')
+
+    assert names(root.iter_tree(sort='stmts')) == [
+        'root', 'module_1', 'module_5', 'module_6.py', 'module_3.py',
+        'module_4.py', 'module_2.py',
+    ]
+    assert names(root.iter_tree(lambda n: n is root, sort='missed')) == \
+        ['root', 'module_1', 'module_2.py']
+
+    # the orders are cached until the node is invalidated
+    order = mod_1.sorted_children('missed')
+    assert mod_1.sorted_children('missed') is order
+    assert isinstance(mod_3, CovFile)
+    mod_3.missed_lines.clear()
+    mod_3.invalidate()
+    assert names(mod_1.sorted_children('missed')) == \
+        ['module_4.py', 'module_5', 'module_3.py']
+
+
+class _DictFile(CovFile):
+    """A file node as before slots: with a `__dict__` and own children."""
+    _is_leaf_class = False
+
+
+class _DictModule(CovModule):
+    pass
+
+
+def _node_overhead(tree: CovNode) -> int:
+    """The bytes of the nodes of a tree, excluding their line sets, counting
+    shared objects once."""
+    seen: set[int] = set()
+    size = 0
+    for node in tree.iter_tree():
+        for obj in (node, getattr(node, '__dict__', None), node._children,
+                    node._name):
+            if obj is not None and id(obj) not in seen:
+                seen.add(id(obj))
+                size += sys.getsizeof(obj)
+    return size
+
+
+def test_node_memory() -> None:
+    # a tree of 100k nodes, with names as read from paths
+    def build(
+            file_cls: type[CovFile],
+            module_cls: type[CovModule],
+            intern: Callable[[str], str],
+    ) -> CovNode:
+        root = module_cls('root')
+        for i in range(1_000):
+            module = module_cls(intern(f'module_{i}'))
+            root.insert_child(module)
+            for j in range(99):
+                name = intern(f'path/to/file_{j}.py'.split('/')[-1])
+                module.insert_child(file_cls(name, [1, 2], [], [2]))
+        return root
+
+    tree = build(CovFile, CovModule, sys.intern)
+    assert len(tree) == 100_001
+    assert not hasattr(tree, '__dict__')
+    assert not hasattr(tree['module_0']['file_0.py'], '__dict__')
+    slotted = _node_overhead(tree)
+    del tree
+    unslotted = _node_overhead(build(_DictFile, _DictModule, str))
+    assert slotted < unslotted / 2
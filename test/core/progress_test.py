@@ -0,0 +1,26 @@
+from __future__ import annotations
+import pytest
+
+from cov_tree.core.progress import BuildProgress, CancelToken, BuildCancelled
+
+
+def test_build_progress() -> None:
+    progress = BuildProgress(0, 10, '', 0.0)
+    assert progress.fraction == 0.0
+    assert progress.eta is None
+
+    progress = BuildProgress(4, 10, 'a.py', 2.0)
+    assert progress.fraction == 0.4
+    assert progress.eta == 3.0
+
+    assert BuildProgress(0, 0, '', 1.0).fraction == 1.0
+
+
+def test_cancel_token() -> None:
+    token = CancelToken()
+    assert not token.cancelled
+    token.raise_if_cancelled()
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(BuildCancelled):
+        token.raise_if_cancelled()
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import pytest
+import pathlib
+import pickle
+
+from cov_tree.core.node import CovFile, CovModule
+from cov_tree.core.builder import build_cov_tree
+from cov_tree.core.regions import CovRegion, RegionIndex, RegionCache
+from cov_tree.core.regions import split_regions
+from cov_tree.core.diff import IntervalIndex, restrict_to_diff
+from cov_tree.core.merge import merge_trees
+from cov_tree.core.frozen import freeze, thaw
+from cov_tree.core.snapshot import tree_to_bytes, tree_from_bytes
+from cov_tree.core.source import SourceFiles
+
+
+SOURCE = '''\
+import os
+
+
+@decorator
+def func():
+    def inner():
+        pass
+    return 1
+
+
+class Klass:
+    attr = 1
+
+    def method(self):
+        return 2
+
+    @property
+    def prop(self):
+        return 3
+
+    @prop.setter
+    def prop(self, value):
+        pass
+
+
+x = 1
+'''
+
+
+def test_region_index() -> None:
+    index = RegionIndex.from_source(SOURCE)
+    assert index.names == [
+        '<module>', 'func()', 'Klass', 'Klass.method()', 'Klass.prop()',
+    ]
+    assert index.segments == [
+        (1, '<module>'), (4, 'func()'), (9, '<module>'), (11, 'Klass'),
+        (14, 'Klass.method()'), (16, 'Klass'), (17, 'Klass.prop()'),
+        (20, 'Klass'), (21, 'Klass.prop()'), (24, '<module>'),
+    ]
+    assert [index.region_of(line) for line in (0, 1, 4, 8, 13, 15, 16, 30)] \
+        == ['<module>', '<module>', 'func()', 'func()', 'Klass',
+            'Klass.method()', 'Klass', '<module>']
+
+    # adjacent and nested spans
+    index = RegionIndex([(1, 5, 'a'), (6, 8, 'b'), (6, 7, 'c'), (8, 8, 'b')])
+    assert index.segments == [(1, 'a'), (6, 'c'), (8, 'b'), (9, '<module>')]
+    assert RegionIndex([]).segments == [(1, '<module>')]
+
+    with pytest.raises(SyntaxError):
+        RegionIndex.from_source('def (')
+
+
+def test_region_cache(tmp_path: pathlib.Path) -> None:
+    cache = RegionCache()
+    for name in ('a.py', 'b.py'):
+        (tmp_path / name).write_text(SOURCE)
+    (tmp_path / 'bad.py').write_text('def (')
+
+    index = cache.get(str(tmp_path / 'a.py'))
+    assert index is not None
+    # the same source is only parsed once
+    assert cache.get(str(tmp_path / 'b.py')) is index
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.get(str(tmp_path / 'bad.py')) is None
+    assert cache.get(str(tmp_path / 'missing.py')) is None
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_split_regions(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / 'mod.py'
+    path.write_text(SOURCE)
+    cache = RegionCache()
+    file = CovFile('mod.py', [1, 4, 5, 8, 11, 12, 14, 15, 26], [21, 22, 23],
+                   [8, 15])
+
+    module = split_regions(file, str(path), cache)
+    assert isinstance(module, CovModule)
+    assert module.name == 'mod.py'
+    assert module.children_names == \
+        ('<module>', 'func()', 'Klass', 'Klass.method()', 'Klass.prop()')
+    assert all(isinstance(child, CovRegion) for child in module.children)
+    region = module['Klass.method()']
+    assert isinstance(region, CovRegion)
+    assert region.executable_lines == {14, 15}
+    assert region.missed_lines == {15}
+    assert module['Klass.prop()'].num_skipped_lines == 3
+    assert module.num_executable_lines == file.num_executable_lines
+    assert module.num_missed_lines == file.num_missed_lines
+
+    # files with lines outside of classes and functions only are kept
+    file = CovFile('mod.py', [1, 26])
+    assert split_regions(file, str(path), cache) is file
+    assert split_regions(file, str(tmp_path / 'missing.py'), cache) is file
+
+
+def test_build_cov_tree_regions(cov_file: str) -> None:
+    cache = RegionCache()
+    _, tree = build_cov_tree(cov_file, regions=True, region_cache=cache)
+    mod = tree['pkg_a']['mod.py']
+    assert isinstance(mod, CovModule)
+    assert {child.name: child.num_missed_lines for child in mod.children} == {
+        '<module>': 0, 'func()': 1, 'Klass': 0, 'Klass.method()': 1,
+    }
+    assert isinstance(tree['pkg_b']['tool.py'], CovFile)
+    assert (cache.hits, cache.misses) == (0, 6)
+    build_cov_tree(cov_file, regions=True, region_cache=cache)
+    assert (cache.hits, cache.misses) == (6, 6)
+
+    _, expect = build_cov_tree(cov_file)
+    assert tree.num_missed_lines == expect.num_missed_lines
+
+    with pytest.raises(ValueError):
+        build_cov_tree(cov_file, shards=True, regions=True)
+
+
+def test_regions_with_other_features(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+) -> None:
+    base, tree = build_cov_tree(cov_file, regions=True)
+    sources = SourceFiles(base)
+
+    # snapshots, pickles and frozen copies keep the regions
+    for loaded in (
+            tree_from_bytes(tree_to_bytes(tree)),
+            tree_from_bytes(tree_to_bytes(tree), lazy=True),
+            pickle.loads(pickle.dumps(tree)),
+            thaw(freeze(tree)),
+            thaw(pickle.loads(pickle.dumps(freeze(tree)))),
+    ):
+        func = loaded['pkg_a']['mod.py']['func()']
+        assert isinstance(func, CovRegion)
+        assert isinstance(loaded['pkg_b']['tool.py'], CovFile)
+        assert not isinstance(loaded['pkg_b']['tool.py'], CovRegion)
+        assert sources.missed_lines(func) == {7: '    return 2'}
+
+    merged = merge_trees(tree, tree)
+    assert isinstance(merged['pkg_a']['mod.py']['func()'], CovRegion)
+    assert merged.num_missed_lines == tree.num_missed_lines
+
+    # the diff paths are the paths of the files of the regions
+    changed = {'pkg_a/mod.py': IntervalIndex([(6, 7)])}
+    diff_tree = restrict_to_diff(tree, changed, base, str(tmp_path / 'project'))
+    assert [node.path for node in diff_tree.iter_tree()] == [
+        ('project',),
+        ('project', 'pkg_a'),
+        ('project', 'pkg_a', 'mod.py'),
+        ('project', 'pkg_a', 'mod.py', 'func()'),
+    ]
+    func = diff_tree['pkg_a']['mod.py']['func()']
+    assert isinstance(func, CovRegion)
+    assert func.missed_lines == {7}
+    assert sources.missed_lines(func) == {7: '    return 2'}
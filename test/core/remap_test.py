@@ -0,0 +1,82 @@
+from __future__ import annotations
+import pytest
+import os
+import pathlib
+from typing import Callable
+from coverage import CoverageData  # type: ignore
+
+from cov_tree.core.remap import PathRemapper, parse_remap_rule
+from cov_tree.core.builder import build_cov_tree
+
+
+def local(*parts: str) -> str:
+    return os.path.join(os.path.abspath(os.sep), *parts)
+
+
+def test_path_remapper() -> None:
+    remapper = PathRemapper({
+        local('src'): ['/builds/*/src', '/home/ci/src/', 'C:\\ci\\src'],
+        local('vendor'): ['/builds/*/src/vendor', '/home/ci/lib?/v[0-9]'],
+    })
+    assert len(remapper) == 5
+    assert remapper.remap('/builds/a1b2/src/pkg/mod.py') == \
+        local('src', 'pkg', 'mod.py')
+    assert remapper.remap('/home/ci/src/pkg/mod.py') == \
+        local('src', 'pkg', 'mod.py')
+    assert remapper.remap('C:\\ci\\src\\pkg\\mod.py') == \
+        local('src', 'pkg', 'mod.py')
+    # the longest alias wins
+    assert remapper.remap('/builds/x/src/vendor/lib.py') == \
+        local('vendor', 'lib.py')
+    assert remapper.remap('/home/ci/lib2/v3/a.py') == local('vendor', 'a.py')
+    # no match
+    assert remapper.remap('/home/ci/lib2/vX/a.py') == '/home/ci/lib2/vX/a.py'
+    assert remapper.remap('/builds/src/mod.py') == '/builds/src/mod.py'
+    assert remapper.remap('/other/mod.py') == '/other/mod.py'
+
+    assert remapper.match('/builds/x/src/a.py') == \
+        (4, tuple(local('src').split(os.sep)))
+    assert PathRemapper([]).match('/a/b') is None
+
+
+def test_parse_remap_rule() -> None:
+    assert parse_remap_rule('src=/a/src,/b/src') == \
+        ('src', ['/a/src', '/b/src'])
+    for rule in ['src', '=/a', 'src=']:
+        with pytest.raises(ValueError, match='Bad remapping rule'):
+            parse_remap_rule(rule)
+
+
+def test_build_remapped(
+        make_cov_file: Callable[..., str],
+        tmp_path: pathlib.Path,
+) -> None:
+    make_cov_file()
+    project = tmp_path / 'project'
+    data = CoverageData(basename=str(tmp_path / '.coverage.ci'))
+    data.add_lines({
+        '/builds/r1/project/pkg_b/tool.py': [1, 2],
+        '/builds/r1/project/pkg_a/sub/deep.py': [1, 2, 3],
+        'C:\\ci\\project\\pkg_b\\tool.py': [1, 3],
+        str(project / 'pkg_b' / '__init__.py'): [],
+    })
+    data.write()
+
+    remapper = PathRemapper({
+        str(project): ['/builds/*/project', 'C:\\ci\\project'],
+    })
+    base, tree = build_cov_tree(str(tmp_path / '.coverage.ci'),
+                                remapper=remapper)
+    assert base == str(tmp_path)
+    assert tree.name == 'project'
+    assert [n.name for n in tree.iter_tree()] == [
+        'project', 'pkg_a', 'sub', 'deep.py', 'pkg_b', '__init__.py',
+        'tool.py',
+    ]
+    assert tree['pkg_b']['tool.py'].missed_lines_str() == '4'
+    assert tree['pkg_b']['__init__.py'].missed_lines_str() == '1'
+    assert tree.num_executable_lines == 8
+
+    with pytest.raises(ValueError, match='sharded'):
+        build_cov_tree(str(tmp_path / '.coverage.ci'), shards=True,
+                       remapper=remapper)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import pytest
+import os
+import threading
+from typing import Callable
+
+from cov_tree.core.node import CovNode
+from cov_tree.core.builder import build_cov_tree, _read_coverage
+from cov_tree.core.shard import build_sharded_cov_tree, _build_shard
+from cov_tree.core.progress import BuildProgress, CancelToken, BuildCancelled
+
+
+def summary(tree: CovNode) -> list[tuple]:
+    return [
+        (
+            node.path, node.num_executable_lines, node.num_skipped_lines,
+            node.num_missed_lines, node.missed_lines_str(),
+        )
+        for node in tree.iter_tree()
+    ]
+
+
+@pytest.mark.parametrize('drop_ext', [False, True])
+def test_build_sharded(cov_file: str, drop_ext: bool) -> None:
+    base, tree = build_sharded_cov_tree(cov_file, drop_ext, max_workers=2)
+    expect_base, expect = build_cov_tree(cov_file, drop_ext)
+    assert base == expect_base
+
+    # the summary of the root is available without loading the shards
+    assert tree.num_executable_lines == expect.num_executable_lines
+    assert tree.num_missed_lines == expect.num_missed_lines
+    assert tree.children_names == expect.children_names
+    for shard in tree.children:
+        assert shard.parent is tree
+        assert not shard._loaded  # type: ignore
+
+    assert summary(tree) == summary(expect)
+
+
+def test_build_sharded_via_build_cov_tree(cov_file: str) -> None:
+    base, tree = build_cov_tree(cov_file, shards=True, max_workers=1)
+    assert summary(tree) == summary(build_cov_tree(cov_file)[1])
+
+
+@pytest.mark.parametrize('executed', [
+    {},
+    {'pkg_b/tool.py': [1]},
+    {'pkg_a/__init__.py': [], 'pkg_b/tool.py': [1]},
+])
+def test_build_sharded_trivial(
+        make_cov_file: Callable[..., str],
+        executed: dict[str, list[int]],
+) -> None:
+    cov_file = make_cov_file(executed)
+    base, tree = build_sharded_cov_tree(cov_file, max_workers=1)
+    expect_base, expect = build_cov_tree(cov_file)
+    assert base == expect_base
+    assert summary(tree) == summary(expect)
+
+
+def test_build_sharded_progress(cov_file: str) -> None:
+    reports: list[BuildProgress] = []
+    build_sharded_cov_tree(cov_file, max_workers=2, progress=reports.append)
+    assert reports[0].done == 0
+    assert sorted((p.done, p.path) for p in reports[1:]) in (
+        [(4, 'pkg_a'), (6, 'pkg_b')], [(2, 'pkg_b'), (6, 'pkg_a')],
+    )
+
+
+def test_build_sharded_cancel(
+        cov_file: str,
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(BuildCancelled):
+        build_sharded_cov_tree(cov_file, max_workers=2, cancel=token)
+
+    # the workers stop once the event of the main process is set
+    event = threading.Event()
+    monkeypatch.setattr('cov_tree.core.shard._worker_cov',
+                        _read_coverage(cov_file))
+    monkeypatch.setattr('cov_tree.core.shard._worker_cancel', event)
+    files = [os.path.join(os.path.dirname(cov_file), 'project', 'pkg_b',
+                          'tool.py')]
+    assert _build_shard(files, False, 1)
+    event.set()
+    with pytest.raises(BuildCancelled):
+        _build_shard(files, False, 1)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import pytest
+import io
+import pickle
+import pathlib
+
+from cov_tree.core.node import CovFile, CovModule, CovNode
+from cov_tree.core.snapshot import save_tree, load_tree, open_tree
+from cov_tree.core.snapshot import tree_to_bytes, tree_from_bytes
+from cov_tree.core.stream import _CollapsedModule
+
+
+def build_sample_tree() -> CovModule:
+    root = CovModule('root')
+    root.insert_child(CovFile('module_2.py', range(42), [], range(20, 24)))
+    root.insert_child(CovFile('module_3.py', range(30), [], range(5, 10)),
+                      ['module_1'])
+    root.insert_child(
+        CovFile('module_4.py', set(range(30)) - {21}, [21], [12, 13, 20]),
+        ['module_1'],
+    )
+    root.insert_child(
+        CovFile('módulo_6.py', [1, 300, 70_000], [], [70_000]),
+        ['module_1', 'module_5'],
+    )
+    root.insert_child(CovModule('empty'))
+    return root
+
+
+def assert_same_tree(a: CovNode, b: CovNode) -> None:
+    assert [n.path[a.depth:] for n in a.iter_tree()] == \
+        [n.path[b.depth:] for n in b.iter_tree()]
+    for x, y in zip(a.iter_tree(), b.iter_tree()):
+        assert isinstance(y, type(x))
+        assert x.num_executable_lines == y.num_executable_lines
+        assert x.num_skipped_lines == y.num_skipped_lines
+        assert x.num_missed_lines == y.num_missed_lines
+        assert x.missed_lines_str() == y.missed_lines_str()
+        assert len(x) == len(y)
+        if isinstance(x, CovFile):
+            assert isinstance(y, CovFile)
+            assert x.executable_lines == y.executable_lines
+            assert x.skipped_lines == y.skipped_lines
+            assert x.missed_lines == y.missed_lines
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_bytes_roundtrip(lazy: bool) -> None:
+    tree = build_sample_tree()
+    loaded = tree_from_bytes(tree_to_bytes(tree), lazy=lazy)
+    assert loaded.parent is None
+    assert_same_tree(tree, loaded)
+
+
+def test_subtree_becomes_root() -> None:
+    tree = build_sample_tree()
+    loaded = tree_from_bytes(tree_to_bytes(tree['module_1']))
+    assert loaded.is_root
+    assert loaded.path == ('module_1',)
+    assert_same_tree(tree['module_1'], loaded)
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_save_load_file(tmp_path: pathlib.Path, lazy: bool) -> None:
+    tree = build_sample_tree()
+    save_tree(tree, tmp_path / 'tree.cvt')
+    loaded = load_tree(tmp_path / 'tree.cvt', lazy=lazy)
+    assert_same_tree(tree, loaded)
+
+
+def test_open_tree(tmp_path: pathlib.Path) -> None:
+    tree = build_sample_tree()
+    path = tmp_path / 'tree.cvt'
+    save_tree(tree, path)
+    with open_tree(path) as loaded:
+        assert_same_tree(tree['module_1']['module_3.py'],
+                         loaded['module_1']['module_3.py'])
+        assert loaded.num_missed_lines == tree.num_missed_lines
+
+    # the file is closed, e.g. it can be removed also on Windows
+    path.unlink()
+    assert not path.exists()
+    # the parts read within the block stay readable, the others cannot be read
+    assert loaded['module_1']['module_3.py'].missed_lines_str() == '5-9'
+    with pytest.raises(ValueError):
+        loaded['module_1']['module_5'].children
+
+
+def test_save_load_file_object() -> None:
+    tree = build_sample_tree()
+    with io.BytesIO() as f:
+        save_tree(tree, f)
+        f.seek(0)
+        loaded = load_tree(f)
+    assert_same_tree(tree, loaded)
+
+
+def test_lazy_access() -> None:
+    tree = build_sample_tree()
+    loaded = tree_from_bytes(tree_to_bytes(tree), lazy=True)
+
+    # summaries are answered from the node records
+    assert loaded.num_executable_lines == tree.num_executable_lines
+    assert len(loaded) == len(tree)
+    assert not loaded._loaded  # type: ignore
+
+    mod_1 = loaded['module_1']
+    assert loaded._loaded  # type: ignore
+    assert not mod_1._loaded  # type: ignore
+    assert mod_1.parent is loaded
+    assert mod_1.num_missed_lines == 9
+
+    mod_2 = loaded['module_2.py']
+    assert isinstance(mod_2, CovFile)
+    assert mod_2._lines is None  # type: ignore
+    assert mod_2.num_missed_lines == 4
+    assert mod_2._lines is None  # type: ignore
+    assert mod_2.missed_lines == {20, 21, 22, 23}
+
+    mod_2.missed_lines = {20}
+    assert mod_2.num_missed_lines == 1
+    assert mod_2.executable_lines == set(range(42))
+
+
+def test_deep_tree() -> None:
+    tree = CovModule('root')
+    node: CovNode = tree
+    for _ in range(2000):
+        child = CovModule('d')
+        node.insert_child(child)
+        node = child
+    node.insert_child(CovFile('leaf.py', [1, 2], [], [2]))
+    loaded = tree_from_bytes(tree_to_bytes(tree))
+    node = loaded
+    for _ in range(2000):
+        node = node['d']
+    assert node['leaf.py'].num_missed_lines == 1
+
+
+def test_collapsed_module() -> None:
+    tree = build_sample_tree()
+    tree.insert_child(_CollapsedModule('collapsed', (10, 2, 3)))
+    assert tree.num_missed_lines == 16
+    for lazy in (False, True):
+        loaded = tree_from_bytes(tree_to_bytes(tree), lazy=lazy)
+        assert loaded.num_missed_lines == 16
+        assert isinstance(loaded['collapsed'], _CollapsedModule)
+        assert loaded['collapsed'].num_skipped_lines == 2
+        assert_same_tree(tree, loaded)
+
+
+@pytest.mark.parametrize('protocol', range(2, pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle(protocol: int) -> None:
+    tree = build_sample_tree()
+    loaded = pickle.loads(pickle.dumps(tree, protocol=protocol))
+    assert type(loaded) is CovModule
+    assert_same_tree(tree, loaded)
+
+    # a subtree becomes a root
+    subtree = pickle.loads(pickle.dumps(tree['module_1']))
+    assert subtree.is_root
+    assert_same_tree(tree['module_1'], subtree)
+
+    # lazy nodes become ordinary nodes
+    lazy = tree_from_bytes(tree_to_bytes(tree), lazy=True)
+    loaded = pickle.loads(pickle.dumps(lazy))
+    assert type(loaded) is CovModule
+    assert type(loaded['module_2.py']) is CovFile
+    assert_same_tree(tree, loaded)
+
+
+def test_pickle_deep_and_compact() -> None:
+    tree = CovModule('root')
+    node: CovNode = tree
+    for _ in range(2000):
+        child = CovModule('d')
+        node.insert_child(child)
+        node = child
+    node.insert_child(CovFile('leaf.py', range(1, 10_000), [], range(5, 50)))
+    data = pickle.dumps(tree)
+    node = pickle.loads(data)
+    for _ in range(2000):
+        node = node['d']
+    assert node['leaf.py'].num_missed_lines == 45
+
+    # far smaller than the pickled line sets alone
+    leaf = node['leaf.py']
+    assert isinstance(leaf, CovFile)
+    assert len(pickle.dumps(leaf)) * 2 < len(pickle.dumps(
+        (leaf.executable_lines, leaf.skipped_lines, leaf.missed_lines)
+    ))
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'XXXX' + bytes(40),
+    tree_to_bytes(CovModule('x'))[:4] + b'\xff\xff' + bytes(38),
+])
+def test_bad_snapshot(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        tree_from_bytes(data)
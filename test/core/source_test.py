@@ -0,0 +1,66 @@
+from __future__ import annotations
+import pathlib
+import os
+
+from cov_tree.core.builder import build_cov_tree
+from cov_tree.core.source import SourceFiles, _LineIndex
+
+
+def test_line_index() -> None:
+    data = b'a\nbb\n\nccc'
+    index = _LineIndex((0, len(data)))
+    index.extend(data, 1)
+    assert index.offsets == [0, 2]
+    assert not index.complete
+    index.extend(data, 10)
+    assert index.offsets == [0, 2, 5, 6, 9]
+    assert index.complete
+
+    index = _LineIndex((0, 3))
+    index.extend(b'ab\n', 5)
+    assert index.offsets == [0, 3]
+
+
+def test_lines(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / 'src.py'
+    path.write_bytes(b'one\r\ntwo\nthree \xff\nfour\n')
+    sources = SourceFiles(str(tmp_path))
+    assert sources.lines('src.py', []) == {}
+    assert sources.lines('src.py', [2]) == {2: 'two'}
+    assert sources._indices[str(path)].offsets == [0, 5, 9]
+    assert sources.lines('src.py', [0, 1, 3, 5]) == {
+        1: 'one', 3: 'three �',
+    }
+    assert len(sources) == 1
+
+    # the index is rebuilt for a changed file
+    path.write_text('first\nsecond\n')
+    os.utime(path, ns=(0, 0))
+    assert sources.lines(str(path), [1, 2]) == {1: 'first', 2: 'second'}
+    assert len(sources) == 1
+
+    (tmp_path / 'empty.py').write_text('')
+    assert sources.lines('empty.py', [1]) == {}
+    assert sources.lines('missing.py', [1]) == {}
+    sources.clear()
+    assert len(sources) == 0
+
+
+def test_missed_lines(cov_file: str) -> None:
+    base, tree = build_cov_tree(cov_file)
+    sources = SourceFiles(base)
+    assert sources.missed_lines(tree['pkg_b']['tool.py']) == {  # type: ignore
+        3: 'c = 3', 4: 'd = 4',
+    }
+    assert sources.missed_lines(tree['pkg_a']['mod.py']) == {  # type: ignore
+        7: '    return 2', 14: '        return self.attr',
+    }
+
+
+def test_missed_lines_synthetic_root(relative_cov_file: str) -> None:
+    base, tree = build_cov_tree(relative_cov_file)
+    assert tree.name == '<root>'
+    sources = SourceFiles(base)
+    assert sources.missed_lines(tree['pkg_b']['tool.py']) == {  # type: ignore
+        3: 'c = 3', 4: 'd = 4',
+    }
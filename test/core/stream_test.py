@@ -0,0 +1,80 @@
+from __future__ import annotations
+import pytest
+from typing import Callable
+
+from cov_tree.core.node import CovNode, CovFile
+from cov_tree.core.builder import build_cov_tree
+from cov_tree.core.stream import stream_cov_tree, summarize_cov_tree
+
+
+def summary(tree: CovNode) -> list[tuple]:
+    return [
+        (
+            node.path, node.num_executable_lines, node.num_skipped_lines,
+            node.num_missed_lines,
+        )
+        for node in tree.iter_tree()
+    ]
+
+
+@pytest.mark.parametrize('drop_ext', [False, True])
+def test_stream_cov_tree(cov_file: str, drop_ext: bool) -> None:
+    expect_base, tree = build_cov_tree(cov_file, drop_ext=drop_ext)
+    expect = {
+        node.path: (
+            node.num_executable_lines,
+            node.num_skipped_lines,
+            node.num_missed_lines,
+            isinstance(node, CovFile),
+        )
+        for node in tree.iter_tree()
+    }
+
+    base, summaries = stream_cov_tree(cov_file, drop_ext=drop_ext)
+    assert base == expect_base
+
+    seen: set[tuple[str, ...]] = set()
+    for s in summaries:
+        assert s.path not in seen
+        # post-order: all descendants have been yielded before
+        assert all(
+            path in seen
+            for path in expect
+            if len(path) > len(s.path) and path[:len(s.path)] == s.path
+        )
+        seen.add(s.path)
+        assert expect[s.path] == (
+            s.num_executable_lines,
+            s.num_skipped_lines,
+            s.num_missed_lines,
+            s.is_file,
+        )
+        if s.node is not None:
+            assert s.node.path == (s.path[-1],)
+    assert s.path == (tree.name,)
+    assert s.coverage == tree.coverage
+    assert seen == set(expect)
+
+
+@pytest.mark.parametrize('max_depth', [None, 0, 1, 2, 3])
+def test_summarize_cov_tree(cov_file: str, max_depth: int | None) -> None:
+    expect_base, expect = build_cov_tree(cov_file)
+    base, tree = summarize_cov_tree(cov_file, max_depth)
+    assert base == expect_base
+    assert summary(tree) == [
+        s for s in summary(expect)
+        if max_depth is None or len(s[0]) <= max_depth + 1
+    ]
+    if max_depth == 1:
+        assert tree['pkg_a'].children == ()
+        assert tree['pkg_a'].num_missed_lines == 2
+
+
+def test_stream_empty_and_single(make_cov_file: Callable[..., str]) -> None:
+    base, tree = summarize_cov_tree(make_cov_file({}))
+    assert (base, tree.name, len(tree)) == ('', '<root>', 1)
+
+    cov_file = make_cov_file({'pkg_b/tool.py': [1]})
+    base, tree = summarize_cov_tree(cov_file)
+    assert tree.name == 'pkg_b'
+    assert tree['tool.py'].num_missed_lines == 3
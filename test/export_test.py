@@ -0,0 +1,26 @@
+from __future__ import annotations
+import json
+
+from cov_tree.core import CovFile, CovModule
+from cov_tree.export import tree_to_dict
+
+
+def test_tree_to_dict() -> None:
+    root = CovModule('root')
+    root.insert_child(CovFile('a.py', range(10), [], [3, 4]))
+    root.insert_child(CovFile('b.py', range(4), [], []), ['sub'])
+
+    data = tree_to_dict(root)
+    assert json.loads(json.dumps(data)) == data
+    assert data['name'] == 'root'
+    assert data['num_executable_lines'] == 14
+    assert data['num_missed_lines'] == 2
+    assert [c['name'] for c in data['children']] == ['a.py', 'sub']
+    assert data['children'][0]['missed_lines'] == '3-4'
+    assert 'children' not in data['children'][0]
+    assert data['children'][1]['children'][0]['coverage'] == 1.0
+
+    data = tree_to_dict(root, descend=lambda n: n.coverage < 0.9,
+                        show_missing=False)
+    assert 'missed_lines' not in data['children'][0]
+    assert data['children'][1]['children'] == []
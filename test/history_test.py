@@ -0,0 +1,99 @@
+from __future__ import annotations
+import pytest
+import sqlite3
+import pathlib
+import time
+
+from cov_tree.core import CovFile, CovModule, CovNode
+from cov_tree.history import HistoryStore, history_main, record_main
+
+
+def build_tree(missed: int) -> CovNode:
+    root = CovModule('root')
+    root.insert_child(CovFile('a.py', range(10), [10], range(missed)))
+    root.insert_child(CovFile('b.py', range(10), [], []), ['sub'])
+    return root
+
+
+def test_history_store(tmp_path: pathlib.Path) -> None:
+    db = str(tmp_path / 'history.sqlite')
+    with HistoryStore(db) as store:
+        store.record('c1', build_tree(5), recorded_at=1.0)
+        store.record('c2', build_tree(2), recorded_at=2.0)
+
+    with HistoryStore(db) as store:
+        assert store.commits() == [('c1', 1.0), ('c2', 2.0)]
+        history = store.history('root/a.py')
+        assert [(e.sha, e.num_missed_lines) for e in history] == [
+            ('c1', 5), ('c2', 2),
+        ]
+        assert history[0].num_executable_lines == 10
+        assert history[0].num_skipped_lines == 1
+        assert history[1].coverage == 0.8
+
+        assert [e.num_missed_lines for e in store.history('root')] == [5, 2]
+        assert [e.coverage for e in store.history('root/sub/')] == [1.0, 1.0]
+        assert [e.sha for e in store.history('root', limit=1)] == ['c2']
+        assert store.history('root/nope') == []
+
+        # re-recording replaces
+        tree = build_tree(0)
+        tree.insert_child(CovFile('c.py', [], [], []), ['sub'])
+        store.record('c1', tree, recorded_at=3.0)
+        assert [e.sha for e in store.history('root')] == ['c2', 'c1']
+        assert [e.sha for e in store.history('root/sub/c.py')] == ['c1']
+
+
+def test_history_store_timestamp() -> None:
+    with HistoryStore(':memory:') as store:
+        before = time.time()
+        store.record('c', build_tree(1))
+        assert store.commits()[0][1] >= before
+        assert store.history('root')[0].coverage == 1 - 1 / 20
+
+
+def test_history_large_tree() -> None:
+    root = CovModule('root')
+    for i in range(40):
+        for j in range(1000):
+            root.insert_child(CovFile(f'{j}.py', range(5), [], [1]), [str(i)])
+
+    with HistoryStore(':memory:') as store:
+        start = time.perf_counter()
+        store.record('c', root)
+        assert time.perf_counter() - start < 5  # far less, usually
+        assert store.history('root/39/999.py')[0].num_missed_lines == 1
+
+
+def test_record_history_main(
+        cov_file: str,
+        tmp_path: pathlib.Path,
+        capsys: pytest.CaptureFixture,
+) -> None:
+    db = str(tmp_path / 'history.sqlite')
+    assert record_main([cov_file, '--commit', 'abc', '--db', db]) == 0
+    assert record_main([cov_file, '--commit', 'def', '--db', db]) == 0
+    capsys.readouterr()
+
+    assert history_main(['project/pkg_b', '--db', db]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    assert lines[2] == 'abc          5       2    60%'
+
+    assert history_main(['project/nope', '--db', db]) == 1
+    assert record_main(['nope', '--commit', 'x', '--db', db]) == 1
+
+    # queries do not create databases
+    capsys.readouterr()
+    typo = tmp_path / 'typo.sqlite'
+    assert history_main(['project', '--db', str(typo)]) == 1
+    assert not typo.exists()
+    assert capsys.readouterr().out.startswith('No history database')
+
+    typo.write_text('not a database')
+    assert history_main(['project', '--db', str(typo)]) == 1
+    assert capsys.readouterr().out.startswith('Cannot read')
+    assert typo.read_text() == 'not a database'
+    with pytest.raises(sqlite3.OperationalError):
+        HistoryStore(str(tmp_path / 'missing.sqlite'), read_only=True)
+    assert not (tmp_path / 'missing.sqlite').exists()
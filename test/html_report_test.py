@@ -0,0 +1,58 @@
+from __future__ import annotations
+import pathlib
+import json
+
+from cov_tree.core import CovFile, CovModule, CovNode
+from cov_tree.html_report import write_html
+
+
+def read_chunk(out_dir: pathlib.Path, chunk: int) -> list[dict]:
+    text = (out_dir / 'chunks' / f'{chunk}.js').read_text()
+    prefix = f'covTreeChunk({chunk}, '
+    assert text.startswith(prefix) and text.endswith(');\n')
+    return json.loads(text[len(prefix):-3])
+
+
+def make_tree() -> CovNode:
+    root = CovModule('root</script>')
+    root.insert_child(CovFile('a.py', range(10), [], [3, 4]))
+    root.insert_child(CovFile('b.py', range(4), [], []), ['sub'])
+    root.insert_child(CovFile('c.py', range(4), [], [1]), ['sub', 'deep'])
+    return root
+
+
+def test_write_html(tmp_path: pathlib.Path) -> None:
+    out_dir = tmp_path / 'out'
+    assert write_html(make_tree(), str(out_dir), max_workers=2) == 3
+
+    page = (out_dir / 'index.html').read_text()
+    assert '<title>Coverage: root&lt;/script&gt;</title>' in page
+    assert ('var root = {"n": "root<\\/script>", "s": 18, "m": 3, '
+            '"p": 0.8333, "c": 0};') in page
+
+    assert read_chunk(out_dir, 0) == [
+        {'n': 'a.py', 's': 10, 'm': 2, 'p': 0.8, 'l': '3-4'},
+        {'n': 'sub', 's': 8, 'm': 1, 'p': 0.875, 'c': 1},
+    ]
+    assert read_chunk(out_dir, 1) == [
+        {'n': 'b.py', 's': 4, 'm': 0, 'p': 1.0},
+        {'n': 'deep', 's': 4, 'm': 1, 'p': 0.75, 'c': 2},
+    ]
+    assert read_chunk(out_dir, 2) == [
+        {'n': 'c.py', 's': 4, 'm': 1, 'p': 0.75, 'l': '1'},
+    ]
+
+
+def test_write_html_descend(tmp_path: pathlib.Path) -> None:
+    out_dir = tmp_path / 'out'
+    tree = make_tree()
+    assert write_html(tree, str(out_dir), show_missing=False,
+                      descend=lambda node: node is tree) == 1
+    assert read_chunk(out_dir, 0) == [
+        {'n': 'a.py', 's': 10, 'm': 2, 'p': 0.8},
+        {'n': 'sub', 's': 8, 'm': 1, 'p': 0.875},
+    ]
+
+    out_dir = tmp_path / 'leaf'
+    assert write_html(CovFile('a.py', [1], [], [1]), str(out_dir)) == 0
+    assert '"c"' not in (out_dir / 'index.html').read_text()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import pytest
+import os
+import pathlib
+import subprocess
+import sys
+import re
+
+import cov_tree
+
+
+HEAVY_MODULES = ('coverage', 'termcolor')
+
+
+def run_python(
+        code: str,
+        *options: str,
+        env: dict[str, str] | None = None,
+) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        capture_output=True, text=True, check=True, env=env,
+    )
+
+
+@pytest.mark.parametrize('code', [
+    'import cov_tree',
+    'import cov_tree.cmdline',
+    'from cov_tree import missed_lines_str',
+    'from cov_tree.cmdline import main\n'
+    'try:\n'
+    '    main(["--version"])\n'
+    'except SystemExit:\n'
+    '    pass',
+])
+def test_no_heavy_imports(code: str) -> None:
+    code += (
+        '\nimport sys\n'
+        f'print("loaded:", *(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    result = run_python(code)
+    assert result.stdout.splitlines()[-1] == 'loaded:'
+
+
+def test_lazy_attributes() -> None:
+    from cov_tree.print import print_tree
+    from cov_tree.cmdline import main
+    assert cov_tree.print_tree is print_tree
+    assert cov_tree.cmdline_main is main
+    assert 'print_tree' in dir(cov_tree)
+    with pytest.raises(AttributeError):
+        cov_tree.does_not_exist  # type: ignore
+
+
+# generous, but a regression (e.g. importing `coverage` eagerly again) takes
+# several times as long
+MAX_IMPORT_TIME_US = 60_000
+
+
+def _import_time_us(pycache: pathlib.Path) -> int:
+    # measure with cached bytecode (in a separate directory), as installed
+    # packages have, instead of compiling all modules on each run
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = run_python(
+        'import cov_tree.cmdline',
+        '-X', 'importtime', '-X', f'pycache_prefix={pycache}',
+        env=env,
+    )
+    # the cumulative time of the top-level import includes the package
+    match = re.search(
+        r'^import time:\s+\d+ \|\s+(\d+) \| cov_tree\.cmdline$',
+        result.stderr, re.MULTILINE,
+    )
+    assert match is not None
+    return int(match.group(1))
+
+
+def test_import_time(tmp_path: pathlib.Path) -> None:
+    # the first run writes the bytecode
+    _import_time_us(tmp_path)
+    # the best of a few runs, as a busy machine slows down single runs
+    assert min(_import_time_us(tmp_path) for _ in range(3)) \
+        < MAX_IMPORT_TIME_US
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from cov_tree.core import CovFile, CovModule, CovNode
+from cov_tree.interactive import TreeView
+
+
+def build_sample_tree() -> CovNode:
+    root = CovModule('root')
+    root.insert_child(CovFile('a.py', range(10), [], range(5)))
+    for i in range(3):
+        root.insert_child(CovFile(f'f{i}.py', range(4), [], []), ['sub'])
+    root.insert_child(CovFile('g.py', range(4), [], [1]), ['sub', 'deep'])
+    root.insert_child(CovFile('z.py', range(1000), [], []))
+    return root
+
+
+def names(view: TreeView) -> list[str]:
+    return [node.name for node, _ in view.visible_rows()]
+
+
+def test_tree_view_expand_collapse() -> None:
+    view = TreeView(build_sample_tree(), height=4)
+    assert view.rows[0][0].name == 'root'
+    assert names(view) == ['root', 'a.py', 'sub', 'z.py']
+
+    view.move(2)
+    assert view.current.name == 'sub'
+    view.toggle()
+    assert len(view.rows) == 8
+    assert [d for _, d in view.rows] == [0, 1, 1, 2, 2, 2, 2, 1]
+    assert names(view) == ['root', 'a.py', 'sub', 'f0.py']
+
+    view.move(4)
+    assert view.current.name == 'deep'
+    assert view.top == 3
+    view.expand()
+    assert names(view) == ['f0.py', 'f1.py', 'f2.py', 'deep']
+    view.move(1)
+    assert names(view) == ['f1.py', 'f2.py', 'deep', 'g.py']
+
+    # collapsing a leaf jumps to its parent, then collapse the parent
+    view.collapse()
+    assert view.current.name == 'deep'
+    view.collapse()
+    assert not view.is_expanded(view.current)
+    assert len(view.rows) == 8
+
+    # collapsing 'sub' also forgets the expansion of 'deep'
+    view.move_to(2)
+    view.collapse()
+    assert names(view) == ['root', 'a.py', 'sub', 'z.py']
+    view.expand()
+    assert len(view.rows) == 8
+    view.expand(6)
+    assert len(view.rows) == 9
+
+    view.move_to(100)
+    assert view.current.name == 'z.py'
+    view.toggle()
+    assert len(view.rows) == 9
+    view.move_to(-5)
+    assert view.cursor == 0 and view.top == 0
+
+
+def test_tree_view_collapse_root() -> None:
+    view = TreeView(build_sample_tree(), height=10)
+    view.toggle()
+    assert names(view) == ['root']
+    view.collapse()
+    assert view.cursor == 0
+    view.resize(0)
+    assert view.height == 1
+
+
+def test_tree_view_format_row() -> None:
+    view = TreeView(build_sample_tree())
+    root, sub, a = view.rows[0][0], view.rows[2][0], view.rows[1][0]
+    assert view.format_row(root, 0, 40) == \
+        '- root              1,026       6    99%'
+    assert view.format_row(sub, 1, 40) == \
+        '  + sub                16       1    94%'
+    assert view.format_row(a, 1, 30) == '    a.~      10       5    50%'
+    assert view.format_row(a, 1, 10) == '~      10 '
+
+
+def test_tree_view_format_header() -> None:
+    view = TreeView(build_sample_tree())
+    header = view.format_header(40)
+    assert header == 'Name                Stmts    Miss  Cover'
+    # aligned with the rows
+    row = view.format_row(view.rows[0][0], 0, 40)
+    assert len(header) == len(row)
+    assert header.index('Cover') + len('Cover') == row.index('99%') + 3
@@ -0,0 +1,64 @@
+from __future__ import annotations
+import pytest
+from io import StringIO
+
+from cov_tree.core import CovFile, CovModule, CovNode
+from cov_tree.markdown import MarkdownTable, write_markdown
+
+
+def make_tree() -> CovNode:
+    root = CovModule('root')
+    root.insert_child(CovFile('a|b.py', range(10), [], [3, 4]))
+    root.insert_child(CovFile('b`c.py', range(4), [], []), ['sub'])
+    root.insert_child(CovFile('ü.py', range(2000), [], [1]), ['sub', 'deep'])
+    return root
+
+
+EXPECT = """\
+| Name | Stmts | Miss | Cover | Missing |
+|:--|--:|--:|--:|--|
+| `a\\|b.py` | 10 | 2 | 80% | `3-4` |
+| `sub/` | 2,004 | 1 | 100% |  |
+| `` sub/b`c.py `` | 4 | 0 | 100% |  |
+| `sub/deep/` | 2,000 | 1 | 100% |  |
+| `sub/deep/ü.py` | 2,000 | 1 | 100% | `1` |
+| **TOTAL** | 2,014 | 3 | 100% |  |
+"""
+
+
+def test_markdown_table() -> None:
+    table = MarkdownTable(make_tree(), show_missing=True)
+    assert table.max_depth == 3
+    assert table.render() == EXPECT
+    assert table.size() == len(EXPECT.encode('utf-8'))
+
+    lines = EXPECT.splitlines(keepends=True)
+    assert table.render(1) == ''.join(lines[:4] + lines[-1:]) + \
+        '\n_Collapsed below depth 1 to fit the size limit._\n'
+    for depth in range(4):
+        assert table.size(depth) == len(table.render(depth).encode('utf-8'))
+
+    # the deepest table that fits (which need not be monotone in the size, as
+    # the note on collapsing is left out for the entire table)
+    sizes = [table.size(depth) for depth in range(4)]
+    for max_bytes in range(sizes[0], sizes[3] + 2):
+        assert table.fit(max_bytes) == max(
+            depth for depth, size in enumerate(sizes) if size <= max_bytes
+        )
+    with pytest.raises(ValueError):
+        table.fit(table.size(0) - 1)
+
+
+def test_write_markdown() -> None:
+    tree = make_tree()
+    with StringIO() as string_io:
+        write_markdown(tree, string_io, descend=lambda n: n is tree,
+                       max_bytes=1000)
+        output = string_io.getvalue()
+    assert output == """\
+| Name | Stmts | Miss | Cover |
+|:--|--:|--:|--:|
+| `a\\|b.py` | 10 | 2 | 80% |
+| `sub/` | 2,004 | 1 | 100% |
+| **TOTAL** | 2,014 | 3 | 100% |
+"""
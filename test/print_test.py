@@ -6,8 +6,9 @@ from contextlib import redirect_stdout
 import re
 
 from cov_tree.print import _TREE_SET, get_available_tree_sets, cov_color
-from cov_tree.print import print_tree
-from cov_tree.core import CovFile, CovModule, CovNode
+from cov_tree.print import print_tree, print_top
+from cov_tree.core import CovFile, CovModule, CovNode, build_cov_tree
+from cov_tree.core.source import SourceFiles
 
 
 @pytest.mark.parametrize('tree_set', _TREE_SET.values())
@@ -232,3 +233,100 @@ def test_print_collapsed(sample_tree: CovNode) -> None:
         output = string_io.getvalue()
 
     assert output == EXPECT_TREE_COLLAPSED
+
+
+EXPECT_TOP = """\
+                              Stmts    Miss  Cover  Missing
+-----------------------------------------------------------
+module/submodule_2/file1.py      33       9    73%  1-3, 8, 20-24
+module/submodule_2/file3.py      33       8    76%  3-5, 13, 20-23
+-----------------------------------------------------------
+TOTAL                           270      32    88%
+"""
+
+
+@pytest.mark.parametrize('ansi_esc', [True, False])
+def test_print_top(sample_tree: CovNode, ansi_esc: bool) -> None:
+    with StringIO() as string_io:
+        print_top(
+            sample_tree,
+            sample_tree.top_k('missed', 2),
+            show_missing=True,
+            cov_color=cov_color,
+            file=string_io,
+            no_ansi_escape=ansi_esc,
+        )
+        output = string_io.getvalue()
+
+    assert clean_ansi_esc(output) == EXPECT_TOP
+
+
+def test_print_source(cov_file: str) -> None:
+    base, tree = build_cov_tree(cov_file)
+    with StringIO() as string_io:
+        print_tree(
+            tree['pkg_a'],
+            tree_set='ascii',
+            file=string_io,
+            no_ansi_escape=True,
+            show_source=SourceFiles(base),
+        )
+        output = string_io.getvalue()
+    assert output.splitlines()[2:-2] == [
+        'pkg_a                    13       2    85%',
+        '|-- __init__.py           1       0   100%',
+        '|-- mod.py                9       2    78%',
+        '|      7      return 2',
+        '|     14          return self.attr',
+        '`-- sub                   3       0   100%',
+        '    |-- __init__.py       0       0   100%',
+        '    `-- deep.py           3       0   100%',
+    ]
+
+    with StringIO() as string_io:
+        print_top(
+            tree,
+            tree.top_k('missed', 1),
+            file=string_io,
+            no_ansi_escape=True,
+            show_source=SourceFiles(base),
+        )
+        output = string_io.getvalue()
+    assert output.splitlines()[2:-2] == [
+        'project/pkg_a/mod.py       9       2    78%',
+        '   7      return 2',
+        '  14          return self.attr',
+    ]
+
+
+EXPECT_SORTED = """\
+                    Stmts    Miss  Cover
+----------------------------------------
+module                270      32    88%
+  submodule_2         154      25    84%
+    file1.py           33       9    73%
+    file3.py           33       8    76%
+    file2.py           48       5    90%
+    subsubmodule       38       3    92%
+      file2.py         18       3    83%
+      __init__.py       0       0   100%
+      file1.py         20       0   100%
+    __init__.py         2       0   100%
+  submodule_1         101       7    93%
+    file1.py           42       4    90%
+    file2.py           57       3    95%
+    __init__.py         2       0   100%
+  __init__.py           4       0   100%
+  version.py            1       0   100%
+  file3.py             10       0   100%
+----------------------------------------
+TOTAL                 270      32    88%
+"""
+
+
+def test_print_sorted(sample_tree: CovNode) -> None:
+    with StringIO() as string_io:
+        print_tree(sample_tree, tree_set='indent-2', file=string_io,
+                   no_ansi_escape=True, sort='missed')
+        output = string_io.getvalue()
+    assert output == EXPECT_SORTED
@@ -0,0 +1,205 @@
+from __future__ import annotations
+import pytest
+from typing import Iterator
+import json
+import pathlib
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from cov_tree.core import CovNode, CovModule
+from cov_tree.serve import TreeCache, CovTreeServer, get_arg_parser
+
+
+def test_tree_cache(tmp_path: pathlib.Path) -> None:
+    builds: list[str] = []
+
+    def build(path: str) -> tuple[str, CovNode]:
+        builds.append(path)
+        return '', CovModule(os.path.basename(path))
+
+    files = []
+    for name in 'abc':
+        files.append(os.path.join(str(tmp_path), name))
+        with open(files[-1], 'w') as f:
+            f.write(name)
+
+    cache = TreeCache(2, build)
+    assert cache.get(files[0])[1].name == 'a'
+    assert cache.get(files[0])[1].name == 'a'
+    assert cache.get(files[1])[1].name == 'b'
+    assert builds == files[:2]
+    assert len(cache) == 2
+
+    # evict least recently used
+    cache.get(files[0])
+    cache.get(files[2])
+    assert len(cache) == 2
+    cache.get(files[0])
+    assert builds == files[:3]
+    cache.get(files[1])
+    assert builds == files[:3] + files[1:2]
+
+    # a modified file is re-built and replaces the old entry
+    os.utime(files[1], ns=(0, 0))
+    cache.get(files[1])
+    assert builds == files[:3] + files[1:2] * 2
+    assert len(cache) == 2
+
+    with pytest.raises(ValueError):
+        TreeCache(0)
+
+
+def test_tree_cache_concurrent_builds(tmp_path: pathlib.Path) -> None:
+    builds: list[str] = []
+    release = threading.Event()
+
+    def build(path: str) -> tuple[str, CovNode]:
+        builds.append(path)
+        release.wait(5)
+        if os.path.basename(path) == 'bad':
+            raise ValueError('bad coverage file')
+        return '', CovModule(os.path.basename(path))
+
+    files = []
+    for name in ('good', 'bad'):
+        files.append(os.path.join(str(tmp_path), name))
+        with open(files[-1], 'w') as f:
+            f.write(name)
+
+    cache = TreeCache(2, build)
+    results: list[object] = []
+
+    def get(path: str) -> None:
+        try:
+            results.append(cache.get(path)[1])
+        except ValueError as e:
+            results.append(e)
+
+    threads = [
+        threading.Thread(target=get, args=(path,))
+        for path in files * 4
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # one build per file, shared by all requests (including its error)
+    assert sorted(builds) == sorted(files)
+    good = [r for r in results if isinstance(r, CovNode)]
+    assert len(good) == 4 and all(r is good[0] for r in good)
+    assert sum(isinstance(r, ValueError) for r in results) == 4
+
+    # failed builds are not cached
+    with pytest.raises(ValueError):
+        cache.get(files[1])
+    assert len(builds) == 3
+
+
+@pytest.fixture
+def server(cov_file: str) -> Iterator[CovTreeServer]:
+    server = CovTreeServer([cov_file], ('127.0.0.1', 0), quiet=True)
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True,
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server_url(server: CovTreeServer) -> str:
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def fetch(url: str) -> tuple[int, str]:
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8')
+
+
+def test_serve_text(server_url: str) -> None:
+    status, text = fetch(server_url + '/')
+    assert status == 200
+    assert text.splitlines()[2].startswith('project')
+    assert 'tool.py' in text
+
+    status, text = fetch(server_url + '/pkg_b?missing=1')
+    assert status == 200
+    assert text.splitlines()[2].startswith('pkg_b')
+    assert '3-4' in text
+    assert 'pkg_a' not in text
+
+    status, text = fetch(server_url + '/?threshold=80')
+    assert status == 200
+    assert 'deep.py' not in text
+
+
+def test_serve_json(server_url: str) -> None:
+    status, text = fetch(server_url + '/pkg_a/sub?format=json')
+    assert status == 200
+    data = json.loads(text)
+    assert data['name'] == 'sub'
+    assert data['num_executable_lines'] == 3
+    assert [c['name'] for c in data['children']] == ['__init__.py', 'deep.py']
+
+
+def test_serve_render_cache(server: CovTreeServer, server_url: str) -> None:
+    text = fetch(server_url + '/pkg_b?missing=1')[1]
+    assert fetch(server_url + '/pkg_b?missing=1')[1] == text
+    assert (server.renders.hits, server.renders.misses) == (1, 1)
+
+    # other options are rendered separately
+    assert fetch(server_url + '/pkg_b')[1] != text
+    fetch(server_url + '/pkg_b?format=json&missing=1')
+    fetch(server_url + '/pkg_b?threshold=50&missing=1')
+    assert (server.renders.hits, server.renders.misses) == (1, 4)
+
+    # unchanged subtrees of a re-built tree are not rendered again
+    server.cache._trees.clear()
+    assert fetch(server_url + '/pkg_b?missing=1')[1] == text
+    assert (server.renders.hits, server.renders.misses) == (2, 4)
+
+
+@pytest.mark.parametrize('query, status', [
+    ('/nope', 404),
+    ('/?file=other', 404),
+    ('/?format=xml', 400),
+    ('/?threshold=high', 400),
+])
+def test_serve_errors(server_url: str, query: str, status: int) -> None:
+    assert fetch(server_url + query)[0] == status
+
+
+@pytest.mark.filterwarnings('ignore::coverage.exceptions.CoverageWarning')
+def test_serve_build_error(tmp_path: pathlib.Path) -> None:
+    path = os.path.join(str(tmp_path), '.coverage')
+    with open(path, 'w') as f:
+        f.write('no coverage data')
+    server = CovTreeServer([path], ('127.0.0.1', 0), quiet=True)
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True,
+    )
+    thread.start()
+    try:
+        assert fetch(f'http://127.0.0.1:{server.server_port}/')[0] == 500
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_args() -> None:
+    args = get_arg_parser().parse_args([])
+    assert args.coverage_files == ['.coverage']
+    assert args.port == 8000
+
+    with pytest.raises(ValueError):
+        CovTreeServer([], ('127.0.0.1', 0))